@@ -1,13 +1,15 @@
 import streamlit as st
-import matplotlib.pyplot as plt
-import matplotlib.patches as patches
-import math
-import random
-import pandas as pd
+import profiling
+from core import tank_volume, get_recommended_density, size_tank, head_list
 
 # 1. ตั้งค่าหน้าเว็บ
 st.set_page_config(page_title="Ultrasonic Design Master", page_icon="⚙️", layout="wide")
 
+# จับเวลาแต่ละขั้น (ปิดอยู่ = แทบไม่มี overhead)
+profile_on = profiling.ENABLED or st.session_state.get("profile", False)
+if profile_on:
+    profiling.start_run(st.session_state.get("page", "manual"))
+
 # ==========================================
 # 2. ส่วนตั้งค่าภาษา (Language Settings)
 # ==========================================
@@ -16,7 +18,8 @@ lang_choice = st.sidebar.radio(
     "Select Language", 
     ["🇹🇭 ภาษาไทย", "🇬🇧 English"], 
     index=0,
-    label_visibility="collapsed"
+    label_visibility="collapsed",
+    key="lang"
 )
 lang = "th" if "ไทย" in lang_choice else "en"
 
@@ -33,6 +36,10 @@ T = {
     "nav_header": {"th": "เมนูเลือกหน้า", "en": "Navigation"},
     "nav_manual": {"th": "📘 คู่มือและข้อมูล (Knowledge Base)", "en": "📘 Manual & Knowledge Base"},
     "nav_calc":   {"th": "📟 โปรแกรมคำนวณ (Calculator)", "en": "📟 Calculator"},
+    "nav_batch":  {"th": "📦 คำนวณหลายถัง (Batch)", "en": "📦 Batch Design"},
+    "nav_sweep":  {"th": "📈 ไล่ค่าพารามิเตอร์ (Sweep)", "en": "📈 Parametric Sweep"},
+    "nav_line":   {"th": "🏭 ไลน์ล้างหลายถัง (Line)", "en": "🏭 Cleaning Line"},
+    "nav_store":  {"th": "💾 แบบที่บันทึกไว้ (Saved)", "en": "💾 Saved Designs"},
 
     # Input Labels
     "tank_header": {"th": "1. ข้อมูลถัง (Tank Dimensions)", "en": "1. Tank Dimensions"},
@@ -62,6 +69,18 @@ T = {
     "qty_exist": {"th": "จำนวนบอร์ดที่มีอยู่", "en": "Existing Board Qty"},
     "compare_msg": {"th": "ℹ️ กำลังเปรียบเทียบกับค่าแนะนำ", "en": "ℹ️ Comparing with recommendation"},
 
+    # Board-mix optimizer
+    "opt_header": {"th": "💰 หาชุดบอร์ดที่คุ้มที่สุดจากรายการสินค้า (Optimizer)", "en": "💰 Cost-optimal Board Mix (Catalog Optimizer)"},
+    "opt_help": {
+        "th": "ใส่รุ่นบอร์ดที่หาได้ (freq = 28 หรือ 40) ต่อความถี่จะใช้รุ่นเดียว",
+        "en": "List the boards you can buy (freq = 28 or 40); one model is used per frequency"
+    },
+    "opt_objective": {"th": "เป้าหมาย", "en": "Objective"},
+    "opt_cost": {"th": "ราคาถูกที่สุด", "en": "Lowest cost"},
+    "opt_over": {"th": "วัตต์เกินน้อยที่สุด", "en": "Least overshoot"},
+    "opt_tol": {"th": "ยอมให้สัดส่วน 28kHz คลาดเคลื่อน (± %)", "en": "28kHz ratio tolerance (± %)"},
+    "opt_none": {"th": "ไม่พบชุดบอร์ดที่ตรงเงื่อนไข", "en": "No board mix satisfies the constraints"},
+
     # Results
     "vol": {"th": "💧 ปริมาตรน้ำ", "en": "💧 Water Volume"},
     "p_total": {"th": "⚡ กำลังไฟรวม", "en": "⚡ Total Power"},
@@ -72,88 +91,403 @@ T = {
     "fail": {"th": "❌ **พลังงานต่ำกว่าเกณฑ์**", "en": "❌ **BELOW Standard**"},
     "fail_msg": {"th": "ขาดอีก", "en": "Missing"},
 
+    # Tolerance (Monte Carlo)
+    "tol_header": {"th": "🎲 วิเคราะห์ความคลาดเคลื่อน (Monte Carlo)", "en": "🎲 Tolerance Analysis (Monte Carlo)"},
+    "tol_help": {
+        "th": "สุ่มวัตต์จริงของบอร์ด ระดับน้ำที่คลาด และหัวที่เสีย แล้วดูโอกาสที่ยังผ่านเกณฑ์",
+        "en": "Samples real board wattage, water-level drift and failed heads to estimate the chance of still passing"
+    },
+    "tol_run": {"th": "คำนวณ", "en": "Run analysis"},
+    "tol_watt_mean": {"th": "วัตต์จริงเฉลี่ย (% ของป้าย)", "en": "Mean real wattage (% of rated)"},
+    "tol_watt_sd": {"th": "ความกระจายวัตต์ต่อบอร์ด (± % SD)", "en": "Wattage spread per board (% SD)"},
+    "tol_level_sd": {"th": "ระดับน้ำคลาด (± cm SD)", "en": "Water-level drift (cm SD)"},
+    "tol_head_fail": {"th": "โอกาสหัวเสียต่อหัว (%)", "en": "Failure probability per head (%)"},
+    "tol_trials": {"th": "จำนวนรอบสุ่ม", "en": "Trials"},
+    "tol_p_pass": {"th": "✅ โอกาสผ่านเกณฑ์", "en": "✅ Pass probability"},
+    "tol_mean": {"th": "📊 ความหนาแน่นเฉลี่ย", "en": "📊 Mean density"},
+    "tol_p5": {"th": "📉 กรณีแย่ 5% (P5)", "en": "📉 Worst 5% (P5)"},
+
+    # Thermal simulation
+    "th_header": {"th": "🌡️ อุณหภูมิน้ำและพลังงาน (Thermal Simulation)", "en": "🌡️ Bath Temperature & Energy (Thermal Simulation)"},
+    "th_help": {
+        "th": "จำลองอุณหภูมิน้ำจากความร้อนของ ultrasonic หักความร้อนที่เสียทางผนังและการระเหย เทียบหลาย duty cycle พร้อมกัน",
+        "en": "Simulates bath temperature from ultrasonic heat minus wall and evaporation losses, for several duty cycles at once"
+    },
+    "th_run": {"th": "จำลอง", "en": "Run simulation"},
+    "th_horizon": {"th": "ช่วงเวลา", "en": "Horizon"},
+    "th_shift": {"th": "1 กะ", "en": "One shift"},
+    "th_day": {"th": "1 วัน", "en": "One day"},
+    "th_week": {"th": "1 สัปดาห์", "en": "One week"},
+    "th_duties": {"th": "Duty cycle (% เวลาที่เปิด)", "en": "Duty cycles (% on-time)"},
+    "th_cycle": {"th": "รอบเปิด/ปิด (นาที)", "en": "On/off cycle (min)"},
+    "th_shift_h": {"th": "ชั่วโมงทำงานต่อวัน", "en": "Shift hours per day"},
+    "th_days": {"th": "วันทำงานต่อสัปดาห์", "en": "Work days per week"},
+    "th_ambient": {"th": "อุณหภูมิห้อง (°C)", "en": "Ambient (°C)"},
+    "th_limit": {"th": "อุณหภูมิน้ำสูงสุดที่ยอมรับ (°C)", "en": "Max allowed bath temperature (°C)"},
+    "th_duty": {"th": "Duty (%)", "en": "Duty (%)"},
+    "th_max": {"th": "สูงสุด (°C)", "en": "Max (°C)"},
+    "th_final": {"th": "ท้ายช่วง (°C)", "en": "Final (°C)"},
+    "th_above": {"th": "ชม. เกินเกณฑ์", "en": "Hours above limit"},
+    "th_run_h": {"th": "ชม. ที่เปิด", "en": "Run hours"},
+    "th_kwh": {"th": "พลังงาน (kWh)", "en": "Energy (kWh)"},
+    "th_evap": {"th": "น้ำระเหย (L)", "en": "Evaporated (L)"},
+    "th_no_water": {"th": "ยังไม่มีน้ำในถัง ใส่ระดับน้ำก่อนจึงจำลองอุณหภูมิได้", "en": "The tank holds no water; set a water level to run the simulation."},
+
     "bom": {"th": "📦 รายการอุปกรณ์ (BOM)", "en": "📦 Bill of Materials"},
     "layout": {"th": "📍 ผังการจัดวาง (Layout Simulation)", "en": "📍 Layout Simulation"},
     "mount_view": {"th": "มุมมองการติดตั้ง:", "en": "Mounting View:"},
     "bottom": {"th": "ก้นถัง (Bottom)", "en": "Bottom"},
-    "side": {"th": "ข้างถัง (Side)", "en": "Side Wall"}
+    "side": {"th": "ข้างถัง (Side)", "en": "Side Wall"},
+    "head_labels": {"th": "แสดงความถี่บนหัว", "en": "Show head labels"},
+    "placement": {"th": "การจัดวางหัว:", "en": "Head placement:"},
+    "place_grid": {"th": "ตาราง (แบบเดิม)", "en": "Grid (classic)"},
+    "place_opt": {"th": "เกลี่ยสม่ำเสมอ (Optimized)", "en": "Uniform (optimized)"},
+    "place_err": {"th": "จัดวางแบบเกลี่ยไม่ได้ ใช้แบบตารางแทน", "en": "Optimized placement failed, showing the grid layout"},
+    "show_cov": {"th": "แสดงแผนที่ความเข้มคลื่น", "en": "Show coverage map"},
+    "blind": {"th": "🕳️ พื้นที่จุดบอด (ต่ำกว่า 50% ของค่าเฉลี่ย)", "en": "🕳️ Blind-spot volume (< 50% of mean)"},
+    "uniform": {"th": "📐 ความสม่ำเสมอ (ต่ำสุด/เฉลี่ย)", "en": "📐 Uniformity (min/mean)"},
+
+    # Batch
+    "batch_header": {"th": "📦 คำนวณหลายถังพร้อมกัน (Batch Design)", "en": "📦 Batch Design for Tank Fleets"},
+    "batch_upload": {"th": "อัปโหลดไฟล์ข้อมูลถัง (CSV / Parquet)", "en": "Upload tank list (CSV / Parquet)"},
+    "batch_help": {
+        "th": "คอลัมน์ที่ต้องมี: `L`, `W`, `water_level` (cm) | เลือกได้: `H`, `chem`, `heavy`, `w_board_28`, `h_board_28`, `w_board_40`, `h_board_40`, `target_density`, `ratio_28` (%) | ถ้าใส่ `n_b28` / `n_b40` จะเป็นโหมดตรวจสอบของที่มี",
+        "en": "Required columns: `L`, `W`, `water_level` (cm) | Optional: `H`, `chem`, `heavy`, `w_board_28`, `h_board_28`, `w_board_40`, `h_board_40`, `target_density`, `ratio_28` (%) | Rows with `n_b28` / `n_b40` are checked as existing systems"
+    },
+    "batch_defaults": {"th": "ค่าเริ่มต้น (ใช้เมื่อไม่มีคอลัมน์ในไฟล์)", "en": "Defaults (used when a column is missing)"},
+    "batch_rows": {"th": "จำนวนถัง", "en": "Tanks"},
+    "batch_passed": {"th": "ผ่านเกณฑ์", "en": "Passed"},
+    "batch_boards": {"th": "บอร์ดรวม (28k / 40k)", "en": "Total Boards (28k / 40k)"},
+    "batch_download": {"th": "⬇️ ดาวน์โหลด BOM (CSV)", "en": "⬇️ Download BOM (CSV)"},
+
+    # Sweep
+    "sweep_header": {"th": "📈 ไล่ค่าพารามิเตอร์ (Parametric Sweep)", "en": "📈 Parametric Sweep"},
+    "sweep_help": {"th": "ไล่ค่า 1-2 ตัวแปรพร้อมกันทั้งช่วง เส้นประ = ปริมาตรข้ามเกณฑ์ 10/20/50/100/190 L (ค่าแนะนำเปลี่ยนขั้น)",
+                   "en": "Vary one or two inputs over a range at once. Dashed lines = volume crossing the 10/20/50/100/190 L breakpoints (recommended W/L steps)."},
+    "sweep_x": {"th": "ตัวแปรแกน X", "en": "X-axis input"},
+    "sweep_y": {"th": "ตัวแปรแกน Y", "en": "Y-axis input"},
+    "sweep_2d": {"th": "ไล่ 2 ตัวแปร (Heatmap)", "en": "Sweep two inputs (heatmap)"},
+    "sweep_from": {"th": "จาก", "en": "From"},
+    "sweep_to": {"th": "ถึง", "en": "To"},
+    "sweep_steps": {"th": "จำนวนจุด", "en": "Steps"},
+    "sweep_metric": {"th": "ค่าที่แสดงใน Heatmap", "en": "Heatmap metric"},
+    "sweep_follow": {"th": "ใช้ค่า W/L แนะนำของแต่ละจุด", "en": "Use the recommended W/L at each point"},
+    "sweep_data": {"th": "ข้อมูลทั้งหมด", "en": "All data"},
+
+    # Line
+    "line_header": {"th": "🏭 วางแผนไลน์ล้างหลายถัง (Cleaning Line)", "en": "🏭 Cleaning Line Planner"},
+    "line_help": {"th": "แต่ละแถวคือหนึ่งถังในไลน์ (เช่น ล้างก่อน / ขจัดฟลักซ์ / ล้างน้ำ) target ว่าง = ใช้ค่าแนะนำ, ratio_28 เป็น %",
+                  "en": "One row per tank in the line (e.g. pre-wash / flux removal / rinse). Blank target = recommended, ratio_28 in %."},
+    "line_spec": {"th": "สเปคบอร์ดของทั้งไลน์", "en": "Board specs for the whole line"},
+    "line_tanks": {"th": "จำนวนถัง (ผ่านเกณฑ์)", "en": "Tanks (passed)"},
+    "line_bom": {"th": "📋 BOM รวมทั้งไลน์", "en": "📋 Combined Line BOM"},
+    "line_layouts": {"th": "ผังการติดตั้งทุกถัง", "en": "Layouts of every tank"},
+    "line_download": {"th": "⬇️ ดาวน์โหลดแผนไลน์ (CSV)", "en": "⬇️ Download line plan (CSV)"},
+
+    # Export
+    "export_btn": {"th": "📄 Export รายงาน (PDF + CSV BOM)", "en": "📄 Export report (PDF + CSV BOM)"},
+    "export_all_btn": {"th": "📄 Export รายงานทุกถัง (zip)", "en": "📄 Export all reports (zip)"},
+    "export_running": {"th": "กำลังสร้างรายงานเบื้องหลัง... ใช้งานหน้าอื่นต่อได้", "en": "Building reports in the background... you can keep working"},
+    "export_download": {"th": "⬇️ ดาวน์โหลดรายงาน (zip)", "en": "⬇️ Download reports (zip)"},
+
+    # Design store
+    "store_name": {"th": "ชื่อแบบ", "en": "Design name"},
+    "store_save": {"th": "💾 บันทึกแบบนี้", "en": "💾 Save this design"},
+    "store_save_all": {"th": "💾 บันทึกทุกแถวลงคลังแบบ", "en": "💾 Save all rows to the design store"},
+    "store_saved": {"th": "บันทึกแล้ว", "en": "Saved"},
+    "store_exists": {"th": "มีแบบนี้อยู่แล้ว (ไม่คำนวณซ้ำ)", "en": "Already saved (not recomputed)"},
+    "store_added": {"th": "เพิ่มแบบใหม่", "en": "New designs added"},
+    "store_header": {"th": "💾 คลังแบบที่บันทึกไว้", "en": "💾 Saved Design Store"},
+    "store_filter": {"th": "ตัวกรอง", "en": "Filters"},
+    "store_vol": {"th": "ปริมาตร (L) ต่ำสุด / สูงสุด", "en": "Volume (L) min / max"},
+    "store_density": {"th": "W/L จริง ต่ำสุด / สูงสุด", "en": "Actual W/L min / max"},
+    "store_boards28": {"th": "บอร์ด 28k ต่ำสุด / สูงสุด", "en": "28k boards min / max"},
+    "store_boards40": {"th": "บอร์ด 40k ต่ำสุด / สูงสุด", "en": "40k boards min / max"},
+    "store_result": {"th": "ผลประเมิน", "en": "Verdict"},
+    "store_all": {"th": "ทั้งหมด", "en": "All"},
+    "store_pass": {"th": "ผ่าน", "en": "Passed"},
+    "store_fail": {"th": "ไม่ผ่าน", "en": "Failed"},
+    "store_sort": {"th": "เรียงตาม", "en": "Sort by"},
+    "store_page": {"th": "หน้า", "en": "Page"},
+    "store_count": {"th": "แบบที่ตรงเงื่อนไข", "en": "Matching designs"},
+    "store_select": {"th": "เลือกแบบ (id) เพื่อเปรียบเทียบ", "en": "Select designs (id) to compare"},
+    "store_load": {"th": "📟 เปิดในหน้าคำนวณ", "en": "📟 Open in Calculator"},
+    "store_delete": {"th": "🗑️ ลบแบบที่เลือก", "en": "🗑️ Delete selected"},
+
+    # Profiling
+    "profile": {"th": "⏱️ จับเวลาการทำงาน (Profiling)", "en": "⏱️ Profiling"},
+    "profile_last": {"th": "rerun ล่าสุด (ms)", "en": "Last reruns (ms)"},
+    "profile_pct": {"th": "p50 / p95 ต่อขั้น (ms)", "en": "p50 / p95 per stage (ms)"},
 }
 
 def t(key):
     return T[key][lang]
 
+COV_LAYERS = 8  # จำนวนชั้นความลึกที่ใช้คิดพื้นที่จุดบอดแบบ 3D
+
 # ==========================================
-# 3. HELPER FUNCTIONS
+# 3. HELPER FUNCTIONS & STAGES
 # ==========================================
-def get_recommended_density(vol_liters, has_chem, heavy_load):
-    if vol_liters <= 10: base_wl = 35.0
-    elif vol_liters <= 20: base_wl = 30.0
-    elif vol_liters <= 50: base_wl = 25.0
-    elif vol_liters <= 100: base_wl = 20.0
-    elif vol_liters <= 190: base_wl = 10.0
-    else: base_wl = 5.3 
-
-    if has_chem: base_wl *= 0.7
-    if heavy_load: base_wl *= 1.15
-    return round(base_wl, 1)
-
-def draw_tank(l, h_limit, h_list, title, side=False, tank_h=0, water_h=0, off=False):
-    fig, ax = plt.subplots(figsize=(6, 4))
-    ax.set_title(title, fontsize=10, weight='bold')
-    
-    if side:
-        ax.add_patch(patches.Rectangle((0,0), l, tank_h, fc='#eeeeee', ec='#444', lw=2))
-        ax.add_patch(patches.Rectangle((0,0), l, water_h, fc='#b3e5fc', alpha=0.6))
-        ax.axhline(y=water_h, color='#0277bd', linestyle='--', lw=1)
-        area_h = water_h
+# สูตรคำนวณทั้งหมดอยู่ใน core.py (เรียกใช้ได้โดยไม่ต้องเปิด Streamlit)
+# ส่วนวาดผังอยู่ใน render.py และ import เมื่อเปิดหน้าคำนวณเท่านั้น
+#
+# หน้าคำนวณแบ่งเป็นขั้น: inputs -> sizing -> BOM -> layout -> plots
+# - ผลคำนวณไม่ขึ้นกับภาษา จึงแคชไว้ (เปลี่ยนภาษา = เปลี่ยนแค่ป้ายกำกับ)
+# - ส่วน optimizer และผังการจัดวางเป็น st.fragment: กดปุ่มในส่วนนั้น rerun เฉพาะส่วนนั้น
+@st.cache_data(max_entries=1024, show_spinner=False)
+def stage_sizing(inputs):
+    return size_tank(**inputs)
+
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def stage_heads(n_h28, n_h40):
+    return head_list(n_h28, n_h40)
+
+
+@st.fragment
+def optimizer_section(vol, target_density, ratio_28, w_board_28, h_board_28, w_board_40, h_board_40):
+    with st.expander(t("opt_header")):
+        import optimizer
+
+        st.caption(t("opt_help"))
+        catalog = st.data_editor([
+            {"name": "28k (spec)", "freq": 28, "watts": w_board_28, "heads": h_board_28, "price": 0.0},
+            {"name": "40k (spec)", "freq": 40, "watts": w_board_40, "heads": h_board_40, "price": 0.0},
+        ], num_rows="dynamic", key="opt_catalog")
+        c_op1, c_op2 = st.columns(2)
+        with c_op1:
+            objective = st.radio(t("opt_objective"), optimizer.OBJECTIVES, horizontal=True, key="opt_objective",
+                                 format_func=lambda o: t("opt_cost") if o == "cost" else t("opt_over"))
+        with c_op2:
+            tol = st.slider(t("opt_tol"), 0, 50, 10, key="opt_tol") / 100
+        try:
+            mixes = optimizer.optimize_mix(catalog, vol, target_density,
+                                           max(ratio_28 - tol, 0.0), min(ratio_28 + tol, 1.0), objective)
+        except ValueError as e:
+            st.error(str(e))
+        else:
+            if mixes.empty:
+                st.warning(t("opt_none"))
+            else:
+                st.dataframe(mixes, hide_index=True)
+
+
+@st.fragment
+def tolerance_section(inputs, res):
+    with st.expander(t("tol_header")):
+        import tolerance
+        from render import render_tolerance
+
+        st.caption(t("tol_help"))
+        d = tolerance.TOLERANCES
+        c1, c2, c3, c4, c5 = st.columns(5)
+        tol = {
+            "watt_mean": c1.number_input(t("tol_watt_mean"), 0.0, 150.0, d["watt_mean"] * 100, 1.0, key="tol_watt_mean") / 100,
+            "watt_sd": c2.number_input(t("tol_watt_sd"), 0.0, 50.0, d["watt_sd"] * 100, 0.5, key="tol_watt_sd") / 100,
+            "level_sd": c3.number_input(t("tol_level_sd"), 0.0, 50.0, d["level_sd"], 0.1, key="tol_level_sd"),
+            "head_fail": c4.number_input(t("tol_head_fail"), 0.0, 100.0, d["head_fail"] * 100, 0.5, key="tol_head_fail") / 100,
+        }
+        trials = c5.selectbox(t("tol_trials"), (100_000, 1_000_000, 5_000_000), index=1, format_func="{:,}".format,
+                              key="tol_trials")
+        # ไม่คำนวณเองทุก rerun (เปิดหน้าคำนวณแล้วไม่ต้องรอ) แต่ผลถูกแคชไว้ กดซ้ำด้วยค่าเดิมได้ทันที
+        if not st.toggle(t("tol_run"), key="tol_on"):
+            return
+        with profiling.span("tolerance.simulate"):
+            mc = tolerance.simulate(res, inputs, trials, **tol)
+        k1, k2, k3 = st.columns(3)
+        k1.metric(t("tol_p_pass"), f"{mc['p_pass'] * 100:.2f} %")
+        k2.metric(t("tol_mean"), f"{mc['mean']:.2f} W/L", delta=f"{mc['mean'] - mc['nominal_density']:.2f}")
+        k3.metric(t("tol_p5"), f"{mc['percentiles'][5]:.2f} W/L", delta=f"{mc['percentiles'][5] - mc['threshold']:.2f}")
+        st.image(render_tolerance(mc), width="stretch")
+
+
+@st.fragment
+def thermal_section(inputs, res):
+    with st.expander(t("th_header")):
+        import pandas as pd
+        import thermal
+        from render import render_thermal
+
+        st.caption(t("th_help"))
+        c1, c2, c3 = st.columns(3)
+        horizon = c1.radio(t("th_horizon"), list(thermal.HORIZONS), horizontal=True, key="th_horizon",
+                           format_func=lambda h: t(f"th_{h}"))
+        duties = c2.multiselect(t("th_duties"), list(range(5, 101, 5)),
+                                default=[int(d * 100) for d in thermal.DUTIES], key="th_duties")
+        cycle_min = c3.number_input(t("th_cycle"), 1.0, 240.0, 10.0, 1.0, key="th_cycle")
+        c4, c5, c6, c7 = st.columns(4)
+        shift_h = c4.number_input(t("th_shift_h"), 0.0, 24.0, 8.0, 0.5, key="th_shift_h")
+        work_days = c5.number_input(t("th_days"), 0, 7, 5, key="th_days")
+        ambient = c6.number_input(t("th_ambient"), -10.0, 50.0, thermal.AMBIENT, 1.0, key="th_ambient")
+        limit = c7.number_input(t("th_limit"), 0.0, 100.0, 50.0, 1.0, key="th_limit")
+        # จำลองเมื่อเปิดเท่านั้น (สัปดาห์หนึ่งใช้เวลาราวครึ่งวินาที) ผลถูกแคชไว้
+        if not st.toggle(t("th_run"), key="th_on") or not duties:
+            return
+        if res["vol"] <= 0:
+            st.info(t("th_no_water"))
+            return
+        try:
+            with profiling.span("thermal.simulate"):
+                sim = thermal.simulate(res, inputs, [d / 100 for d in sorted(duties)], thermal.HORIZONS[horizon],
+                                       cycle_min, shift_h, work_days, ambient, limit)
+        except ValueError as e:
+            st.error(str(e))
+            return
+        g1, g2 = st.columns([3, 2])
+        g1.image(render_thermal(sim), width="stretch")
+        g2.dataframe(pd.DataFrame({
+            t("th_duty"): sim["duties"] * 100,
+            t("th_max"): sim["max_temp"],
+            t("th_final"): sim["final_temp"],
+            t("th_above"): sim["hours_above"],
+            t("th_run_h"): sim["run_hours"],
+            t("th_kwh"): sim["total_kwh"],
+            t("th_evap"): sim["evaporated_l"][:, -1],
+        }).round(2), hide_index=True)
+
+
+@st.cache_resource
+def get_store():
+    # เปิดฐานข้อมูลครั้งเดียวต่อ process ไม่โหลดใหม่ทุก rerun
+    from store import DesignStore
+    return DesignStore()
+
+
+def store_section(inputs):
+    c_s1, c_s2 = st.columns([3, 2])
+    name = c_s1.text_input(t("store_name"), key="store_name", label_visibility="collapsed", placeholder=t("store_name"))
+    if c_s2.button(t("store_save"), key="store_save"):
+        _, h, cached = get_store().size(inputs, name)
+        (st.info if cached else st.success)(f"{t('store_exists') if cached else t('store_saved')}: {h[:10]}")
+
+
+def load_design(row):
+    # on_click: ตั้งค่า widget ของหน้าคำนวณก่อน rerun ถัดไปแล้วสลับหน้า
+    ss = st.session_state
+    ss.update(L=row["l"], W=row["w"], water_level=row["water_level"], use_chem=row["use_chem"],
+              heavy_load=row["heavy_load"], w_board_28=row["w_board_28"], h_board_28=row["h_board_28"],
+              w_board_40=row["w_board_40"], h_board_40=row["h_board_40"], mode=row["mode"], page="calc")
+    if row["mode"] == "check":
+        ss.update(n_b28=row["n_b28"], n_b40=row["n_b40"])
     else:
-        ax.add_patch(patches.Rectangle((0,0), l, h_limit, fc='#e1f5fe', ec='#444', lw=2))
-        area_h = h_limit
-    
-    n = len(h_list)
-    if n > 0 and area_h > 0:
-        cols = math.ceil(math.sqrt(n * (l / area_h)))
-        rows = math.ceil(n / cols)
-        sp_x = l / (cols + 1)
-        sp_y = area_h / (rows + 1)
-        
-        for r in range(rows):
-            for c in range(cols):
-                cnt = r * cols + c
-                if cnt < n:
-                    fq = h_list[cnt]
-                    base_x = (c + 1) * sp_x
-                    base_y = (r + 1) * sp_y
-                    stagger = (sp_x / 2) if (r % 2 != 0) else 0
-                    offset_side = (sp_x / 2) if off else 0
-                    
-                    x = base_x + stagger + offset_side
-                    if x > l - (sp_x / 2): x = x - l + (sp_x / 2)
-                    y = base_y
-                    
-                    c_node = '#d32f2f' if fq == 28 else '#1976d2'
-                    ax.add_patch(plt.Circle((x, y), 2.5, color=c_node, ec='white', alpha=0.9))
-                    ax.text(x, y, str(fq), color='white', ha='center', va='center', fontsize=7, weight='bold')
-                    
-    ax.set_xlim(-2, l + 2)
-    ax.set_ylim(-2, (tank_h if side else h_limit) + 2)
-    ax.set_aspect('equal')
-    return fig
+        rec = get_recommended_density(tank_volume(row["l"], row["w"], row["water_level"]),
+                                      row["use_chem"], row["heavy_load"])
+        ss[f"target_{rec}"] = row["target_density"]
+        ss["ratio_28"] = int(round(row["ratio_28"] * 100))
+
+
+def delete_designs(ids):
+    get_store().delete(ids)
+    st.session_state["sf_pick"] = []
+
+
+def export_section(job_key, label, make_designs, total, filename):
+    # ปุ่ม export: สร้างรายงานใน thread เบื้องหลัง เก็บงานไว้ใน session แล้วคอยดูความคืบหน้า
+    import report
+
+    job = st.session_state.get(job_key)
+    running = job is not None and not job.done()
+    if st.button(t(label), key=f"{job_key}_btn", disabled=running):
+        if job is not None:
+            job.cleanup()
+        job = st.session_state[job_key] = report.ExportJob(make_designs(), total, filename)
+        running = True
+    if job is None:
+        return
+    if running:
+        export_progress(job_key)
+        return
+    try:
+        data = job.result()
+    except Exception as e:
+        st.error(str(e))
+    else:
+        st.download_button(t("export_download"), data, file_name=job.filename, mime="application/zip",
+                           key=f"{job_key}_dl")
+
+
+@st.fragment(run_every=1.0)
+def export_progress(job_key):
+    # rerun เฉพาะส่วนนี้ทุกวินาทีจนงานเสร็จ แล้ว rerun ทั้งหน้าครั้งเดียวเพื่อแสดงปุ่มดาวน์โหลด
+    job = st.session_state[job_key]
+    if job.done():
+        st.rerun()
+    st.progress(job.completed / job.total if job.total else 0.0, text=t("export_running"))
+
+
+def layout_images(mount, layout, L, W, H_tank, water_level, heads_list, labels, cov):
+    from render import render_tank
+
+    if mount == "bottom":
+        # หัวติดก้นถัง: คลื่นเดินขึ้นผ่านความลึกน้ำ
+        cov = dict(cov, depth=water_level) if cov else None
+        imgs = [render_tank(L, W, heads_list, f"Bottom View ({len(heads_list)} Heads)", labels=labels,
+                            coverage=cov, layout=layout)]
+        faces = [(W, heads_list, False)]
+    else:
+        # หัวติดข้างถัง: แต่ละด้านรับผิดชอบครึ่งความกว้างถัง
+        cov = dict(cov, depth=W / 2) if cov else None
+        mid = len(heads_list)//2
+        imgs = [render_tank(L, water_level, heads_list[:mid], "Side A", True, H_tank, water_level, labels=labels,
+                            coverage=cov, layout=layout),
+                render_tank(L, water_level, heads_list[mid:], "Side B", True, H_tank, water_level, True, labels,
+                            coverage=cov, layout=layout)]
+        faces = [(water_level, heads_list[:mid], False), (water_level, heads_list[mid:], True)]
+    return imgs, cov, faces
+
+
+@st.fragment
+def layout_section(L, W, H_tank, water_level, n_h28, n_h40, w_head):
+    st.subheader(t("layout"))
+    c_lay1, c_lay2 = st.columns([3, 1])
+    with c_lay1:
+        mount_opt = st.radio(t("mount_view"), ["bottom", "side"], horizontal=True,
+                             format_func=t, key="mount_view")
+        layout = st.radio(t("placement"), ["grid", "optimized"], horizontal=True, key="placement",
+                          format_func=lambda m: t("place_grid") if m == "grid" else t("place_opt"))
+    with c_lay2:
+        show_labels = st.checkbox(t("head_labels"), value=True, key="head_labels")
+        show_cov = st.checkbox(t("show_cov"), value=False, key="show_cov")
+    heads_list = stage_heads(n_h28, n_h40)
+    cov = {"w_head": w_head, "layers": COV_LAYERS} if show_cov else None
+
+    with profiling.span("layout.render"):
+        try:
+            imgs, cov, cov_faces = layout_images(mount_opt, layout, L, W, H_tank, water_level, heads_list, show_labels, cov)
+        except ValueError:
+            st.warning(t("place_err"))
+            layout = "grid"
+            imgs, cov, cov_faces = layout_images(mount_opt, layout, L, W, H_tank, water_level, heads_list, show_labels, cov)
+    for g, img in zip(st.columns(len(imgs)), imgs):
+        g.image(img, width="stretch")
+
+    if show_cov:
+        from acoustic import coverage_map
+
+        with profiling.span("layout.coverage"):
+            stats = [coverage_map(L, area_h, hl, off, layout=layout, **cov)[1] for area_h, hl, off in cov_faces]
+        k1, k2 = st.columns(2)
+        k1.metric(t("blind"), f"{sum(s['below_pct'] for s in stats) / len(stats):.1f} %")
+        k2.metric(t("uniform"), f"{min(s['uniformity'] for s in stats):.2f}")
 
 # ==========================================
 # 4. MAIN APP LAYOUT
 # ==========================================
+profiling.lap("setup")
 st.title(t("title"))
 st.caption(t("caption"))
 
 # เมนูนำทาง
-page = st.sidebar.radio(t("nav_header"), [t("nav_manual"), t("nav_calc")])
+page = st.sidebar.radio(t("nav_header"), ["manual", "calc", "batch", "sweep", "line", "store"],
+                        format_func=lambda p: t(f"nav_{p}"), key="page")
 st.sidebar.divider()
 
 # ==========================================
 # PAGE: MANUAL
 # ==========================================
-if page == t("nav_manual"):
+if page == "manual":
+    import pandas as pd
+
     if lang == "th":
         # --- เนื้อหาภาษาไทย (คงเดิมตามที่คุณแก้มา) ---
         st.header("📘 องค์ความรู้และการออกแบบ (Engineering Manual)")
@@ -194,12 +528,13 @@ if page == t("nav_manual"):
             ### 📊 ความสำคัญของ Watts per Liter (W/L)
             **ตารางมาตรฐานสำหรับงานขจัดคราบฟลักซ์ (Heavy Duty):**
             """)
-            df_std = pd.DataFrame({
-                "ขนาดถัง (Liters)": ["10 L", "20 L", "50 L", "100 L", "> 190 L (Large Tank)"],
-                "ค่าแนะนำ (W/L)": ["30 - 35 W/L", "25 - 30 W/L", "20 - 25 W/L", "15 - 20 W/L", "~5.3 W/L"],
-                "Watt รวมโดยประมาณ": ["300-350 W", "500-600 W", "1000-1250 W", "1500-2000 W", "Low Density"]
-            })
-            st.table(df_std)
+            with profiling.span("manual.tables"):
+                df_std = pd.DataFrame({
+                    "ขนาดถัง (Liters)": ["10 L", "20 L", "50 L", "100 L", "> 190 L (Large Tank)"],
+                    "ค่าแนะนำ (W/L)": ["30 - 35 W/L", "25 - 30 W/L", "20 - 25 W/L", "15 - 20 W/L", "~5.3 W/L"],
+                    "Watt รวมโดยประมาณ": ["300-350 W", "500-600 W", "1000-1250 W", "1500-2000 W", "Low Density"]
+                })
+                st.table(df_std)
             st.caption("*ข้อมูลอ้างอิงจาก Blackstone-Ney และ Mastersonics")
         with tab3:
             st.markdown("""
@@ -279,12 +614,13 @@ if page == t("nav_manual"):
             ### 📊 Watts per Liter (W/L) Importance
             **Standard for Heavy Duty Flux Removal:**
             """)
-            df_std = pd.DataFrame({
-                "Tank Size (Liters)": ["10 L", "20 L", "50 L", "100 L", "> 190 L (Large Tank)"],
-                "Rec. Value (W/L)": ["30 - 35 W/L", "25 - 30 W/L", "20 - 25 W/L", "15 - 20 W/L", "~5.3 W/L"],
-                "Approx Total Watt": ["300-350 W", "500-600 W", "1000-1250 W", "1500-2000 W", "Low Density"]
-            })
-            st.table(df_std)
+            with profiling.span("manual.tables"):
+                df_std = pd.DataFrame({
+                    "Tank Size (Liters)": ["10 L", "20 L", "50 L", "100 L", "> 190 L (Large Tank)"],
+                    "Rec. Value (W/L)": ["30 - 35 W/L", "25 - 30 W/L", "20 - 25 W/L", "15 - 20 W/L", "~5.3 W/L"],
+                    "Approx Total Watt": ["300-350 W", "500-600 W", "1000-1250 W", "1500-2000 W", "Low Density"]
+                })
+                st.table(df_std)
         with tab3:
             st.markdown("""
             ### 🛠️ Mounting Comparison
@@ -322,24 +658,25 @@ if page == t("nav_manual"):
             
             **4. Mass Load Factor:** Copper absorbs sound; add **10-15%** power to compensate.
             """)
+    profiling.lap("manual")
 
 # ==========================================
 # PAGE: CALCULATOR (โปรแกรมคำนวณ)
 # ==========================================
-elif page == t("nav_calc"):
-    # --- Sidebar Inputs ---
+elif page == "calc":
+    # --- Stage 1: Inputs (Sidebar) ---
     st.sidebar.header(t("tank_header"))
     # ใช้ค่าเดิมของคุณ (170, 80, 50, 10)
-    L = st.sidebar.number_input(t("L"), value=170.0, step=1.0)
-    W = st.sidebar.number_input(t("W"), value=80.0, step=1.0)
-    H_tank = st.sidebar.number_input(t("H"), value=50.0, step=1.0)
-    water_level = st.sidebar.number_input(t("level"), value=10.0, step=1.0)
+    L = st.sidebar.number_input(t("L"), value=170.0, step=1.0, key="L")
+    W = st.sidebar.number_input(t("W"), value=80.0, step=1.0, key="W")
+    H_tank = st.sidebar.number_input(t("H"), value=50.0, step=1.0, key="H_tank")
+    water_level = st.sidebar.number_input(t("level"), value=10.0, step=1.0, key="water_level")
     
     st.sidebar.header(t("cond_header"))
-    use_chem = st.sidebar.checkbox(t("chem"), value=True, help=t("chem_help"))
-    heavy_load = st.sidebar.checkbox(t("heavy"), value=True, help=t("heavy_help"))
+    use_chem = st.sidebar.checkbox(t("chem"), value=True, help=t("chem_help"), key="use_chem")
+    heavy_load = st.sidebar.checkbox(t("heavy"), value=True, help=t("heavy_help"), key="heavy_load")
     
-    vol = (L * W * water_level) / 1000
+    vol = tank_volume(L, W, water_level)
     rec_density = get_recommended_density(vol, use_chem, heavy_load)
 
     # --- MAIN PAGE: DESIGN & HARDWARE ---
@@ -349,54 +686,53 @@ elif page == t("nav_calc"):
     st.markdown(f"**{t('spec_header')}**")
     col_spec1, col_spec2 = st.columns(2)
     with col_spec1:
-        w_board_28 = st.number_input(f"{t('w_board')} (28k)", value=120.0, step=10.0)
-        h_board_28 = st.number_input(f"{t('h_board')} (28k)", value=2, min_value=1)
+        w_board_28 = st.number_input(f"{t('w_board')} (28k)", value=120.0, step=10.0, key="w_board_28")
+        h_board_28 = st.number_input(f"{t('h_board')} (28k)", value=2, min_value=1, key="h_board_28")
     with col_spec2:
-        w_board_40 = st.number_input(f"{t('w_board')} (40k)", value=120.0, step=10.0)
-        h_board_40 = st.number_input(f"{t('h_board')} (40k)", value=3, min_value=1)
+        w_board_40 = st.number_input(f"{t('w_board')} (40k)", value=120.0, step=10.0, key="w_board_40")
+        h_board_40 = st.number_input(f"{t('h_board')} (40k)", value=3, min_value=1, key="h_board_40")
     
     st.markdown("---")
     
-    mode = st.radio(t("mode_label"), [t("mode_new"), t("mode_check")], horizontal=True)
-    
-    n_b28, n_b40 = 0, 0
-    target_density = 0.0
-    actual_density = 0.0
+    mode = st.radio(t("mode_label"), ["new", "check"], horizontal=True,
+                    format_func=lambda m: t(f"mode_{m}"), key="mode")
+    inputs = {"l": L, "w": W, "water_level": water_level, "use_chem": use_chem, "heavy_load": heavy_load,
+              "w_board_28": w_board_28, "h_board_28": h_board_28,
+              "w_board_40": w_board_40, "h_board_40": h_board_40, "mode": mode}
     
-    if mode == t("mode_new"):
+    if mode == "new":
         col_in1, col_in2 = st.columns(2)
         with col_in1:
             st.info(f"{t('rec_val')}: **{rec_density} W/L**")
-            target_density = st.number_input(t("target"), value=rec_density, step=0.5)
+            # key ผูกกับค่าแนะนำ: เปลี่ยนเงื่อนไขแล้วรีเซ็ตเป็นค่าแนะนำใหม่ แต่เปลี่ยนภาษาไม่รีเซ็ต
+            target_density = st.number_input(t("target"), value=rec_density, step=0.5, key=f"target_{rec_density}")
         with col_in2:
-            ratio_28 = st.slider(t("ratio"), 0, 100, 70) / 100
-        
-        total_p_req = vol * target_density
-        p_28 = total_p_req * ratio_28
-        p_40 = total_p_req * (1 - ratio_28)
-        
-        n_b28 = math.ceil(p_28 / w_board_28) if p_28 > 0 else 0
-        n_b40 = math.ceil(p_40 / w_board_40) if p_40 > 0 else 0
-        if p_40 > 0 and n_b40 == 0: n_b40 = 1
-        
-        real_total_w = (n_b28 * w_board_28) + (n_b40 * w_board_40)
-        actual_density = real_total_w / vol if vol > 0 else 0
-        
+            ratio_28 = st.slider(t("ratio"), 0, 100, 70, key="ratio_28") / 100
+        inputs.update(target_density=target_density, ratio_28=ratio_28)
     else:
         st.warning(f"{t('compare_msg')}: **{rec_density} W/L**")
         c_ex1, c_ex2 = st.columns(2)
         with c_ex1:
-            n_b28 = st.number_input(f"{t('qty_exist')} (28k)", value=3, min_value=0)
+            n_b28 = st.number_input(f"{t('qty_exist')} (28k)", value=3, min_value=0, key="n_b28")
         with c_ex2:
-            n_b40 = st.number_input(f"{t('qty_exist')} (40k)", value=1, min_value=0)
-            
-        real_total_w = (n_b28 * w_board_28) + (n_b40 * w_board_40)
-        actual_density = real_total_w / vol if vol > 0 else 0
-        target_density = rec_density
+            n_b40 = st.number_input(f"{t('qty_exist')} (40k)", value=1, min_value=0, key="n_b40")
+        inputs.update(n_b28=n_b28, n_b40=n_b40)
+
+    profiling.lap("calc.inputs")
+
+    # --- Stage 2: Sizing ---
+    res = stage_sizing(inputs)
+    if mode == "new":
+        optimizer_section(vol, target_density, ratio_28, w_board_28, h_board_28, w_board_40, h_board_40)
+    profiling.lap("calc.sizing")
 
-    n_h28 = int(n_b28 * h_board_28)
-    n_h40 = int(n_b40 * h_board_40)
+    n_b28, n_b40 = res["n_b28"], res["n_b40"]
+    n_h28, n_h40 = res["n_h28"], res["n_h40"]
+    real_total_w = res["real_total_w"]
+    actual_density = res["actual_density"]
+    target_density = res["target_density"]
     
+    # --- Stage 3: Metrics & BOM ---
     st.markdown("---")
     m1, m2, m3 = st.columns(3)
     m1.metric(t("vol"), f"{vol:.2f} L")
@@ -406,7 +742,7 @@ elif page == t("nav_calc"):
     c_an1, c_an2 = st.columns([2, 1])
     with c_an1:
         st.subheader(t("analysis"))
-        if actual_density >= (target_density * 0.95):
+        if res["passed"]:
             st.success(f"{t('pass')} ({actual_density:.2f} W/L)")
         else:
             st.error(f"{t('fail')} ({t('fail_msg')} {target_density - actual_density:.1f} W/L)")
@@ -421,18 +757,256 @@ elif page == t("nav_calc"):
             <p style="margin:0; font-size:16px;"><b>🔵 40 kHz:</b> {n_b40} <span style="font-size:14px; color:#333;">(= {n_h40})</span></p>
         </div>
         """, unsafe_allow_html=True)
+        import report
+        design = report.make_design("Tank", inputs, H_tank, st.session_state.get("mount_view", "bottom"),
+                                    st.session_state.get("placement", "grid"))
+        export_section("export_calc", "export_btn", lambda: [design], 1, "ultrasonic_report.zip")
+        store_section(inputs)
+    profiling.lap("calc.bom")
 
-    st.subheader(t("layout"))
-    mount_opt = st.radio(t("mount_view"), [t("bottom"), t("side")], horizontal=True)
-    heads_list = [28]*n_h28 + [40]*n_h40
-    random.seed(42); random.shuffle(heads_list)
-    
-    if mount_opt == t("bottom"):
-        st.pyplot(draw_tank(L, W, heads_list, f"Bottom View ({len(heads_list)} Heads)"))
+    tolerance_section(inputs, res)
+    thermal_section(inputs, res)
+
+    # --- Stage 4-5: Layout & Plots (fragment) ---
+    layout_section(L, W, H_tank, water_level, n_h28, n_h40,
+                   ((28, w_board_28 / h_board_28), (40, w_board_40 / h_board_40)))
+    profiling.lap("calc.layout")
+
+# ==========================================
+# PAGE: BATCH (คำนวณหลายถัง)
+# ==========================================
+elif page == "batch":
+    import batch
+
+    st.subheader(t("batch_header"))
+    st.caption(t("batch_help"))
+
+    with st.expander(t("batch_defaults")):
+        col_d1, col_d2, col_d3 = st.columns(3)
+        with col_d1:
+            d_chem = st.checkbox(t("chem"), value=batch.DEFAULTS["chem"], key="b_chem")
+            d_heavy = st.checkbox(t("heavy"), value=batch.DEFAULTS["heavy"], key="b_heavy")
+            d_ratio = st.slider(t("ratio"), 0, 100, int(batch.DEFAULTS["ratio_28"]), key="b_ratio")
+        with col_d2:
+            d_w28 = st.number_input(f"{t('w_board')} (28k)", value=batch.DEFAULTS["w_board_28"], step=10.0, key="b_w28")
+            d_h28 = st.number_input(f"{t('h_board')} (28k)", value=batch.DEFAULTS["h_board_28"], min_value=1, key="b_h28")
+        with col_d3:
+            d_w40 = st.number_input(f"{t('w_board')} (40k)", value=batch.DEFAULTS["w_board_40"], step=10.0, key="b_w40")
+            d_h40 = st.number_input(f"{t('h_board')} (40k)", value=batch.DEFAULTS["h_board_40"], min_value=1, key="b_h40")
+
+    upload = st.file_uploader(t("batch_upload"), type=["csv", "parquet", "pq"])
+    if upload is not None:
+        try:
+            with profiling.span("batch.sizing"):
+                bom = batch.design_batch(batch.read_tanks(upload), {
+                    "chem": d_chem, "heavy": d_heavy, "ratio_28": float(d_ratio),
+                    "w_board_28": d_w28, "h_board_28": d_h28,
+                    "w_board_40": d_w40, "h_board_40": d_h40,
+                })
+        except Exception as e:
+            st.error(str(e))
+        else:
+            m1, m2, m3 = st.columns(3)
+            m1.metric(t("batch_rows"), f"{len(bom):,}")
+            m2.metric(t("batch_passed"), f"{int(bom['passed'].sum()):,} / {len(bom):,}")
+            m3.metric(t("batch_boards"), f"{int(bom['n_b28'].sum()):,} / {int(bom['n_b40'].sum()):,}")
+            st.dataframe(bom)
+            st.download_button(t("batch_download"), bom.to_csv(index=False).encode("utf-8"),
+                               file_name="ultrasonic_bom.csv", mime="text/csv")
+            import report
+            export_section("export_batch", "export_all_btn", lambda: report.designs_from_plan(bom), len(bom),
+                           "ultrasonic_batch_reports.zip")
+            if st.button(t("store_save_all"), key="store_save_all"):
+                added = get_store().save_many((batch.row_inputs(r), batch.row_result(r), r.get("name"))
+                                              for r in bom.to_dict("records"))
+                st.success(f"{t('store_added')}: {added:,} / {len(bom):,}")
+    profiling.lap("batch")
+
+# ==========================================
+# PAGE: SWEEP (ไล่ค่าพารามิเตอร์)
+# ==========================================
+elif page == "sweep":
+    import pandas as pd
+    import sweep
+    from render import render_sweep
+
+    st.subheader(t("sweep_header"))
+    st.caption(t("sweep_help"))
+
+    # ค่าคงที่ของตัวแปรที่ไม่ได้ไล่
+    st.sidebar.header(t("tank_header"))
+    base = {
+        "L": st.sidebar.number_input(t("L"), value=sweep.BASE["L"], step=1.0, key="sw_L"),
+        "W": st.sidebar.number_input(t("W"), value=sweep.BASE["W"], step=1.0, key="sw_W"),
+        "water_level": st.sidebar.number_input(t("level"), value=sweep.BASE["water_level"], step=1.0, key="sw_level"),
+    }
+    st.sidebar.header(t("cond_header"))
+    base["use_chem"] = st.sidebar.checkbox(t("chem"), value=True, key="sw_chem")
+    base["heavy_load"] = st.sidebar.checkbox(t("heavy"), value=True, key="sw_heavy")
+    base["w_board_28"] = st.sidebar.number_input(f"{t('w_board')} (28k)", value=sweep.BASE["w_board_28"], step=10.0, key="sw_w28")
+    base["w_board_40"] = st.sidebar.number_input(f"{t('w_board')} (40k)", value=sweep.BASE["w_board_40"], step=10.0, key="sw_w40")
+    base["ratio_28"] = float(st.sidebar.slider(t("ratio"), 0, 100, int(sweep.BASE["ratio_28"]), key="sw_ratio"))
+    if st.sidebar.checkbox(t("sweep_follow"), value=True, key="sw_follow"):
+        base["target_density"] = None
     else:
-        mid = len(heads_list)//2
-        g1, g2 = st.columns(2)
-        g1.pyplot(draw_tank(L, water_level, heads_list[:mid], "Side A", True, H_tank, water_level))
-        g2.pyplot(draw_tank(L, water_level, heads_list[mid:], "Side B", True, H_tank, water_level, True))
+        base["target_density"] = st.sidebar.number_input(t("target"), value=15.0, step=0.5, key="sw_target")
+
+    labels = {"water_level": t("level"), "L": t("L"), "W": t("W"), "ratio_28": t("ratio"), "target_density": t("target"),
+              "w_board_28": f"{t('w_board')} (28k)", "w_board_40": f"{t('w_board')} (40k)"}
+
+    def axis_inputs(label, options, key):
+        c1, c2, c3, c4 = st.columns([2, 1, 1, 1])
+        name = c1.selectbox(label, options, format_func=labels.get, key=key)
+        # key ผูกกับตัวแปร: เปลี่ยนตัวแปรแล้วได้ช่วงเริ่มต้นของตัวแปรนั้น
+        lo, hi = sweep.PARAMS[name][1]
+        lo = c2.number_input(t("sweep_from"), value=lo, key=f"{key}_lo_{name}")
+        hi = c3.number_input(t("sweep_to"), value=hi, key=f"{key}_hi_{name}")
+        steps = c4.number_input(t("sweep_steps"), value=500, min_value=2, max_value=sweep.MAX_STEPS, key=f"{key}_n")
+        return (name, lo, hi, int(steps))
+
+    x = axis_inputs(t("sweep_x"), list(sweep.PARAMS), "sw_x")
+    y, metric = None, "actual_density"
+    if st.checkbox(t("sweep_2d"), key="sw_2d"):
+        y = axis_inputs(t("sweep_y"), [p for p in sweep.PARAMS if p != x[0]], "sw_y")
+        metric = st.selectbox(t("sweep_metric"), sweep.METRICS, index=sweep.METRICS.index("actual_density"),
+                              key="sw_metric")
+
+    with profiling.span("sweep.compute"):
+        res = sweep.sweep(base, x, y)
+    with profiling.span("sweep.render"):
+        img = render_sweep(base, x, y, metric)
+    st.image(img, width="stretch")
+
+    m1, m2, m3 = st.columns(3)
+    m1.metric(t("density"), f"{res['actual_density'].min():.2f} - {res['actual_density'].max():.2f} W/L")
+    m2.metric(t("vol"), f"{res['vol'].min():.1f} - {res['vol'].max():.1f} L")
+    m3.metric(t("p_total"), f"{res['total_w'].min():.0f} - {res['total_w'].max():.0f} W")
+    if y is None:
+        with st.expander(t("sweep_data")):
+            st.dataframe(pd.DataFrame({x[0]: res["x"], **{m: res[m] for m in sweep.METRICS}}), hide_index=True)
+    profiling.lap("sweep")
+
+# ==========================================
+# PAGE: LINE (ไลน์ล้างหลายถัง)
+# ==========================================
+elif page == "line":
+    import line
+
+    st.subheader(t("line_header"))
+    st.caption(t("line_help"))
+
+    with st.expander(t("line_spec")):
+        col_l1, col_l2 = st.columns(2)
+        with col_l1:
+            l_w28 = st.number_input(f"{t('w_board')} (28k)", value=120.0, step=10.0, key="l_w28")
+            l_h28 = st.number_input(f"{t('h_board')} (28k)", value=2, min_value=1, key="l_h28")
+        with col_l2:
+            l_w40 = st.number_input(f"{t('w_board')} (40k)", value=120.0, step=10.0, key="l_w40")
+            l_h40 = st.number_input(f"{t('h_board')} (40k)", value=3, min_value=1, key="l_h40")
 
+    tanks = st.data_editor(line.EXAMPLE, num_rows="dynamic", key="line_tanks", column_order=line.COLUMNS,
+                           column_config={"mount": st.column_config.SelectboxColumn(options=line.MOUNTS, default="bottom"),
+                                          "ratio_28": st.column_config.NumberColumn(min_value=0, max_value=100, default=70.0)})
+    tanks = [r for r in tanks if all(r.get(c) is not None for c in ("L", "W", "water_level"))]
+    if tanks:
+        try:
+            with profiling.span("line.sizing"):
+                plan = line.plan_line(tanks, {"w_board_28": l_w28, "h_board_28": l_h28,
+                                              "w_board_40": l_w40, "h_board_40": l_h40})
+        except ValueError as e:
+            st.error(str(e))
+        else:
+            tot = line.line_totals(plan)
+            m1, m2, m3, m4 = st.columns(4)
+            m1.metric(t("line_tanks"), f"{tot['tanks']} ({tot['passed']})")
+            m2.metric(t("vol"), f"{tot['vol_l']:.1f} L")
+            m3.metric(t("p_total"), f"{tot['total_w']:.0f} W")
+            m4.metric(t("batch_boards"), f"{tot['n_b28']} / {tot['n_b40']}")
+            st.dataframe(plan[["name", "mount", "vol_l", "rec_density", "target_density", "n_b28", "n_h28",
+                               "n_b40", "n_h40", "total_w", "actual_density", "passed"]], hide_index=True)
+            st.markdown(f"**{t('line_bom')}**")
+            st.dataframe(line.line_bom(plan), hide_index=True)
+            st.download_button(t("line_download"), plan.to_csv(index=False).encode("utf-8"),
+                               file_name="ultrasonic_line.csv", mime="text/csv")
+            import report
+            export_section("export_line", "export_all_btn", lambda: report.designs_from_plan(plan), len(plan),
+                           "ultrasonic_line_reports.zip")
+
+            st.subheader(t("line_layouts"))
+            with profiling.span("line.render"), st.spinner():
+                images = line.render_line(plan)
+            for tab, imgs in zip(st.tabs(list(plan["name"])), images):
+                with tab:
+                    for g, img in zip(st.columns(len(imgs)), imgs):
+                        g.image(img, width="stretch")
+    profiling.lap("line")
+
+# ==========================================
+# PAGE: STORE (แบบที่บันทึกไว้)
+# ==========================================
+elif page == "store":
+    import pandas as pd
+    from store import PAGE_SIZE, SORT_COLUMNS
+
+    st.subheader(t("store_header"))
+    db = get_store()
+
+    def min_max(label, key, step):
+        c1, c2 = st.sidebar.columns(2)
+        lo = c1.number_input(label, value=None, step=step, key=f"{key}_lo", placeholder="min")
+        hi = c2.number_input(label, value=None, step=step, key=f"{key}_hi", placeholder="max",
+                             label_visibility="hidden")
+        return None if lo is None and hi is None else (lo, hi)
+
+    st.sidebar.header(t("store_filter"))
+    filters = {
+        "name": st.sidebar.text_input(t("store_name"), key="sf_name"),
+        "vol": min_max(t("store_vol"), "sf_vol", 10.0),
+        "density": min_max(t("store_density"), "sf_density", 1.0),
+        "n_b28": min_max(t("store_boards28"), "sf_b28", 1),
+        "n_b40": min_max(t("store_boards40"), "sf_b40", 1),
+        "passed": {"all": None, "pass": True, "fail": False}[
+            st.sidebar.radio(t("store_result"), ["all", "pass", "fail"], horizontal=True,
+                             format_func=lambda v: t(f"store_{v}"), key="sf_passed")],
+    }
+    c_o1, c_o2, c_o3 = st.columns([2, 1, 1])
+    order = c_o1.selectbox(t("store_sort"), SORT_COLUMNS, key="sf_order")
+    descending = c_o2.toggle("↓", value=True, key="sf_desc")
+
+    with profiling.span("store.query"):
+        total = db.count(**filters)
+        pages = max(1, -(-total // PAGE_SIZE))
+        page_no = c_o3.number_input(t("store_page"), min_value=1, max_value=pages, value=1, key="sf_page")
+        rows = db.search(offset=(page_no - 1) * PAGE_SIZE, order=order, descending=descending, **filters)
+    st.metric(t("store_count"), f"{total:,}")
+    if rows:
+        st.dataframe(pd.DataFrame(rows).drop(columns="hash"), hide_index=True)
+        picked = st.multiselect(t("store_select"), [r["id"] for r in rows], key="sf_pick")
+        if picked:
+            designs = db.compare(picked)
+            st.dataframe(pd.DataFrame(designs).set_index("id").T.astype(str))
+            c_a1, c_a2 = st.columns(2)
+            c_a1.button(t("store_load"), key="sf_load", on_click=load_design, args=(designs[0],),
+                        disabled=len(designs) != 1)
+            c_a2.button(t("store_delete"), key="sf_delete", on_click=delete_designs, args=(picked,))
+    profiling.lap("store")
+
+# ==========================================
+# PROFILING PANEL
+# ==========================================
+# rerun ที่เกิดจาก fragment อย่างเดียวไม่ผ่านส่วนนี้ จึงไม่ถูกนับ
+st.sidebar.divider()
+st.sidebar.toggle(t("profile"), key="profile")
+if profile_on:
+    # แต่ละ session เห็นเฉพาะ rerun ของตัวเอง
+    runs = st.session_state.setdefault("profile_history", profiling.new_history())
+    profiling.end_run(runs)
+    if st.session_state.get("profile"):
+        import pandas as pd
 
+        with st.sidebar.expander(t("profile"), expanded=True):
+            st.caption(t("profile_last"))
+            st.dataframe(pd.DataFrame([{"page": r["page"], "total": r["total_ms"], **r["spans_ms"]}
+                                       for r in reversed(runs)]).round(1))
+            st.caption(t("profile_pct"))
+            st.dataframe(pd.DataFrame(profiling.summarize(runs)).T)
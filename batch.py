@@ -0,0 +1,198 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+import core
+
+# ==========================================
+# BATCH DESIGN ENGINE (คำนวณทีละหลายถังพร้อมกัน)
+# ==========================================
+VOL_BREAKS = np.array(core.VOL_BREAKS)
+PASS_RATIO = core.PASS_RATIO
+
+# ค่าเริ่มต้นสำหรับคอลัมน์ที่ไม่มีในไฟล์
+DEFAULTS = {
+    "H": 0.0,
+    "chem": True,
+    "heavy": True,
+    "w_board_28": 120.0,
+    "h_board_28": 2,
+    "w_board_40": 120.0,
+    "h_board_40": 3,
+    "ratio_28": 70.0,
+}
+REQUIRED = ["L", "W", "water_level"]
+NUMERIC = REQUIRED + ["w_board_28", "h_board_28", "w_board_40", "h_board_40", "ratio_28"]
+OPTIONAL = ["target_density", "n_b28", "n_b40"]
+TRUE_WORDS = {"1", "1.0", "true", "t", "yes", "y", "x"}
+
+
+def _build_rec_table():
+    # ค่าแนะนำมีแค่ 6 x 2 x 2 แบบ จึงเรียกฟังก์ชันเดิมที่ปริมาตรตัวแทนของแต่ละช่วงแล้วใช้เป็นตาราง
+    # (np.round ปัดเศษต่างจาก round() ของ Python ในบางค่า เช่น 24.15)
+    table = np.empty((len(core.BASE_WL), 2, 2))
+    for i, vol in enumerate(core.VOL_BREAKS + (math.inf,)):
+        for chem in (0, 1):
+            for heavy in (0, 1):
+                table[i, chem, heavy] = core.get_recommended_density(vol, chem, heavy)
+    return table
+
+REC_TABLE = _build_rec_table()
+
+
+def recommended_density(vol, chem, heavy):
+    vol = np.asarray(vol, dtype=float)
+    idx = np.searchsorted(VOL_BREAKS, vol, side="left")
+    chem = np.broadcast_to(np.asarray(chem, dtype=bool), vol.shape).astype(int)
+    heavy = np.broadcast_to(np.asarray(heavy, dtype=bool), vol.shape).astype(int)
+    return REC_TABLE[idx, chem, heavy]
+
+
+def board_counts(vol, target_density, ratio_28, w_board_28, w_board_40):
+    """Vectorized ``core.design_boards`` (``ratio_28`` as a 0-1 fraction)."""
+    total_p_req = vol * target_density
+    p_28 = total_p_req * ratio_28
+    p_40 = total_p_req * (1 - ratio_28)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        n_b28 = np.where(p_28 > 0, np.ceil(p_28 / w_board_28), 0)
+        n_b40 = np.where(p_40 > 0, np.ceil(p_40 / w_board_40), 0)
+    n_b40 = np.where((p_40 > 0) & (n_b40 == 0), 1, n_b40)
+    return n_b28, n_b40
+
+
+def _to_bool(s):
+    if s.dtype == bool:
+        return s.to_numpy()
+    return s.astype(str).str.strip().str.lower().isin(TRUE_WORDS).to_numpy()
+
+
+def _truthy(v):
+    if isinstance(v, (bool, np.bool_)):
+        return bool(v)
+    return str(v).strip().lower() in TRUE_WORDS
+
+
+def row_inputs(row):
+    """``core.size_tank`` keyword arguments of one row of a :func:`design_batch` result."""
+    inputs = {
+        "l": float(row["L"]), "w": float(row["W"]), "water_level": float(row["water_level"]),
+        "use_chem": _truthy(row["chem"]), "heavy_load": _truthy(row["heavy"]),
+        "w_board_28": float(row["w_board_28"]), "h_board_28": int(row["h_board_28"]),
+        "w_board_40": float(row["w_board_40"]), "h_board_40": int(row["h_board_40"]),
+        "mode": row["mode"],
+    }
+    if row["mode"] == "check":
+        inputs.update(n_b28=int(row["n_b28"]), n_b40=int(row["n_b40"]))
+    else:
+        inputs.update(target_density=float(row["target_density"]), ratio_28=float(row["ratio_28"]) / 100)
+    return inputs
+
+
+def row_result(row):
+    """The ``core.size_tank`` result dict of one row of a :func:`design_batch` result."""
+    return {
+        "vol": float(row["vol_l"]), "rec_density": float(row["rec_density"]),
+        "target_density": float(row["target_density"]),
+        "n_b28": int(row["n_b28"]), "n_b40": int(row["n_b40"]),
+        "n_h28": int(row["n_h28"]), "n_h40": int(row["n_h40"]),
+        "real_total_w": float(row["total_w"]), "actual_density": float(row["actual_density"]),
+        "passed": bool(row["passed"]), "missing_density": float(row["missing_density"]),
+    }
+
+
+def read_tanks(file, name=None):
+    name = (name or getattr(file, "name", "") or str(file)).lower()
+    if name.endswith((".parquet", ".pq")):
+        df = pd.read_parquet(file)
+    else:
+        df = pd.read_csv(file)
+    df.columns = [str(c).strip() for c in df.columns]
+    return df
+
+
+def _reject(bad, message):
+    # bad = {คอลัมน์: mask ของแถวที่ผิด} -> ValueError บอกคอลัมน์และเลขแถว (นับจาก 1)
+    rows = np.flatnonzero(np.any(list(bad.values()), axis=0)) if bad else np.empty(0, dtype=int)
+    if rows.size:
+        cols = [c for c, m in bad.items() if m.any()]
+        shown = ", ".join(str(r + 1) for r in rows[:10]) + (" ..." if rows.size > 10 else "")
+        raise ValueError(f"{message} in {', '.join(cols)} (row {shown})")
+
+
+def design_batch(df, defaults=None):
+    """Size every tank row at once and return the BOM table.
+
+    Rows with ``n_b28``/``n_b40`` filled in are checked as existing systems,
+    the rest are designed new from ``target_density`` (blank = recommended)
+    and ``ratio_28`` (percent).
+    """
+    missing = [c for c in REQUIRED if c not in df.columns]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+
+    spec = dict(DEFAULTS, **(defaults or {}))
+    out = df.copy()
+    for col, val in spec.items():
+        if col not in out.columns:
+            out[col] = val
+        else:
+            out[col] = out[col].fillna(val)
+
+    def num(col):
+        return pd.to_numeric(out[col], errors="coerce").to_numpy(dtype=float)
+
+    # ช่องว่าง/ไม่ใช่ตัวเลขกลายเป็น NaN -> แจ้งแถวที่ผิดแทนที่จะได้ BOM ปลอม
+    _reject({c: ~np.isfinite(num(c)) for c in NUMERIC}, "Invalid or blank numbers")
+    # คอลัมน์ที่เว้นว่างได้ (ว่าง = ค่าแนะนำ / ออกแบบใหม่) แต่ถ้ากรอกต้องเป็นตัวเลข >= 0
+    optional = {}
+    for c in OPTIONAL:
+        if c in out.columns:
+            blank = out[c].isna().to_numpy() | out[c].astype(str).str.strip().eq("").to_numpy()
+            v = num(c)
+            optional[c] = ~blank & ~(np.isfinite(v) & (v >= 0))
+    _reject(optional, "Invalid numbers")
+    _reject({c: ~(num(c) > 0) for c in ("w_board_28", "w_board_40")}, "Board watts must be > 0")
+    _reject({c: (num(c) < 1) | (num(c) % 1 != 0) for c in ("h_board_28", "h_board_40")},
+            "Heads per board must be whole numbers >= 1")
+    _reject({c: np.nan_to_num(num(c)) % 1 != 0 for c in ("n_b28", "n_b40") if c in out.columns},
+            "Board counts must be whole numbers")
+
+    L, W, level = num("L"), num("W"), num("water_level")
+    w28, w40 = num("w_board_28"), num("w_board_40")
+    h28, h40 = num("h_board_28"), num("h_board_40")
+    chem, heavy = _to_bool(out["chem"]), _to_bool(out["heavy"])
+
+    vol = (L * W * level) / 1000
+    rec = recommended_density(vol, chem, heavy)
+
+    # --- โหมดออกแบบใหม่ ---
+    target = num("target_density") if "target_density" in out.columns else np.full(len(out), np.nan)
+    target = np.where(np.isnan(target), rec, target)
+    new_b28, new_b40 = board_counts(vol, target, num("ratio_28") / 100, w28, w40)
+
+    # --- โหมดตรวจสอบของที่มี ---
+    ex_b28 = num("n_b28") if "n_b28" in out.columns else np.full(len(out), np.nan)
+    ex_b40 = num("n_b40") if "n_b40" in out.columns else np.full(len(out), np.nan)
+    is_check = ~(np.isnan(ex_b28) & np.isnan(ex_b40))
+    n_b28 = np.where(is_check, np.nan_to_num(ex_b28), new_b28)
+    n_b40 = np.where(is_check, np.nan_to_num(ex_b40), new_b40)
+    target = np.where(is_check, rec, target)
+
+    real_total_w = (n_b28 * w28) + (n_b40 * w40)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        actual = np.where(vol > 0, real_total_w / vol, 0.0)
+
+    out["mode"] = np.where(is_check, "check", "new")
+    out["vol_l"] = vol
+    out["rec_density"] = rec
+    out["target_density"] = target
+    out["n_b28"] = n_b28.astype(int)
+    out["n_h28"] = (n_b28 * h28).astype(int)
+    out["n_b40"] = n_b40.astype(int)
+    out["n_h40"] = (n_b40 * h40).astype(int)
+    out["total_w"] = real_total_w
+    out["actual_density"] = actual
+    out["passed"] = actual >= (target * PASS_RATIO)
+    out["missing_density"] = np.maximum(target - actual, 0.0)
+    return out
@@ -0,0 +1,240 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+
+# ==========================================
+# BENCHMARKS (sizing / layout / full-page rerun)
+# ==========================================
+# python bench.py                 -> วัดแล้วเทียบกับ bench_baseline.json (ช้ากว่าเกณฑ์ = exit 1)
+# python bench.py --save          -> วัดแล้วบันทึกเป็น baseline ใหม่
+# python bench.py -k draw_tank    -> วัดเฉพาะชื่อที่มีคำนี้
+HERE = os.path.dirname(os.path.abspath(__file__))
+BASELINE = os.path.join(HERE, "bench_baseline.json")
+OUTPUT = os.path.join(HERE, "bench_output.txt")
+HEAD_COUNTS = (1, 10, 100, 1000, 10000)
+BENCHES = {}
+
+
+def bench(name, repeat=5):
+    def wrap(fn):
+        BENCHES[name] = (fn, repeat)
+        return fn
+    return wrap
+
+
+def measure(fn, repeat):
+    # fn() คืนฟังก์ชันที่จะจับเวลา (ส่วนเตรียมข้อมูลไม่นับเวลา)
+    # ปิด GC ระหว่างจับเวลาเหมือน timeit: ขยะจาก benchmark ก่อนหน้าทำให้ full collection
+    # ไปตกในรอบที่สร้าง object เยอะ (draw_tank 10000 หัว) ช้าลงได้ครึ่งเท่าตัว
+    run = fn()
+    run()
+    gc.collect()
+    gc.disable()
+    try:
+        times = []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            run()
+            times.append(time.perf_counter() - t0)
+    finally:
+        gc.enable()
+    # ใช้รอบที่เร็วที่สุด (แบบ timeit): รอบที่ช้ากว่ามาจากเครื่องถูกแย่ง CPU ไม่ใช่จากโค้ด
+    # median ของ 5 รอบบนเครื่อง CPU เดียวยังแกว่งเกิน tolerance ได้
+    return min(times)
+
+
+# --- Sizing ---
+@bench("density.scalar_100k")
+def _():
+    from core import get_recommended_density
+    vols = [i * 0.003 for i in range(100_000)]
+    return lambda: [get_recommended_density(v, i & 1, i & 2) for i, v in enumerate(vols)]
+
+
+@bench("density.vector_1m")
+def _():
+    import numpy as np
+    import batch
+    rng = np.random.default_rng(0)
+    vol, chem, heavy = rng.random(1_000_000) * 300, rng.random(1_000_000) < 0.5, rng.random(1_000_000) < 0.5
+    return lambda: batch.recommended_density(vol, chem, heavy)
+
+
+@bench("sizing.scalar_10k")
+def _():
+    from core import size_tank
+    grid = [(l, w, lv) for l in range(20, 220, 10) for w in range(20, 120, 10) for lv in range(5, 55, 1)]
+    return lambda: [size_tank(l, w, lv) for l, w, lv in grid]
+
+
+@bench("sizing.batch_100k")
+def _():
+    import numpy as np
+    import pandas as pd
+    import batch
+    rng = np.random.default_rng(0)
+    n = 100_000
+    df = pd.DataFrame({"L": rng.uniform(10, 300, n), "W": rng.uniform(10, 150, n),
+                       "water_level": rng.uniform(1, 60, n), "ratio_28": rng.integers(0, 101, n)})
+    return lambda: batch.design_batch(df)
+
+
+@bench("tolerance.mc_1m", repeat=3)
+def _():
+    import tolerance
+    from core import size_tank
+    inputs = {"l": 300.0, "w": 150.0, "water_level": 60.0}
+    res = size_tank(**inputs)
+
+    def run():
+        tolerance._simulate.cache_clear()
+        tolerance.simulate(res, inputs, 1_000_000)
+    return run
+
+
+@bench("thermal.week_10_duties", repeat=3)
+def _():
+    import thermal
+    from core import size_tank
+    inputs = {"l": 170.0, "w": 80.0, "water_level": 10.0}
+    res = size_tank(**inputs)
+
+    def run():
+        thermal._simulate.cache_clear()
+        thermal.simulate(res, inputs, [d / 10 for d in range(1, 11)], thermal.HORIZONS["week"], work_days=5, limit=50)
+    return run
+
+
+# --- HTTP/JSON service (ไม่รวม socket) ---
+@bench("service.design_10k")
+def _():
+    import json
+    import service
+    bodies = [json.dumps({"l": 20 + i % 200, "w": 20 + i // 200, "water_level": 10}).encode() for i in range(10_000)]
+
+    def run():
+        service._size_json.cache_clear()
+        for b in bodies:
+            service.handle("POST", "/design", b)
+    return run
+
+
+@bench("service.design_10k_cached")
+def _():
+    import json
+    import service
+    bodies = [json.dumps({"l": 20 + i % 100, "w": 80, "water_level": 10}).encode() for i in range(10_000)]
+    return lambda: [service.handle("POST", "/design", b) for b in bodies]
+
+
+# --- Layout rendering (ไม่ผ่านแคช) ---
+def _draw(n, side):
+    import io
+    from core import head_list
+    from render import draw_tank, SAVE_OPTS
+
+    heads = head_list(n - n // 2, n // 2)
+
+    def run():
+        if side:
+            fig = draw_tank(170, 10, heads, "Side A", True, 50, 10)
+        else:
+            fig = draw_tank(170, 80, heads, "Bottom")
+        fig.savefig(io.BytesIO(), format="png", **SAVE_OPTS)
+    return run
+
+
+for _n in HEAD_COUNTS:
+    for _side in (False, True):
+        bench(f"draw_tank.{'side' if _side else 'bottom'}_{_n}", repeat=3)(
+            lambda n=_n, side=_side: _draw(n, side))
+
+
+# --- Full-page reruns ผ่าน Streamlit AppTest ---
+class _SharedScriptCache:
+    def __init__(self, cache):
+        self.cache = cache
+
+    def __call__(self):
+        return self.cache
+
+
+def _page(page, lang):
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1 import AppTest, local_script_runner
+
+    # AppTest สร้าง ScriptCache ใหม่ทุก run จึง parse + แปลง magic ของ app.py ใหม่ทุก rerun
+    # (เวลาโตเร็วกว่าขนาดไฟล์) ขณะที่ server ใช้แคช bytecode ร่วมกันจนกว่าไฟล์จะเปลี่ยน
+    # ใช้แคชเดียวทุก run ให้วัดเฉพาะเวลารันหน้าเหมือน rerun จริง
+    if not isinstance(local_script_runner.ScriptCache, _SharedScriptCache):
+        local_script_runner.ScriptCache = _SharedScriptCache(ScriptCache())
+    at = AppTest.from_file(os.path.join(HERE, "app.py"), default_timeout=120).run()
+    at.radio(key="lang").set_value(lang).run()
+    at.radio(key="page").set_value(page).run()
+
+    def run():
+        at.run()
+        if at.exception:
+            raise RuntimeError(at.exception[0].message)
+    return run
+
+
+for _p in ("manual", "calc", "batch"):
+    for _lang, _code in (("🇹🇭 ภาษาไทย", "th"), ("🇬🇧 English", "en")):
+        bench(f"page.{_p}_{_code}", repeat=5)(lambda p=_p, lang=_lang: _page(p, lang))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ultrasonic app benchmarks")
+    parser.add_argument("-k", "--filter", default="", help="run benchmarks whose name contains this")
+    parser.add_argument("--save", action="store_true", help="write results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.5,
+                        help="allowed slowdown vs baseline (0.5 = 50%%)")
+    parser.add_argument("--baseline", default=BASELINE)
+    args = parser.parse_args(argv)
+
+    results = {}
+    for name, (fn, repeat) in BENCHES.items():
+        if args.filter in name:
+            results[name] = measure(fn, repeat)
+            print(f"{name:<28} {results[name] * 1000:10.2f} ms", flush=True)
+
+    report = {
+        "meta": {"python": platform.python_version(), "machine": platform.machine(), "system": platform.system()},
+        "results": results,
+    }
+    with open(OUTPUT, "w") as f:
+        json.dump(report, f, indent=2)
+
+    if args.save:
+        base = {"meta": report["meta"], "results": {}}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                base["results"] = json.load(f)["results"]
+        base["results"].update(results)
+        with open(args.baseline, "w") as f:
+            json.dump(base, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"baseline saved -> {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("no baseline, run with --save first", file=sys.stderr)
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)["results"]
+    failed = []
+    for name, sec in results.items():
+        ref = baseline.get(name)
+        if ref and sec > ref * (1 + args.tolerance):
+            failed.append(name)
+            print(f"REGRESSION {name}: {sec * 1000:.2f} ms vs baseline {ref * 1000:.2f} ms", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+import argparse
+import json
+import sys
+
+import core
+
+# ==========================================
+# COMMAND LINE (คำนวณจาก terminal / สคริปต์)
+# ==========================================
+# python cli.py size --L 170 --W 80 --level 10
+# python cli.py size --L 170 --W 80 --level 10 --check 3 1 --json
+# python cli.py batch tanks.csv -o bom.csv
+# python cli.py line line.csv --bom line_bom.csv --images layouts/
+# python cli.py serve --port 8000
+
+
+def _add_spec_args(p):
+    p.add_argument("--chem", action=argparse.BooleanOptionalAction, default=True, help="chemistry/acid bath")
+    p.add_argument("--heavy", action=argparse.BooleanOptionalAction, default=True, help="heavy mass load")
+    p.add_argument("--w28", type=float, default=120.0, help="W per 28 kHz board")
+    p.add_argument("--h28", type=int, default=2, help="heads per 28 kHz board")
+    p.add_argument("--w40", type=float, default=120.0, help="W per 40 kHz board")
+    p.add_argument("--h40", type=int, default=3, help="heads per 40 kHz board")
+    p.add_argument("--ratio", type=float, default=70.0, help="28 kHz share of power in percent")
+
+
+def cmd_size(args):
+    res = core.size_tank(
+        args.L, args.W, args.level, args.chem, args.heavy,
+        args.w28, args.h28, args.w40, args.h40,
+        mode="check" if args.check else "new",
+        target_density=args.target, ratio_28=args.ratio / 100,
+        n_b28=args.check[0] if args.check else 0,
+        n_b40=args.check[1] if args.check else 0,
+    )
+    if args.json:
+        print(json.dumps(res))
+        return 0
+    print(f"Water volume    : {res['vol']:.2f} L")
+    print(f"Recommended     : {res['rec_density']} W/L")
+    print(f"Target          : {res['target_density']} W/L")
+    print(f"28 kHz boards   : {res['n_b28']} (= {res['n_h28']} heads)")
+    print(f"40 kHz boards   : {res['n_b40']} (= {res['n_h40']} heads)")
+    print(f"Total power     : {res['real_total_w']:.0f} W")
+    print(f"Actual density  : {res['actual_density']:.2f} W/L")
+    if res["passed"]:
+        print("Result          : PASSED")
+    else:
+        print(f"Result          : BELOW standard (missing {res['missing_density']:.1f} W/L)")
+    return 0 if res["passed"] else 1
+
+
+def cmd_batch(args):
+    # pandas/numpy โหลดเฉพาะคำสั่งนี้
+    import batch
+
+    bom = batch.design_batch(batch.read_tanks(args.file), {
+        "chem": args.chem, "heavy": args.heavy, "ratio_28": args.ratio,
+        "w_board_28": args.w28, "h_board_28": args.h28,
+        "w_board_40": args.w40, "h_board_40": args.h40,
+    })
+    bom.to_csv(args.output or sys.stdout, index=False)
+    if args.output:
+        print(f"{len(bom)} tanks, {int(bom['passed'].sum())} passed -> {args.output}", file=sys.stderr)
+    return 0
+
+
+def cmd_line(args):
+    import os
+    import batch
+    import line
+
+    plan = line.plan_line(batch.read_tanks(args.file), {
+        "chem": args.chem, "heavy": args.heavy, "ratio_28": args.ratio,
+        "w_board_28": args.w28, "h_board_28": args.h28,
+        "w_board_40": args.w40, "h_board_40": args.h40,
+    })
+    plan.to_csv(args.output or sys.stdout, index=False)
+    tot = line.line_totals(plan)
+    print(f"{tot['tanks']} tanks, {tot['passed']} passed, {tot['total_w']:.0f} W, "
+          f"boards 28k/40k = {tot['n_b28']}/{tot['n_b40']}", file=sys.stderr)
+    if args.bom:
+        line.line_bom(plan).to_csv(args.bom, index=False)
+    if args.images:
+        os.makedirs(args.images, exist_ok=True)
+        for (i, row), imgs in zip(plan.iterrows(), line.render_line(plan)):
+            for j, img in enumerate(imgs):
+                path = os.path.join(args.images, f"{i + 1:02d}_{j + 1}.png")
+                with open(path, "wb") as f:
+                    f.write(img)
+    return 0 if tot["passed"] == tot["tanks"] else 1
+
+
+def cmd_serve(args):
+    import service
+    return service.main(["--host", args.host, "--port", str(args.port)])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="ultrasonic", description="Ultrasonic cleaner sizing")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("size", help="size one tank")
+    p.add_argument("--L", type=float, required=True, help="length (cm)")
+    p.add_argument("--W", type=float, required=True, help="width (cm)")
+    p.add_argument("--level", type=float, required=True, help="water level (cm)")
+    p.add_argument("--target", type=float, default=None, help="target W/L (default: recommended)")
+    p.add_argument("--check", type=int, nargs=2, metavar=("N28", "N40"), help="check existing board counts")
+    p.add_argument("--json", action="store_true", help="print JSON")
+    _add_spec_args(p)
+    p.set_defaults(func=cmd_size)
+
+    p = sub.add_parser("batch", help="size a CSV/Parquet tank list")
+    p.add_argument("file")
+    p.add_argument("-o", "--output", help="BOM CSV path (default: stdout)")
+    _add_spec_args(p)
+    p.set_defaults(func=cmd_batch)
+
+    p = sub.add_parser("line", help="plan a cleaning line (one CSV row per tank)")
+    p.add_argument("file")
+    p.add_argument("-o", "--output", help="per-tank plan CSV path (default: stdout)")
+    p.add_argument("--bom", help="write the combined board BOM CSV here")
+    p.add_argument("--images", metavar="DIR", help="render every tank layout as PNG into DIR")
+    _add_spec_args(p)
+    p.set_defaults(func=cmd_line)
+
+    p = sub.add_parser("serve", help="run the HTTP/JSON sizing service")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8000)
+    p.set_defaults(func=cmd_serve)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+import math
+import random
+from bisect import bisect_left
+
+# ==========================================
+# ENGINEERING CORE (คำนวณล้วน ไม่มี UI / plotting)
+# ==========================================
+# ใช้ได้จากสคริปต์/บริการอื่นโดยไม่ต้องเปิด Streamlit
+# เกณฑ์ปริมาตร (L) -> ค่า W/L พื้นฐาน, ถังที่ใหญ่กว่าเกณฑ์สุดท้ายใช้ BASE_WL[-1]
+VOL_BREAKS = (10.0, 20.0, 50.0, 100.0, 190.0)
+BASE_WL = (35.0, 30.0, 25.0, 20.0, 10.0, 5.3)
+CHEM_FACTOR = 0.7
+HEAVY_FACTOR = 1.15
+PASS_RATIO = 0.95
+SHUFFLE_SEED = 42
+
+
+def tank_volume(l, w, water_level):
+    return (l * w * water_level) / 1000
+
+
+def get_recommended_density(vol_liters, has_chem, heavy_load):
+    # ช่วงแรกที่ vol <= เกณฑ์ (bisect_left: ปริมาตรเท่าเกณฑ์พอดีอยู่ช่วงล่าง) ตรงกับ searchsorted ของ batch
+    # NaN เทียบอะไรก็เป็นเท็จ -> ใช้ช่วงสุดท้ายเหมือนเดิม
+    i = bisect_left(VOL_BREAKS, vol_liters) if vol_liters == vol_liters else len(VOL_BREAKS)
+    base_wl = BASE_WL[i]
+
+    if has_chem: base_wl *= CHEM_FACTOR
+    if heavy_load: base_wl *= HEAVY_FACTOR
+    return round(base_wl, 1)
+
+
+def design_boards(vol, target_density, ratio_28, w_board_28, w_board_40):
+    # โหมดออกแบบใหม่: แบ่งกำลังตามสัดส่วน 28k แล้วปัดขึ้นเป็นจำนวนบอร์ด
+    total_p_req = vol * target_density
+    p_28 = total_p_req * ratio_28
+    p_40 = total_p_req * (1 - ratio_28)
+
+    n_b28 = math.ceil(p_28 / w_board_28) if p_28 > 0 else 0
+    n_b40 = math.ceil(p_40 / w_board_40) if p_40 > 0 else 0
+    if p_40 > 0 and n_b40 == 0: n_b40 = 1
+    return n_b28, n_b40
+
+
+def is_pass(actual_density, target_density):
+    return actual_density >= (target_density * PASS_RATIO)
+
+
+def size_tank(l, w, water_level, use_chem=True, heavy_load=True,
+              w_board_28=120.0, h_board_28=2, w_board_40=120.0, h_board_40=3,
+              mode="new", target_density=None, ratio_28=0.7, n_b28=0, n_b40=0):
+    """Size one tank the same way as the Calculator page.
+
+    ``mode="new"`` designs board counts from ``target_density`` (default:
+    recommended) and ``ratio_28`` (0-1); ``mode="check"`` evaluates the given
+    ``n_b28``/``n_b40`` against the recommended density.
+    """
+    vol = tank_volume(l, w, water_level)
+    rec_density = get_recommended_density(vol, use_chem, heavy_load)
+
+    if mode == "new":
+        if target_density is None:
+            target_density = rec_density
+        n_b28, n_b40 = design_boards(vol, target_density, ratio_28, w_board_28, w_board_40)
+    elif mode == "check":
+        target_density = rec_density
+    else:
+        raise ValueError(f"Unknown mode: {mode!r}")
+
+    real_total_w = (n_b28 * w_board_28) + (n_b40 * w_board_40)
+    actual_density = real_total_w / vol if vol > 0 else 0
+    return {
+        "vol": vol,
+        "rec_density": rec_density,
+        "target_density": target_density,
+        "n_b28": int(n_b28),
+        "n_b40": int(n_b40),
+        "n_h28": int(n_b28 * h_board_28),
+        "n_h40": int(n_b40 * h_board_40),
+        "real_total_w": real_total_w,
+        "actual_density": actual_density,
+        "passed": is_pass(actual_density, target_density),
+        "missing_density": max(target_density - actual_density, 0.0),
+    }
+
+
+def head_list(n_h28, n_h40, seed=SHUFFLE_SEED):
+    heads = [28] * n_h28 + [40] * n_h40
+    random.Random(seed).shuffle(heads)
+    return heads
+
+
+def head_positions(l, area_h, n, off=False):
+    # ตำแหน่งหัวแบบตาราง (สลับแถวครึ่งช่อง) คำนวณทั้งหมดเป็น array
+    import numpy as np
+
+    if n <= 0 or area_h <= 0:
+        return np.empty(0), np.empty(0)
+    cols = math.ceil(math.sqrt(n * (l / area_h)))
+    rows = math.ceil(n / cols)
+    sp_x = l / (cols + 1)
+    sp_y = area_h / (rows + 1)
+
+    idx = np.arange(n)
+    r, c = np.divmod(idx, cols)
+    x = (c + 1) * sp_x + np.where(r % 2 != 0, sp_x / 2, 0) + ((sp_x / 2) if off else 0)
+    x = np.where(x > l - (sp_x / 2), x - l + (sp_x / 2), x)
+    y = (r + 1) * sp_y
+    return x, y
@@ -0,0 +1,179 @@
+import atexit
+import os
+import pickle
+import queue
+import subprocess
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+import batch
+import core
+
+# ==========================================
+# CLEANING LINE PLANNER (หลายถังต่อกันเป็นไลน์)
+# ==========================================
+# แต่ละถังมีเงื่อนไขของตัวเอง (สารเคมี/โหลดหนัก/สัดส่วน 28k/การติดตั้ง)
+# คำนวณทุกถังพร้อมกันด้วย batch.design_batch แล้วรวม BOM ทั้งไลน์
+# การวาดผังใช้ CPU ล้วน (matplotlib) จึงกระจายไปหลาย process พร้อมกัน ทั้งหน้าเว็บและ CLI:
+# - process วาดคือ line_worker.py เปิดด้วย subprocess ไม่ใช่ multiprocessing spawn
+#   (spawn จะรัน __main__ ซ้ำ ซึ่งใน Streamlit คือ app.py ทั้งหน้า)
+# - เปิดครั้งแรกที่ต้องวาด แล้วใช้ต่อทุก rerun/ทุก session (import matplotlib ครั้งเดียวต่อ process)
+# ULTRASONIC_LINE_WORKERS=4 -> จำนวน process (ค่าเริ่มต้น = จำนวน CPU ไม่เกิน MAX_WORKERS, 1 = วาดใน process เดียว)
+HERE = os.path.dirname(os.path.abspath(__file__))
+WORKER = os.path.join(HERE, "line_worker.py")
+MAX_WORKERS = 8
+WORKERS = max(1, int(os.environ.get("ULTRASONIC_LINE_WORKERS", "0")) or min(os.cpu_count() or 1, MAX_WORKERS))
+MOUNTS = ("bottom", "side")
+COLUMNS = ["name", "L", "W", "H", "water_level", "chem", "heavy", "ratio_28", "target_density", "mount"]
+EXAMPLE = [
+    {"name": "Pre-wash", "L": 120.0, "W": 60.0, "H": 50.0, "water_level": 35.0, "chem": False, "heavy": True,
+     "ratio_28": 70.0, "target_density": None, "mount": "bottom"},
+    {"name": "Flux removal", "L": 170.0, "W": 80.0, "H": 50.0, "water_level": 10.0, "chem": True, "heavy": True,
+     "ratio_28": 70.0, "target_density": None, "mount": "bottom"},
+    {"name": "Rinse", "L": 120.0, "W": 60.0, "H": 50.0, "water_level": 35.0, "chem": False, "heavy": False,
+     "ratio_28": 30.0, "target_density": None, "mount": "side"},
+]
+
+_idle = queue.Queue()          # process วาดที่ว่างอยู่
+_threads = None
+_pool_lock = threading.Lock()
+
+
+def plan_line(tanks, defaults=None):
+    """Size every tank of a line; returns the ``batch.design_batch`` table plus ``name``/``mount``."""
+    df = pd.DataFrame(tanks).reset_index(drop=True)
+    names = df["name"] if "name" in df.columns else [None] * len(df)
+    df["name"] = [str(n).strip() if pd.notna(n) and str(n).strip() else f"Tank {i + 1}" for i, n in enumerate(names)]
+    df["mount"] = df["mount"].fillna("bottom") if "mount" in df.columns else "bottom"
+    bad = sorted(set(df["mount"]) - set(MOUNTS))
+    if bad:
+        raise ValueError(f"Unknown mount: {', '.join(map(str, bad))} (use {' / '.join(MOUNTS)})")
+    return batch.design_batch(df, defaults)
+
+
+def line_bom(plan):
+    """Combined BOM of a planned line: one row per board type (frequency, watts, heads per board)."""
+    parts = []
+    for freq in (28, 40):
+        parts.append(pd.DataFrame({
+            "freq": freq,
+            "watts": plan[f"w_board_{freq}"].astype(float),
+            "heads_per_board": plan[f"h_board_{freq}"].astype(int),
+            "boards": plan[f"n_b{freq}"],
+            "heads": plan[f"n_h{freq}"],
+        }))
+    bom = pd.concat(parts, ignore_index=True)
+    bom = bom[bom["boards"] > 0]
+    bom["total_w"] = bom["watts"] * bom["boards"]
+    return (bom.groupby(["freq", "watts", "heads_per_board"], as_index=False)[["boards", "heads", "total_w"]].sum()
+            .sort_values(["freq", "watts"], ignore_index=True))
+
+
+def line_totals(plan):
+    return {
+        "tanks": len(plan),
+        "passed": int(plan["passed"].sum()),
+        "vol_l": float(plan["vol_l"].sum()),
+        "total_w": float(plan["total_w"].sum()),
+        "n_b28": int(plan["n_b28"].sum()),
+        "n_b40": int(plan["n_b40"].sum()),
+        "n_h28": int(plan["n_h28"].sum()),
+        "n_h40": int(plan["n_h40"].sum()),
+    }
+
+
+def tank_views(row, labels=True, layout="grid"):
+    # พารามิเตอร์ render_tank ของแต่ละมุมมอง (เหมือนหน้าคำนวณ: ข้างถังแบ่งหัวครึ่งต่อด้าน)
+    heads = core.head_list(int(row["n_h28"]), int(row["n_h40"]))
+    L, W, H, level = float(row["L"]), float(row["W"]), float(row["H"]), float(row["water_level"])
+    if row["mount"] == "bottom":
+        return [((L, W, heads, f"{row['name']}: Bottom ({len(heads)} Heads)"), {"labels": labels, "layout": layout})]
+    mid = len(heads) // 2
+    return [((L, level, heads[:mid], f"{row['name']}: Side A", True, H, level), {"labels": labels, "layout": layout}),
+            ((L, level, heads[mid:], f"{row['name']}: Side B", True, H, level, True), {"labels": labels, "layout": layout})]
+
+
+def _render(args, kwargs):
+    from render import render_tank
+    return render_tank(*args, **kwargs)
+
+
+def _start_worker():
+    return subprocess.Popen([sys.executable, WORKER], stdin=subprocess.PIPE, stdout=subprocess.PIPE, cwd=HERE)
+
+
+def _remote(args, kwargs):
+    # ยืม process ที่ว่างมาวาดหนึ่งรูป; ถ้า process ตาย (pipe ขาด) เปิดตัวใหม่แทนแล้วแจ้ง error
+    proc = _idle.get()
+    try:
+        pickle.dump((args, kwargs), proc.stdin, pickle.HIGHEST_PROTOCOL)
+        proc.stdin.flush()
+        ok, value = pickle.load(proc.stdout)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        proc.kill()
+        proc = _start_worker()
+        raise RuntimeError("Layout render worker stopped unexpectedly")
+    finally:
+        _idle.put(proc)
+    if not ok:
+        raise value
+    return value
+
+
+def _shutdown():
+    _threads.shutdown(cancel_futures=True)
+    while not _idle.empty():
+        proc = _idle.get_nowait()
+        proc.stdin.close()          # worker จบเองเมื่อ stdin ปิด
+        try:
+            proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def _submit_all(todo):
+    # process ชุดเดียวใช้ร่วมกันทุก session; thread ละหนึ่งงานที่ยืม process ว่างไปวาด
+    global _threads
+    with _pool_lock:
+        if _threads is None:
+            for _ in range(WORKERS):
+                _idle.put(_start_worker())
+            _threads = ThreadPoolExecutor(WORKERS, thread_name_prefix="line-render")
+            atexit.register(_shutdown)
+        return [_threads.submit(_remote, args, kwargs) for args, kwargs in todo]
+
+
+def render_line(plan, labels=True, layout="grid", parallel=True):
+    """Render the layout images of every tank, returning one list of image bytes per tank.
+
+    Images already in ``render.cache`` are reused; the rest are drawn
+    concurrently by :data:`WORKERS` ``line_worker.py`` processes (shared by
+    every caller) and added to the cache. ``parallel=False`` or ``WORKERS == 1``
+    draws everything in this process.
+    """
+    import render
+
+    views = [tank_views(row, labels, layout) for _, row in plan.iterrows()]
+    jobs = [(i, j, v) for i, vs in enumerate(views) for j, v in enumerate(vs)]
+    out = [[None] * len(vs) for vs in views]
+    todo = []
+    for i, j, (args, kwargs) in jobs:
+        key = render.tank_key(*args, **kwargs)
+        data = render.cache.get(key)
+        if data is None:
+            todo.append((i, j, key, args, kwargs))
+        else:
+            out[i][j] = data
+
+    if parallel and len(todo) > 1 and WORKERS > 1:
+        futures = _submit_all([(args, kwargs) for _, _, _, args, kwargs in todo])
+        results = [f.result() for f in futures]
+    else:
+        results = [_render(args, kwargs) for _, _, _, args, kwargs in todo]
+    for (i, j, key, _, _), data in zip(todo, results):
+        render.cache.put(key, data)
+        out[i][j] = data
+    return out
@@ -0,0 +1,36 @@
+import os
+import pickle
+import sys
+
+# ==========================================
+# LINE RENDER WORKER (process วาดผังให้ line.render_line)
+# ==========================================
+# line.py เปิดไฟล์นี้เป็น process แยกด้วย subprocess (ไม่ใช่ multiprocessing)
+# จึงไม่ import __main__ ของ process หลักซ้ำ (ใน Streamlit คือ app.py ทั้งหน้า)
+# รับงาน (args, kwargs) ของ render.render_tank ทาง stdin ตอบ (ok, bytes หรือ error) ทาง stdout
+# ทั้งสองฝั่งเป็น pickle ทีละก้อน; stdin ปิด -> จบ process
+
+
+def main():
+    # ข้อความที่ไลบรารีพิมพ์ออก stdout จะปนกับผลที่ส่งกลับ จึงย้าย stdout เดิมไป stderr
+    out = os.fdopen(os.dup(sys.stdout.fileno()), "wb")
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    src = sys.stdin.buffer
+
+    from render import render_tank   # import matplotlib ครั้งเดียวตอนเริ่ม process
+
+    while True:
+        try:
+            args, kwargs = pickle.load(src)
+        except EOFError:
+            return 0
+        try:
+            reply = (True, render_tank(*args, **kwargs))
+        except Exception as e:
+            reply = (False, e)
+        pickle.dump(reply, out, pickle.HIGHEST_PROTOCOL)
+        out.flush()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+import math
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+# ==========================================
+# BOARD-MIX OPTIMIZER (เลือกบอร์ดจาก catalog ให้ถูกที่สุด / เกินน้อยที่สุด)
+# ==========================================
+# ต่อหนึ่งความถี่ใช้บอร์ดรุ่นเดียว (เดินสาย/สำรองอะไหล่ง่าย) แล้วไล่ทุกจำนวนบอร์ด 28k
+# สำหรับทุกคู่รุ่น 28k x 40k พร้อมกันด้วย NumPy; จำนวน 40k ที่น้อยที่สุดที่ผ่านเงื่อนไข
+# คือคำตอบที่ดีที่สุดของแต่ละจุด (ทั้งราคาและวัตต์ที่เกินเพิ่มตามจำนวนบอร์ด)
+CATALOG_COLUMNS = ["name", "freq", "watts", "heads", "price"]
+OBJECTIVES = ("cost", "overshoot")
+CACHE_SIZE = 256
+MAX_COUNT = 10000           # จำนวนบอร์ด 28k ต่อรุ่นที่ไล่สูงสุด (กันช่องสัดส่วนแคบมากจนไล่ไม่จบ)
+
+
+def catalog_key(catalog):
+    df = pd.DataFrame(catalog)
+    missing = [c for c in CATALOG_COLUMNS if c not in df.columns]
+    if missing:
+        raise ValueError(f"Catalog is missing columns: {', '.join(missing)}")
+    df = df[CATALOG_COLUMNS].dropna(subset=["freq", "watts", "heads"])
+    df = df[(df["watts"] > 0) & df["freq"].isin([28, 40])]
+    return tuple(
+        (str(r.name), int(r.freq), float(r.watts), int(r.heads), float(r.price) if pd.notna(r.price) else 0.0)
+        for r in df.itertuples(index=False)
+    )
+
+
+def _options(rows, freq, allow_none):
+    names = [r[0] for r in rows if r[1] == freq]
+    watts = [r[2] for r in rows if r[1] == freq]
+    heads = [r[3] for r in rows if r[1] == freq]
+    price = [r[4] for r in rows if r[1] == freq]
+    if allow_none:
+        names.append("")
+        watts.append(0.0)
+        heads.append(0)
+        price.append(0.0)
+    return names, np.array(watts), np.array(heads), np.array(price)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _solve(rows, p_req, ratio_min, ratio_max, objective, top, max_boards):
+    n28_names, w28, h28, c28 = _options(rows, 28, ratio_min <= 0)
+    n40_names, w40, h40, c40 = _options(rows, 40, ratio_max >= 1)
+    if not len(w28) or not len(w40) or p_req <= 0:
+        return ()
+
+    # ไล่จำนวน 28k ของแต่ละรุ่น: 1 .. ปัดขึ้น(p_top/W)
+    # เกิน P แล้วเพิ่ม 28k มีแต่แพงขึ้น ยกเว้นเมื่อช่องสัดส่วนแคบจนยังไม่มีจำนวน 40k ที่ลงช่องได้:
+    # ช่วงของจำนวน 40k ที่ลงช่องกว้าง p28 / W40 x (1/ratio_min - 1/ratio_max) จึงมีจำนวนเต็มแน่นอนเมื่อ
+    # p28 >= W40 / (1/ratio_min - 1/ratio_max); สัดส่วนตายตัว (ช่องกว้างศูนย์) ไล่ถึง MAX_COUNT
+    # กรณีไม่มี 28k เลยใช้ตัวเลือก "ไม่มี" (W = 0) แทน เพื่อไม่ให้ได้คำตอบซ้ำ
+    p_top = p_req
+    if 0 < ratio_min < 1:
+        span = 1 / ratio_min - 1 / min(max(ratio_max, ratio_min), 1.0)
+        p_top = max(p_req / ratio_min, w40.max() / span) if span > 0 else math.inf
+    limit = min(MAX_COUNT, max_boards or MAX_COUNT)
+    counts = [np.arange(1, min(math.ceil(p_top / w) if p_top < math.inf else limit, limit) + 1) if w > 0
+              else np.zeros(1) for w in w28]
+    i = np.repeat(np.arange(len(w28)), [len(c) for c in counts])
+    n28 = np.concatenate(counts).astype(float)
+
+    # broadcast: แถว = (รุ่น 28k, จำนวน 28k), คอลัมน์ = รุ่น 40k
+    p28 = (n28 * w28[i])[:, None]
+    wj = w40[None, :]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        need_power = np.ceil(np.maximum(p_req - p28, 0) / wj)
+        # สัดส่วน 28k ต้องไม่เกิน ratio_max -> ต้องมี 40k อย่างน้อยเท่านี้
+        if ratio_max > 0:
+            need_ratio = np.ceil(p28 * (1 - ratio_max) / (ratio_max * wj) - 1e-9)
+        else:
+            need_ratio = np.where(p28 > 0, np.inf, 0)
+        n40 = np.maximum(need_power, need_ratio)
+        n40 = np.where(wj > 0, n40, 0)
+        total = p28 + n40 * wj
+        ratio = np.where(total > 0, p28 / total, 0)
+
+    ok = (total >= p_req - 1e-9) & (ratio >= ratio_min - 1e-9) & (ratio <= ratio_max + 1e-9)
+    ok &= np.isfinite(n40) & ((n40 > 0) | (wj == 0))
+    if max_boards:
+        ok &= (n28[:, None] + n40) <= max_boards
+    rows_idx, j = np.nonzero(ok)
+    if not len(rows_idx):
+        return ()
+
+    n40 = n40[rows_idx, j]
+    total = total[rows_idx, j]
+    ratio = ratio[rows_idx, j]
+    ii = i[rows_idx]
+    n28 = n28[rows_idx]
+    price = n28 * c28[ii] + n40 * c40[j]
+    over = total - p_req
+    boards = n28 + n40
+    if objective == "cost":
+        order = np.lexsort((boards, over, price))
+    else:
+        order = np.lexsort((boards, price, over))
+    order = order[:top]
+
+    return tuple(
+        (n28_names[ii[k]] if n28[k] else "", int(n28[k]),
+         n40_names[j[k]] if n40[k] else "", int(n40[k]),
+         float(total[k]), float(over[k]), float(ratio[k]),
+         int(n28[k] * h28[ii[k]] + n40[k] * h40[j[k]]), float(price[k]))
+        for k in order
+    )
+
+
+def optimize_mix(catalog, vol, target_density, ratio_min=0.0, ratio_max=1.0,
+                 objective="cost", top=5, max_boards=None):
+    """Return the best board mixes for ``vol * target_density`` watts.
+
+    ``ratio_min``/``ratio_max`` bound the 28 kHz share of total watts (0-1).
+    ``objective`` is ``"cost"`` (cheapest, then least overshoot) or
+    ``"overshoot"`` (least extra watts, then cheapest).
+    """
+    if objective not in OBJECTIVES:
+        raise ValueError(f"Unknown objective: {objective!r}")
+    p_req = float(vol * target_density)
+    res = _solve(catalog_key(catalog), round(p_req, 6), float(ratio_min), float(ratio_max),
+                 objective, int(top), int(max_boards) if max_boards else None)
+    df = pd.DataFrame(list(res), columns=[
+        "board_28", "n_b28", "board_40", "n_b40", "total_w", "overshoot_w", "ratio_28", "heads", "price",
+    ])
+    df["actual_density"] = df["total_w"] / vol if vol > 0 else 0.0
+    return df
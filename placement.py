@@ -0,0 +1,203 @@
+import math
+
+import numpy as np
+
+from core import head_positions
+
+# ==========================================
+# PLACEMENT ENGINE (จัดตำแหน่งหัวให้สม่ำเสมอ + สลับความถี่)
+# ==========================================
+# 1) เริ่มจากตารางแบบรังผึ้งที่จำนวนหัวต่อแถวลงตัวพอดี (ไม่มีการวนกลับขอบ)
+# 2) ปรับด้วย Lloyd relaxation บนจุดตัวอย่าง โดยหาหัวที่ใกล้ที่สุดผ่าน grid index
+# 3) กระจาย 28k/40k ตามเส้นทางงูเลื้อยแบบ Bresenham แทนการสุ่ม
+# ทุกขั้นเป็น deterministic: input เดิมได้ผลเดิมเสมอ
+HEAD_R = 2.5
+CLEARANCE = HEAD_R          # ระยะห่างขอบถังถึงศูนย์กลางหัว (cm)
+MIN_PITCH = 2 * HEAD_R      # ระยะห่างศูนย์กลางหัวขั้นต่ำ (cm) = หัวไม่ทับกัน
+ITERATIONS = 5
+SAMPLES_PER_HEAD = 8
+METHODS = ("grid", "optimized")
+
+
+class GridIndex:
+    """Uniform-grid bucket index for nearest-point queries in 2D."""
+
+    def __init__(self, x, y, cell):
+        self.x, self.y, self.cell = x, y, cell
+        self.ox, self.oy = x.min() - cell, y.min() - cell
+        # ล้อมด้วยช่องว่างหนึ่งชั้น เพื่อให้ช่องข้างเคียงไม่หลุดขอบตาราง
+        cx = ((x - self.ox) // cell).astype(int)
+        cy = ((y - self.oy) // cell).astype(int)
+        self.nx, self.ny = cx.max() + 2, cy.max() + 2
+        cid = cy * self.nx + cx
+        order = np.argsort(cid, kind="stable")
+        counts = np.bincount(cid, minlength=self.nx * self.ny)
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        slot = np.arange(len(x)) - np.repeat(starts, counts)
+        # ตาราง (จำนวนช่อง, k) เติม -1 ซึ่งชี้ไปที่จุด inf ท้าย array
+        self.table = np.full((self.nx * self.ny, counts.max()), -1)
+        self.table[cid[order], slot] = order
+        self._xs = np.append(x, np.inf)
+        self._ys = np.append(y, np.inf)
+        self._offs = np.array([dy * self.nx + dx for dy in (-1, 0, 1) for dx in (-1, 0, 1)])
+
+    def nearest(self, px, py, exclude=None):
+        cx = np.clip((px - self.ox) // self.cell, 1, self.nx - 2).astype(int)
+        cy = np.clip((py - self.oy) // self.cell, 1, self.ny - 2).astype(int)
+        cand = self.table[(cy * self.nx + cx)[:, None] + self._offs].reshape(len(px), -1)
+        d2 = (self._xs[cand] - px[:, None]) ** 2 + (self._ys[cand] - py[:, None]) ** 2
+        if exclude is not None:
+            d2[cand == exclude[:, None]] = np.inf
+        rows = np.arange(len(px))
+        best = np.argmin(d2, axis=1)
+        idx = cand[rows, best]
+        dist = np.sqrt(d2[rows, best])
+
+        # ถ้าระยะเกินหนึ่งช่อง อาจมีหัวที่ใกล้กว่านอกช่องรอบข้าง จึงคำนวณตรงทั้งหมด
+        miss = ~(dist <= self.cell)
+        if miss.any():
+            mx, my = px[miss], py[miss]
+            full = (self.x[None, :] - mx[:, None]) ** 2 + (self.y[None, :] - my[:, None]) ** 2
+            if exclude is not None:
+                full[np.arange(len(mx)), exclude[miss]] = np.inf
+            idx[miss] = np.argmin(full, axis=1)
+            dist[miss] = np.sqrt(full[np.arange(len(mx)), idx[miss]])
+        return idx, dist
+
+
+def _lattice(x0, x1, y0, y1, n):
+    # เลือกจำนวนแถวที่ทำให้ระยะในแถวกับระยะระหว่างแถวใกล้รูปรังผึ้งที่สุด
+    w, h = x1 - x0, y1 - y0
+    if h <= 0 or w <= 0:
+        rows = 1 if h <= 0 else n
+    else:
+        best = None
+        for rows in range(1, n + 1):
+            px = w / math.ceil(n / rows)
+            py = h / rows
+            score = abs(math.log(py / (px * math.sqrt(3) / 2)))
+            if best is None or score < best[0] - 1e-12:
+                best = (score, rows)
+        rows = best[1]
+    counts = np.full(rows, n // rows)
+    counts[:n % rows] += 1
+    r = np.repeat(np.arange(rows), counts)
+    j = np.arange(n) - np.repeat(np.concatenate([[0], np.cumsum(counts)[:-1]]), counts)
+    k = counts[r]
+    shift = np.where(r % 2 == 1, 0.25, -0.25) if rows > 1 else 0.0
+    x = x0 + (j + 0.5 + shift) * (w / k)
+    y = y0 + (r + 0.5) * (h / rows)
+    return np.clip(x, x0, x1), y
+
+
+def _edge_grid(x0, x1, y0, y1, n):
+    # ตารางที่แถว/คอลัมน์แรกและสุดท้ายชิดขอบพื้นที่ใช้งาน: เลือกจำนวนคอลัมน์ที่ให้ระยะห่างมากที่สุด
+    # (ได้ระยะมากกว่า _lattice เมื่อหัวน้อยบนหน้าเล็ก) ถ้าจุดในตารางเกิน n ก็เลือกแบบกระจายเท่าๆ กัน
+    w, h = x1 - x0, y1 - y0
+    best = None
+    for cols in range(1, n + 1):
+        rows = math.ceil(n / cols)
+        if (cols > 1 and w <= 0) or (rows > 1 and h <= 0):
+            continue
+        gap = min(w / (cols - 1) if cols > 1 else math.inf, h / (rows - 1) if rows > 1 else math.inf)
+        if best is None or gap > best[0]:
+            best = (gap, cols, rows)
+    if best is None:
+        return np.full(n, (x0 + x1) / 2), np.full(n, (y0 + y1) / 2)
+    _, cols, rows = best
+    gx = np.linspace(x0, x1, cols) if cols > 1 else np.array([(x0 + x1) / 2])
+    gy = np.linspace(y0, y1, rows) if rows > 1 else np.array([(y0 + y1) / 2])
+    px, py = (a.ravel() for a in np.meshgrid(gx, gy))
+    pick = np.round(np.linspace(0, len(px) - 1, n)).astype(int)
+    return px[pick], py[pick]
+
+
+def _interleave(x, y, n28):
+    # เรียงหัวตามแถวแบบงูเลื้อย แล้วแจก 28k ให้กระจายเท่าๆ กันตามลำดับนั้น
+    n = len(x)
+    row = np.round(y, 6)
+    _, row_id = np.unique(row, return_inverse=True)
+    key_x = np.where(row_id % 2 == 0, x, -x)
+    order = np.lexsort((key_x, row))
+    k = np.arange(n)
+    is28 = ((k + 1) * n28) // n > (k * n28) // n
+    fq = np.empty(n, dtype=int)
+    fq[order] = np.where(is28, 28, 40)
+    return fq
+
+
+def place_heads(l, area_h, n28, n40, clearance=CLEARANCE, min_pitch=MIN_PITCH, iterations=ITERATIONS):
+    """Place ``n28 + n40`` heads evenly inside ``l`` x ``area_h``.
+
+    Returns ``(x, y, freqs)``. If the relaxed layout is tighter than
+    ``min_pitch``, the plain lattice and then an edge-to-edge grid are tried;
+    ``ValueError`` is raised when neither keeps ``clearance`` from the edges
+    and ``min_pitch`` between centres (other packings are not searched).
+    """
+    n = n28 + n40
+    if n <= 0:
+        return np.empty(0), np.empty(0), np.empty(0, dtype=int)
+    x0, x1, y0, y1 = clearance, l - clearance, clearance, area_h - clearance
+    if x1 < x0 or y1 < y0:
+        raise ValueError("Tank face is smaller than the edge clearance")
+    w, h = x1 - x0, y1 - y0
+
+    x, y = _lattice(x0, x1, y0, y1, n)
+    pitch = math.sqrt(max(w * h, 1e-9) / n)
+
+    if iterations > 0 and n > 1 and w > 0 and h > 0:
+        # จุดตัวอย่างสม่ำเสมอบนพื้นที่ใช้งาน
+        ns = SAMPLES_PER_HEAD * n
+        sx_n = max(1, round(math.sqrt(ns * w / h)))
+        sy_n = max(1, round(ns / sx_n))
+        gx = x0 + (np.arange(sx_n) + 0.5) * (w / sx_n)
+        gy = y0 + (np.arange(sy_n) + 0.5) * (h / sy_n)
+        sx, sy = (a.ravel() for a in np.meshgrid(gx, gy))
+        for _ in range(iterations):
+            idx, _ = GridIndex(x, y, 0.75 * pitch).nearest(sx, sy)
+            cnt = np.bincount(idx, minlength=n)
+            has = cnt > 0
+            x = np.where(has, np.bincount(idx, sx, minlength=n) / np.maximum(cnt, 1), x)
+            y = np.where(has, np.bincount(idx, sy, minlength=n) / np.maximum(cnt, 1), y)
+
+    if n > 1 and min_pitch > 0:
+        gap = nearest_gap(x, y)
+        if gap < min_pitch:
+            for cx, cy in (_lattice(x0, x1, y0, y1, n), _edge_grid(x0, x1, y0, y1, n)):
+                if nearest_gap(cx, cy) >= min_pitch:
+                    x, y = cx, cy
+                    break
+            else:
+                raise ValueError(f"{n} heads do not fit at {min_pitch:g} cm pitch")
+
+    return x, y, _interleave(x, y, n28)
+
+
+def nearest_gap(x, y):
+    # ระยะศูนย์กลางหัวที่ใกล้กันที่สุดในผัง
+    n = len(x)
+    if n < 2:
+        return math.inf
+    span = max(np.ptp(x), np.ptp(y), 1e-9)
+    area = max(np.ptp(x) * np.ptp(y), span * span / n)
+    _, dist = GridIndex(x, y, 1.5 * math.sqrt(area / n)).nearest(x, y, exclude=np.arange(n))
+    return float(dist.min())
+
+
+def layout_heads(l, area_h, h_list, off=False, method="grid"):
+    """Head centres and frequencies for one mounting face.
+
+    ``"grid"`` keeps the classic staggered grid with the given (shuffled)
+    ``h_list`` order; ``"optimized"`` uses :func:`place_heads`.
+    """
+    if method == "grid":
+        x, y = head_positions(l, area_h, len(h_list), off)
+        return x, y, np.asarray(h_list, dtype=int)
+    if method != "optimized":
+        raise ValueError(f"Unknown layout method: {method!r}")
+    fq = np.asarray(h_list, dtype=int)
+    x, y, freqs = place_heads(l, area_h, int((fq == 28).sum()), int((fq != 28).sum()))
+    if off:
+        # อีกด้านของถังกลับทิศ เพื่อให้หัวสองฝั่งไม่ตรงกัน
+        x = l - x
+    return x, y, freqs
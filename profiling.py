@@ -0,0 +1,120 @@
+import json
+import math
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+# ==========================================
+# PROFILING (จับเวลาแต่ละขั้นต่อหนึ่ง rerun)
+# ==========================================
+# เปิดด้วย ULTRASONIC_PROFILE=1 หรือ toggle ใน sidebar
+# ULTRASONIC_PROFILE_LOG=profile.jsonl  -> บันทึกทุก rerun เป็น JSON lines
+# python profiling.py profile.jsonl     -> สรุป p50/p95 ต่อขั้นจาก log
+# ตอนปิด span()/lap() เช็ค thread-local ครั้งเดียวแล้วจบ (span คืน context ว่างตัวเดียวกันทุกครั้ง)
+ENABLED = os.environ.get("ULTRASONIC_PROFILE", "") not in ("", "0")
+LOG_PATH = os.environ.get("ULTRASONIC_PROFILE_LOG")
+HISTORY = int(os.environ.get("ULTRASONIC_PROFILE_HISTORY", "50"))
+
+# rerun ล่าสุดของทั้ง process (ทุกผู้ใช้รวมกัน) คู่กับ log; หน้าเว็บแสดงจาก history ของแต่ละ session
+history = deque(maxlen=HISTORY)
+_NULL = nullcontext()
+_local = threading.local()
+_lock = threading.Lock()
+
+
+def start_run(page):
+    now = time.perf_counter()
+    _local.run = {"ts": time.time(), "page": page, "t0": now, "last": now, "spans": {}}
+
+
+def span(name):
+    run = getattr(_local, "run", None)
+    if run is None:
+        return _NULL
+    return _timed(run["spans"], name)
+
+
+def lap(name):
+    # เวลาตั้งแต่ lap ก่อนหน้า (หรือตั้งแต่เริ่ม rerun) นับเป็นขั้น name
+    run = getattr(_local, "run", None)
+    if run is None:
+        return
+    now = time.perf_counter()
+    run["spans"][name] = run["spans"].get(name, 0.0) + (now - run["last"])
+    run["last"] = now
+
+
+@contextmanager
+def _timed(spans, name):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        spans[name] = spans.get(name, 0.0) + (time.perf_counter() - t0)
+
+
+def new_history():
+    return deque(maxlen=HISTORY)
+
+
+def end_run(session_history=None):
+    """Finish the current rerun and return its record.
+
+    The record goes to the process-wide :data:`history` and log, and also to
+    ``session_history`` (see :func:`new_history`) when given.
+    """
+    run = getattr(_local, "run", None)
+    if run is None:
+        return None
+    _local.run = None
+    rec = {
+        "ts": round(run["ts"], 3),
+        "page": run["page"],
+        "total_ms": round((time.perf_counter() - run["t0"]) * 1000, 3),
+        "spans_ms": {k: round(v * 1000, 3) for k, v in run["spans"].items()},
+    }
+    if session_history is not None:
+        session_history.append(rec)
+    with _lock:
+        history.append(rec)
+        if LOG_PATH:
+            with open(LOG_PATH, "a", encoding="utf-8") as f:
+                f.write(json.dumps(rec) + "\n")
+    return rec
+
+
+def _pct(sorted_vals, q):
+    # nearest-rank percentile
+    k = max(0, math.ceil(q / 100 * len(sorted_vals)) - 1)
+    return sorted_vals[k]
+
+
+def summarize(records):
+    """Return ``{stage: {"n", "p50_ms", "p95_ms"}}`` over ``records`` (``total`` included)."""
+    values = {}
+    for rec in records:
+        values.setdefault("total", []).append(rec["total_ms"])
+        for k, v in rec["spans_ms"].items():
+            values.setdefault(k, []).append(v)
+    out = {}
+    for k, vals in values.items():
+        vals.sort()
+        out[k] = {"n": len(vals), "p50_ms": _pct(vals, 50), "p95_ms": _pct(vals, 95)}
+    return out
+
+
+def read_log(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+if __name__ == "__main__":
+    for path in sys.argv[1:] or [LOG_PATH or "profile.jsonl"]:
+        stats = summarize(read_log(path))
+        print(f"{path}")
+        print(f"  {'stage':<20} {'n':>6} {'p50 ms':>10} {'p95 ms':>10}")
+        for k, s in sorted(stats.items(), key=lambda kv: -kv[1]["p95_ms"]):
+            print(f"  {k:<20} {s['n']:>6} {s['p50_ms']:>10.2f} {s['p95_ms']:>10.2f}")
@@ -0,0 +1,302 @@
+import io
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import matplotlib.patches as patches
+from matplotlib.collections import EllipseCollection
+from matplotlib.figure import Figure
+from matplotlib.lines import Line2D
+
+from core import VOL_BREAKS
+from placement import layout_heads
+
+# ==========================================
+# LAYOUT RENDERING (วาดผังหัว + แคชรูปภาพ)
+# ==========================================
+# ขนาดแคชรวมต่อ process (MB) ปรับได้ผ่าน env
+CACHE_MAX_MB = float(os.environ.get("ULTRASONIC_RENDER_CACHE_MB", "64"))
+SAVE_OPTS = {"bbox_inches": "tight", "dpi": 200}
+HEAD_R = 2.5
+HEAD_COLORS = {28: '#d32f2f', 40: '#1976d2'}
+# ป้ายความถี่บนหัว: ขนาดตัวอักษร (pt) และเส้นผ่านศูนย์กลางหัวบนรูปที่เล็กที่สุดที่ยังเขียนป้าย
+LABEL_PT = 7
+LABEL_MIN_PT = 6
+
+
+def _head_points(fig, ax, width, height, spacing):
+    # ขนาดหัวที่มองเห็นบนรูป (pt): เส้นผ่านศูนย์กลาง หรือระยะห่างเฉลี่ยถ้าหัวซ้อนกัน
+    # แกนเป็น aspect เท่ากัน จึงใช้สเกลของด้านที่แน่นกว่า
+    box = ax.get_position()
+    w_in, h_in = box.width * fig.get_figwidth(), box.height * fig.get_figheight()
+    return min(2 * HEAD_R, spacing) * 72 * min(w_in / width, h_in / height)
+
+
+def draw_tank(l, h_limit, h_list, title, side=False, tank_h=0, water_h=0, off=False, labels=True,
+              field=None, blind_level=None, layout="grid"):
+    # ไม่ผ่าน pyplot: ไม่มี state กลาง วาดจาก thread อื่นได้และไม่ต้อง close
+    fig = Figure(figsize=(6, 4))
+    ax = fig.subplots()
+    ax.set_title(title, fontsize=10, weight='bold')
+
+    if side:
+        ax.add_patch(patches.Rectangle((0,0), l, tank_h, fc='#eeeeee', ec='#444', lw=2))
+        ax.add_patch(patches.Rectangle((0,0), l, water_h, fc='#b3e5fc', alpha=0.6))
+        ax.axhline(y=water_h, color='#0277bd', linestyle='--', lw=1)
+        area_h = water_h
+    else:
+        ax.add_patch(patches.Rectangle((0,0), l, h_limit, fc='#e1f5fe', ec='#444', lw=2))
+        area_h = h_limit
+
+    if field is not None and area_h > 0:
+        # แผนที่ความเข้มคลื่นใต้หัว + เส้นขอบจุดบอด
+        ax.imshow(field, origin='lower', extent=(0, l, 0, area_h), cmap='RdYlGn', alpha=0.55,
+                  interpolation='bilinear', aspect='auto', zorder=1)
+        if blind_level is not None and field.min() < blind_level < field.max():
+            ax.contour(field, levels=[blind_level], origin='lower', extent=(0, l, 0, area_h),
+                       colors='#212121', linestyles='--', linewidths=0.8, zorder=1)
+
+    x, y, fq = layout_heads(l, area_h, h_list, off, layout) if area_h > 0 else (np.empty(0),) * 3
+    if len(x):
+        head_pt = _head_points(fig, ax, l + 4, (tank_h if side else h_limit) + 4, np.sqrt(l * area_h / len(x)))
+        # หนึ่ง collection ต่อหนึ่งความถี่ แทนการเพิ่ม Circle ทีละหัว (ขอบขาวเฉพาะหัวที่ใหญ่พอจะเห็น)
+        for f in np.unique(fq):
+            sel = fq == f
+            ax.add_collection(EllipseCollection(
+                HEAD_R * 2, HEAD_R * 2, 0, units='xy', offsets=np.column_stack([x[sel], y[sel]]),
+                offset_transform=ax.transData, facecolors=HEAD_COLORS.get(f, '#1976d2'),
+                edgecolors='white' if head_pt >= LABEL_MIN_PT else 'face', alpha=0.9, zorder=2))
+        # ป้ายกำกับเป็น marker ข้อความ หนึ่ง collection ต่อความถี่ (ไม่ใช่ ax.text ทีละหัว)
+        # เขียนเมื่อหัวบนรูปใหญ่พอให้อ่านออก ไม่งั้นใช้ legend แทน
+        if labels and head_pt >= LABEL_MIN_PT:
+            size = min(LABEL_PT, head_pt * 0.6)
+            for f in np.unique(fq):
+                sel = fq == f
+                ax.scatter(x[sel], y[sel], s=(size * len(str(f)) * 0.6) ** 2, marker=f"${f}$", c='white',
+                           linewidths=0, zorder=3)
+        else:
+            ax.legend(handles=[Line2D([], [], ls='', marker='o', color=HEAD_COLORS.get(f, '#1976d2'), label=f"{f} kHz")
+                               for f in np.unique(fq)], loc='upper right', fontsize=7)
+
+    ax.set_xlim(-2, l + 2)
+    ax.set_ylim(-2, (tank_h if side else h_limit) + 2)
+    ax.set_aspect('equal')
+    return fig
+
+
+class RenderCache:
+    """Thread-safe LRU of rendered image bytes, bounded by total size."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = int(max_bytes)
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            data = self._items.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def put(self, key, data):
+        with self._lock:
+            if key in self._items:
+                self.nbytes -= len(self._items.pop(key))
+            if len(data) > self.max_bytes:
+                return
+            self._items[key] = data
+            self.nbytes += len(data)
+            while self.nbytes > self.max_bytes:
+                _, old = self._items.popitem(last=False)
+                self.nbytes -= len(old)
+
+    def resize(self, max_bytes):
+        with self._lock:
+            self.max_bytes = int(max_bytes)
+            while self._items and self.nbytes > self.max_bytes:
+                _, old = self._items.popitem(last=False)
+                self.nbytes -= len(old)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.nbytes = 0
+
+    def __len__(self):
+        return len(self._items)
+
+
+cache = RenderCache(CACHE_MAX_MB * 1024 * 1024)
+
+
+def tank_key(l, h_limit, h_list, title, side=False, tank_h=0, water_h=0, off=False, labels=True,
+             coverage=None, layout="grid", fmt="png"):
+    """Cache key of a :func:`render_tank` call with the same arguments."""
+    # มุมมองก้นถังไม่ใช้ความสูงถัง/ระดับน้ำ จึงไม่ใส่ในคีย์
+    if not side:
+        tank_h, water_h = 0, 0
+    h_list = list(h_list)
+    heads = tuple(h_list) if layout == "grid" else (h_list.count(28), len(h_list) - h_list.count(28))
+    return (fmt, layout, float(l), float(h_limit), heads, title, bool(side),
+            float(tank_h), float(water_h), bool(off), bool(labels),
+            tuple(sorted((k, repr(v)) for k, v in coverage.items())) if coverage else None)
+
+
+def render_tank(l, h_limit, h_list, title, side=False, tank_h=0, water_h=0, off=False, labels=True,
+                coverage=None, layout="grid", fmt="png"):
+    """Return the ``draw_tank`` image as PNG/SVG bytes, served from ``cache`` when possible.
+
+    ``coverage`` is ``None`` or a dict of ``acoustic.coverage_map`` keyword
+    arguments (``w_head``, ``depth``, ``layers``) to overlay the intensity map.
+    ``layout`` is a ``placement.layout_heads`` method. For ``"optimized"``
+    only the 28k/40k counts matter, so the key drops the shuffle order.
+    """
+    key = tank_key(l, h_limit, h_list, title, side, tank_h, water_h, off, labels, coverage, layout, fmt)
+    data = cache.get(key)
+    if data is None:
+        field, blind_level = None, None
+        if coverage:
+            from acoustic import coverage_map
+            fields, stats = coverage_map(l, water_h if side else h_limit, h_list, off, layout=layout, **coverage)
+            field = fields.mean(axis=0)
+            blind_level = stats["threshold_level"]
+        fig = draw_tank(l, h_limit, h_list, title, side, tank_h, water_h, off, labels, field, blind_level, layout)
+        buf = io.BytesIO()
+        fig.savefig(buf, format=fmt, **SAVE_OPTS)
+        data = buf.getvalue()
+        cache.put(key, data)
+    return data
+
+
+def draw_sweep(res, x_name, y_name=None, metric="actual_density"):
+    from sweep import axis_label
+
+    if y_name is None:
+        # 1 ตัวแปร: ความหนาแน่น (บน) + จำนวนบอร์ด (ล่าง), เส้นประ = ปริมาตรข้ามเกณฑ์
+        fig = Figure(figsize=(7, 5))
+        ax1, ax2 = fig.subplots(2, 1, sharex=True, height_ratios=(3, 2))
+        x = res["x"]
+        ax1.plot(x, res["actual_density"], color='#2e7d32', lw=1.5, label='Actual W/L')
+        ax1.plot(x, res["target_density"], color='#424242', lw=1, drawstyle='steps-post', label='Target W/L')
+        ax1.plot(x, res["rec_density"], color='#ef6c00', lw=1, ls=':', drawstyle='steps-post', label='Recommended W/L')
+        if not res["passed"].all():
+            ax1.fill_between(x, 0, 1, where=~res["passed"], transform=ax1.get_xaxis_transform(),
+                             color='#d32f2f', alpha=0.08, lw=0, label='Fail')
+        ax1.set_ylabel('W/L')
+        ax1.legend(loc='upper right', fontsize=7)
+        ax2.step(x, res["n_b28"], where='post', color=HEAD_COLORS[28], label='28 kHz boards')
+        ax2.step(x, res["n_b40"], where='post', color=HEAD_COLORS[40], label='40 kHz boards')
+        ax2.set_ylabel('Boards')
+        ax2.set_xlabel(axis_label(x_name))
+        ax2.legend(loc='upper left', fontsize=7)
+        for ax in (ax1, ax2):
+            for b in res["breaks"]:
+                ax.axvline(b, color='#757575', ls='--', lw=0.6)
+            ax.grid(alpha=0.3)
+        return fig
+
+    # 2 ตัวแปร: heatmap ของ metric + เส้นขอบผ่าน/ไม่ผ่าน + เส้นปริมาตรตามเกณฑ์
+    fig = Figure(figsize=(7, 5))
+    ax = fig.subplots()
+    x, y = res["x"], res["y"]
+    extent = (x[0], x[-1], y[0], y[-1])
+    im = ax.imshow(np.asarray(res[metric], dtype=float), origin='lower', extent=extent, aspect='auto',
+                   cmap='viridis', interpolation='nearest')
+    fig.colorbar(im, ax=ax, label=metric)
+    title = metric
+    passed = res["passed"].astype(float)
+    if 0 < passed.mean() < 1:
+        ax.contour(x, y, passed, levels=[0.5], colors='#d32f2f', linewidths=1.2)
+        title += " (red = pass boundary)"
+    vol = res["vol"]
+    levels = [b for b in VOL_BREAKS if vol.min() < b < vol.max()]
+    if levels:
+        cs = ax.contour(x, y, vol, levels=levels, colors='white', linestyles='--', linewidths=0.7)
+        ax.clabel(cs, fmt='%g L', fontsize=7)
+    ax.set_xlabel(axis_label(x_name))
+    ax.set_ylabel(axis_label(y_name))
+    ax.set_title(title, fontsize=10)
+    return fig
+
+
+def render_sweep(base=None, x=("water_level", 1.0, 60.0, 500), y=None, metric="actual_density", fmt="png"):
+    """Return the :func:`draw_sweep` image of ``sweep.sweep(base, x, y)`` as bytes (cached)."""
+    from sweep import sweep
+
+    key = ("sweep", fmt, tuple(sorted((base or {}).items())), tuple(x), tuple(y) if y else None,
+           metric if y else None)
+    data = cache.get(key)
+    if data is None:
+        res = sweep(base, x, y)
+        fig = draw_sweep(res, x[0], y[0] if y else None, metric)
+        buf = io.BytesIO()
+        fig.savefig(buf, format=fmt, **SAVE_OPTS)
+        data = buf.getvalue()
+        cache.put(key, data)
+    return data
+
+
+def draw_tolerance(res):
+    # histogram ของความหนาแน่นจาก Monte Carlo: แดง = ไม่ผ่าน, เส้นประ = เกณฑ์, เส้นทึบ = ค่าที่ออกแบบ
+    fig = Figure(figsize=(7, 3))
+    ax = fig.subplots()
+    edges, counts = res["edges"], res["counts"]
+    share = counts / res["trials"] * 100
+    fail = edges[1:] <= res["threshold"]
+    ax.bar(edges[:-1], share, width=np.diff(edges), align='edge', lw=0,
+           color=np.where(fail, '#e57373', '#81c784'))
+    ax.axvline(res["threshold"], color='#c62828', ls='--', lw=1, label=f"Pass threshold {res['threshold']:.2f}")
+    ax.axvline(res["nominal_density"], color='#212121', lw=1, label=f"Nominal {res['nominal_density']:.2f}")
+    lo, hi = res["percentiles"][min(res["percentiles"])], res["percentiles"][max(res["percentiles"])]
+    pad = max(hi - lo, 1e-9) * 0.5
+    ax.set_xlim(max(min(lo, res["threshold"]) - pad, 0), max(hi, res["threshold"], res["nominal_density"]) + pad)
+    ax.set_xlabel('Actual density (W/L)')
+    ax.set_ylabel('Trials (%)')
+    ax.set_title(f"P(pass) = {res['p_pass'] * 100:.2f} %  ({res['trials']:,} trials)", fontsize=10)
+    ax.legend(loc='upper right', fontsize=7)
+    ax.grid(alpha=0.3)
+    return fig
+
+
+def render_tolerance(res, fmt="png"):
+    """Return the :func:`draw_tolerance` image of a ``tolerance.simulate`` result as bytes."""
+    buf = io.BytesIO()
+    draw_tolerance(res).savefig(buf, format=fmt, **SAVE_OPTS)
+    return buf.getvalue()
+
+
+def draw_thermal(res):
+    # อุณหภูมิน้ำ (บน) + พลังงานไฟฟ้าสะสม (ล่าง) หนึ่งเส้นต่อ duty cycle
+    fig = Figure(figsize=(7, 5))
+    ax1, ax2 = fig.subplots(2, 1, sharex=True, height_ratios=(3, 2))
+    t = res["t"]
+    colors = [f"C{i % 10}" for i in range(len(res["duties"]))]
+    for duty, temp, kwh, c in zip(res["duties"], res["temp"], res["energy_kwh"], colors):
+        ax1.plot(t, temp, color=c, lw=1.2, label=f"Duty {duty * 100:g} %")
+        ax2.plot(t, kwh, color=c, lw=1.2)
+    ax1.axhline(res["ambient"], color='#757575', ls=':', lw=0.8, label='Ambient')
+    if res["limit"] is not None:
+        ax1.axhline(res["limit"], color='#c62828', ls='--', lw=1, label=f"Limit {res['limit']:g} °C")
+    ax1.set_ylabel('Bath temperature (°C)')
+    ax1.legend(loc='upper left', fontsize=7, ncol=2)
+    ax2.set_ylabel('Energy (kWh)')
+    ax2.set_xlabel('Time (h)')
+    ax2.set_xlim(t[0], t[-1])
+    for ax in (ax1, ax2):
+        ax.grid(alpha=0.3)
+    return fig
+
+
+def render_thermal(res, fmt="png"):
+    """Return the :func:`draw_thermal` image of a ``thermal.simulate`` result as bytes."""
+    buf = io.BytesIO()
+    draw_thermal(res).savefig(buf, format=fmt, **SAVE_OPTS)
+    return buf.getvalue()
@@ -0,0 +1,223 @@
+import csv
+import io
+import os
+import re
+import tempfile
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from matplotlib.backends.backend_pdf import PdfPages
+from matplotlib.figure import Figure
+
+import core
+
+# ==========================================
+# REPORT EXPORT (PDF + CSV BOM + รูปผังความละเอียดสูง)
+# ==========================================
+# หนึ่งแบบ = ไฟล์ report.pdf, bom.csv และ layout_*.png
+# งาน export ทำใน thread เบื้องหลัง (หน้าเว็บไม่ค้าง) และเขียนลง zip ทีละแบบ
+# รูปของแบบก่อนหน้าถูกทิ้งก่อนเริ่มแบบถัดไป หน่วยความจำจึงไม่โตตามจำนวนแบบ
+# ULTRASONIC_EXPORT_WORKERS=4 -> จำนวนงาน export ที่ทำพร้อมกันได้ทั้ง process
+# (งานใหญ่ของผู้ใช้คนหนึ่งจึงไม่ขวางงานเล็กของคนอื่น)
+REPORT_DPI = 300
+PAGE_SIZE = (8.27, 11.69)   # A4 (นิ้ว)
+BOM_COLUMNS = ["item", "freq_khz", "w_per_board", "heads_per_board", "boards", "heads", "total_w"]
+EXPORT_WORKERS = max(1, int(os.environ.get("ULTRASONIC_EXPORT_WORKERS", "4")))
+
+executor = ThreadPoolExecutor(EXPORT_WORKERS, thread_name_prefix="export")
+
+
+def make_design(name, inputs, H=0.0, mount="bottom", layout="grid"):
+    """One design to export: ``inputs`` are ``core.size_tank`` keyword arguments."""
+    return {"name": str(name), "inputs": dict(inputs), "H": float(H), "mount": mount, "layout": layout}
+
+
+def designs_from_plan(plan):
+    # แถวของ batch.design_batch / line.plan_line -> แบบสำหรับ export (ทีละแถว ไม่สร้างทั้งหมดพร้อมกัน)
+    from batch import row_inputs
+
+    for i, row in enumerate(plan.to_dict("records")):
+        yield make_design(row.get("name") or f"Tank {i + 1}", row_inputs(row), row.get("H") or 0.0,
+                          row.get("mount") or "bottom")
+
+
+def bom_rows(res, inputs):
+    rows = []
+    for freq in (28, 40):
+        boards = res[f"n_b{freq}"]
+        w_each = float(inputs.get(f"w_board_{freq}", 120.0))
+        rows.append({
+            "item": f"Ultrasonic generator board {freq} kHz",
+            "freq_khz": freq,
+            "w_per_board": w_each,
+            "heads_per_board": int(inputs.get(f"h_board_{freq}", 2 if freq == 28 else 3)),
+            "boards": boards,
+            "heads": res[f"n_h{freq}"],
+            "total_w": boards * w_each,
+        })
+    return rows
+
+
+def bom_csv(res, inputs):
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=BOM_COLUMNS)
+    writer.writeheader()
+    writer.writerows(bom_rows(res, inputs))
+    return buf.getvalue().encode("utf-8")
+
+
+def _views(design, res):
+    from line import tank_views
+
+    inp = design["inputs"]
+    row = {"name": design["name"], "L": inp["l"], "W": inp["w"], "H": design["H"], "water_level": inp["water_level"],
+           "mount": design["mount"], "n_h28": res["n_h28"], "n_h40": res["n_h40"]}
+    return tank_views(row, labels=True, layout=design["layout"])
+
+
+def _summary_page(design, res):
+    inp = design["inputs"]
+    fig = Figure(figsize=PAGE_SIZE)
+    fig.text(0.08, 0.95, f"Ultrasonic Design Report: {design['name']}", fontsize=16, weight='bold')
+    fig.text(0.08, 0.925, datetime.now().strftime("%Y-%m-%d %H:%M"), fontsize=9, color='#616161')
+
+    verdict = "PASSED" if res["passed"] else f"BELOW standard (missing {res['missing_density']:.1f} W/L)"
+    fig.text(0.08, 0.885, verdict, fontsize=13, weight='bold', color='#2e7d32' if res["passed"] else '#c62828')
+
+    rows = [
+        ("Tank L x W (cm)", f"{inp['l']:g} x {inp['w']:g}"),
+        ("Tank height (cm)", f"{design['H']:g}" if design["H"] else "-"),
+        ("Water level (cm)", f"{inp['water_level']:g}"),
+        ("Water volume (L)", f"{res['vol']:.2f}"),
+        ("Chemistry / heavy load", f"{'yes' if inp.get('use_chem', True) else 'no'} / "
+                                   f"{'yes' if inp.get('heavy_load', True) else 'no'}"),
+        ("Mode", inp.get("mode", "new")),
+        ("Mounting / layout", f"{design['mount']} / {design['layout']}"),
+        ("Recommended density (W/L)", f"{res['rec_density']}"),
+        ("Target density (W/L)", f"{res['target_density']:g}"),
+        ("Actual density (W/L)", f"{res['actual_density']:.2f}"),
+        ("Pass threshold (W/L)", f"{res['target_density'] * core.PASS_RATIO:.2f}"),
+        ("Total power (W)", f"{res['real_total_w']:.0f}"),
+    ]
+    ax = fig.add_axes([0.08, 0.50, 0.84, 0.36])
+    ax.axis('off')
+    ax.set_title("Inputs & Results", loc='left', fontsize=11, weight='bold')
+    tb = ax.table(cellText=rows, colWidths=[0.55, 0.45], loc='upper left', cellLoc='left')
+    tb.auto_set_font_size(False)
+    tb.set_fontsize(9)
+    tb.scale(1, 1.4)
+
+    bom = bom_rows(res, inp)
+    ax = fig.add_axes([0.08, 0.25, 0.84, 0.18])
+    ax.axis('off')
+    ax.set_title("Bill of Materials", loc='left', fontsize=11, weight='bold')
+    tb = ax.table(cellText=[[f"{r['freq_khz']} kHz board", f"{r['w_per_board']:g}", r["heads_per_board"], r["boards"],
+                             r["heads"], f"{r['total_w']:.0f}"] for r in bom],
+                  colLabels=["Item", "W/board", "Heads/board", "Boards", "Heads", "Total W"], loc='upper left')
+    tb.auto_set_font_size(False)
+    tb.set_fontsize(9)
+    tb.scale(1, 1.4)
+    return fig
+
+
+def _draw_view(args, kwargs):
+    # เหมือนหน้าคำนวณ: จัดวางแบบเกลี่ยไม่ได้ (หน้าถังเล็กกว่าระยะขอบ/หัวไม่พอที่) ใช้แบบตารางแทน
+    from render import draw_tank
+
+    try:
+        return draw_tank(*args, **kwargs)
+    except ValueError:
+        if kwargs.get("layout", "grid") == "grid":
+            raise
+        return draw_tank(*args, **dict(kwargs, layout="grid"))
+
+
+def write_pdf(fh, design, res=None):
+    """Write the report of one design (summary page + one page per layout view) to ``fh``."""
+    res = res or core.size_tank(**design["inputs"])
+    with PdfPages(fh) as pdf:
+        pdf.savefig(_summary_page(design, res))
+        for args, kwargs in _views(design, res):
+            pdf.savefig(_draw_view(args, kwargs), bbox_inches='tight')
+
+
+def design_files(design, res=None):
+    """Yield ``(filename, bytes)`` for one design, one file at a time."""
+    res = res or core.size_tank(**design["inputs"])
+    buf = io.BytesIO()
+    write_pdf(buf, design, res)
+    yield "report.pdf", buf.getvalue()
+    yield "bom.csv", bom_csv(res, design["inputs"])
+    for k, (args, kwargs) in enumerate(_views(design, res), 1):
+        buf = io.BytesIO()
+        _draw_view(args, kwargs).savefig(buf, format="png", bbox_inches='tight', dpi=REPORT_DPI)
+        yield f"layout_{k}.png", buf.getvalue()
+
+
+def _slug(name):
+    # ตัดเฉพาะอักขระที่ใช้ในชื่อไฟล์ไม่ได้ (เก็บสระ/วรรณยุกต์ภาษาไทยไว้)
+    return re.sub(r'[\\/:*?"<>|\s]+', "_", name).strip("_.") or "design"
+
+
+def export_zip(designs, file, progress=None):
+    """Stream every design's files into one zip written to ``file`` (path or binary file object).
+
+    ``designs`` may be any iterable (e.g. a generator). A combined
+    ``bom_all.csv`` with one row per design and board type is added at the end.
+    ``progress(done)`` is called after each design.
+    """
+    summary = io.StringIO()
+    writer = csv.DictWriter(summary, fieldnames=["design", "passed"] + BOM_COLUMNS)
+    writer.writeheader()
+    with zipfile.ZipFile(file, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for i, design in enumerate(designs, 1):
+            folder = f"{i:03d}_{_slug(design['name'])}"
+            res = core.size_tank(**design["inputs"])
+            for name, data in design_files(design, res):
+                # PNG/PDF บีบอัดอยู่แล้ว เก็บตรงๆ เร็วกว่า
+                zf.writestr(f"{folder}/{name}", data,
+                            compress_type=zipfile.ZIP_DEFLATED if name.endswith(".csv") else zipfile.ZIP_STORED)
+            writer.writerows({"design": design["name"], "passed": res["passed"], **r}
+                             for r in bom_rows(res, design["inputs"]))
+            if progress:
+                progress(i)
+        zf.writestr("bom_all.csv", summary.getvalue())
+
+
+class ExportJob:
+    """Background export into a temporary zip file; poll ``done()`` and read ``result()``.
+
+    The temporary file is removed once ``result()`` has read it (or by ``cleanup()``).
+    """
+
+    def __init__(self, designs, total=None, filename="ultrasonic_reports.zip"):
+        self.total = total
+        self.filename = filename
+        self.completed = 0
+        self._data = None
+        fd, self.path = tempfile.mkstemp(suffix=".zip", prefix="ultrasonic_")
+        os.close(fd)
+        self.future = executor.submit(export_zip, designs, self.path, self._progress)
+
+    def _progress(self, done):
+        self.completed = done
+
+    def done(self):
+        return self.future.done()
+
+    def result(self):
+        # รอจนเสร็จ แล้วคืน bytes ของ zip (ถ้า export ล้มเหลวจะ raise error เดิม)
+        # อ่านครั้งแรกแล้วลบไฟล์ชั่วคราวทันที ครั้งต่อไปคืน bytes เดิม
+        if self._data is None:
+            try:
+                self.future.result()
+                with open(self.path, "rb") as f:
+                    self._data = f.read()
+            finally:
+                self.cleanup()
+        return self._data
+
+    def cleanup(self):
+        if self.done() and os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,196 @@
+import argparse
+import asyncio
+import json
+import math
+import sys
+from functools import lru_cache
+
+import core
+
+# ==========================================
+# SIZING SERVICE (HTTP/JSON สำหรับ MES / ระบบเสนอราคา)
+# ==========================================
+# ใช้ stdlib ล้วน (asyncio) ไม่ต้องเปิด Streamlit
+# python service.py --port 8000
+# POST /design  {"l": 170, "w": 80, "water_level": 10}
+# POST /check   {"l": 170, "w": 80, "water_level": 10, "n_b28": 3, "n_b40": 1}
+# POST /batch   [{...}, {"mode": "check", ...}]   -> ผลเรียงตามลำดับ
+# GET  /health, GET /stats
+# ชื่อฟิลด์ตรงกับ core.size_tank (ratio_28 เป็นสัดส่วน 0-1)
+FIELDS = {
+    "l": float, "w": float, "water_level": float,
+    "use_chem": bool, "heavy_load": bool,
+    "w_board_28": float, "h_board_28": int, "w_board_40": float, "h_board_40": int,
+    "target_density": float, "ratio_28": float, "n_b28": int, "n_b40": int,
+}
+RANGES = {"ratio_28": (0.0, 1.0)}
+REQUIRED = ("l", "w", "water_level")
+MODES = ("new", "check")
+ENDPOINTS = {"/design": "new", "/check": "check", "/batch": "new"}
+CACHE_SIZE = 65536
+MAX_BODY = 8 * 1024 * 1024
+MAX_BATCH = 10000
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large"}
+
+
+class RequestError(ValueError):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _value(k, v):
+    # ตรวจชนิดตาม FIELDS: flag รับ true/false (หรือ 0/1) ตัวเลขต้องจำกัด (ไม่ใช่ NaN/Inf)
+    # ฟิลด์จำนวนเต็มต้องเป็นจำนวนเต็มจริง (2.0 ได้, 2.5 ไม่ได้) แทนที่จะถูกตัดทิ้งเงียบๆ
+    kind = FIELDS[k]
+    if kind is bool:
+        if isinstance(v, bool) or (isinstance(v, int) and v in (0, 1)):
+            return bool(v)
+        raise RequestError(f"Field {k!r} must be a boolean")
+    if isinstance(v, bool) or not isinstance(v, (int, float)) or not math.isfinite(v):
+        raise RequestError(f"Field {k!r} must be a finite number")
+    if kind is int:
+        if not float(v).is_integer():
+            raise RequestError(f"Field {k!r} must be an integer")
+        return int(v)
+    lo, hi = RANGES.get(k, (-math.inf, math.inf))
+    if not lo <= v <= hi:
+        raise RequestError(f"Field {k!r} must be between {lo:g} and {hi:g}")
+    return float(v)
+
+
+def _canonical(item, mode):
+    # แปลงเป็น tuple เรียงตามชื่อ: อินพุตเดียวกันได้คีย์แคชเดียวกันไม่ว่าจะส่งลำดับไหน
+    if not isinstance(item, dict):
+        raise RequestError("Each design must be a JSON object")
+    item = dict(item)
+    mode = item.pop("mode", mode)
+    if mode not in MODES:
+        raise RequestError(f"Unknown mode: {mode!r}")
+    unknown = sorted(set(item) - set(FIELDS))
+    if unknown:
+        raise RequestError(f"Unknown fields: {', '.join(unknown)}")
+    missing = [k for k in REQUIRED if item.get(k) is None]
+    if missing:
+        raise RequestError(f"Missing fields: {', '.join(missing)}")
+    if mode == "check" and item.get("n_b28") is None and item.get("n_b40") is None:
+        raise RequestError("Check mode needs n_b28 and/or n_b40")
+    out = []
+    for k in sorted(item):
+        v = item[k]
+        if v is None:
+            continue
+        out.append((k, _value(k, v)))
+    return (("mode", mode),) + tuple(out)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _size_json(key):
+    # แคชเป็น bytes ที่ encode แล้ว: อินพุตซ้ำตอบได้โดยไม่คำนวณ/แปลง JSON ใหม่
+    return json.dumps(core.size_tank(**dict(key))).encode()
+
+
+def handle(method, path, body=b""):
+    """Route one request; returns ``(status, json_bytes)``. Used by the server and by tests."""
+    path = path.split("?", 1)[0].rstrip("/") or "/"
+    try:
+        if path == "/health":
+            return 200, b'{"status": "ok"}'
+        if path == "/stats":
+            info = _size_json.cache_info()
+            return 200, json.dumps({"hits": info.hits, "misses": info.misses, "size": info.currsize}).encode()
+        if path not in ENDPOINTS:
+            raise RequestError(f"Not found: {path}", 404)
+        if method != "POST":
+            raise RequestError("Use POST", 405)
+        try:
+            data = json.loads(body or b"null")
+        except ValueError as e:
+            raise RequestError(f"Invalid JSON: {e}")
+        if path == "/batch":
+            if not isinstance(data, list):
+                raise RequestError("Batch body must be a JSON array")
+            if len(data) > MAX_BATCH:
+                raise RequestError(f"Batch is limited to {MAX_BATCH} designs", 413)
+            parts = []
+            for i, item in enumerate(data):
+                try:
+                    parts.append(_size_json(_canonical(item, ENDPOINTS[path])))
+                except (ValueError, TypeError, ArithmeticError) as e:
+                    parts.append(json.dumps({"error": str(e), "index": i}).encode())
+            return 200, b"[" + b", ".join(parts) + b"]"
+        return 200, _size_json(_canonical(data, ENDPOINTS[path]))
+    except RequestError as e:
+        return e.status, json.dumps({"error": str(e)}).encode()
+    except (ValueError, TypeError, ArithmeticError) as e:
+        return 400, json.dumps({"error": str(e)}).encode()
+
+
+def _response(status, body, keep_alive):
+    head = (f"HTTP/1.1 {status} {REASONS.get(status, 'Error')}\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode("latin-1") + body
+
+
+async def _client(reader, writer):
+    try:
+        while True:
+            try:
+                head = await reader.readuntil(b"\r\n\r\n")
+            except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                break
+            lines = head.decode("latin-1").split("\r\n")
+            try:
+                method, target, version = lines[0].split(" ", 2)
+            except ValueError:
+                writer.write(_response(400, b'{"error": "Bad request line"}', False))
+                break
+            headers = {}
+            for line in lines[1:]:
+                if ":" in line:
+                    k, v = line.split(":", 1)
+                    headers[k.strip().lower()] = v.strip()
+            conn = headers.get("connection", "").lower()
+            keep_alive = conn != "close" if version == "HTTP/1.1" else conn == "keep-alive"
+            try:
+                length = int(headers.get("content-length", 0))
+            except ValueError:
+                length = -1
+            if not 0 <= length <= MAX_BODY:
+                writer.write(_response(413 if length > MAX_BODY else 400, b'{"error": "Bad Content-Length"}', False))
+                break
+            body = await reader.readexactly(length) if length else b""
+            status, out = handle(method, target, body)
+            writer.write(_response(status, out, keep_alive))
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(host="127.0.0.1", port=8000):
+    server = await asyncio.start_server(_client, host, port)
+    addrs = ", ".join(str(s.getsockname()) for s in server.sockets)
+    print(f"sizing service on {addrs}", file=sys.stderr)
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ultrasonic sizing HTTP/JSON service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,196 @@
+import hashlib
+import inspect
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import core
+
+# ==========================================
+# DESIGN STORE (บันทึกแบบลง SQLite + ค้นหาผ่าน index)
+# ==========================================
+# คีย์ของแต่ละแบบ = hash ของอินพุตในรูปมาตรฐาน (เติมค่า default, ตัดฟิลด์ที่โหมดนั้นไม่ใช้)
+# อินพุตเดิม -> hash เดิม -> ดึงผลที่บันทึกไว้ ไม่คำนวณใหม่
+# ค้นหา/กรองด้วย SQL บนคอลัมน์ที่มี index และดึงทีละหน้า ไม่โหลดทั้งตารางเข้าหน่วยความจำ
+# ULTRASONIC_STORE=/path/designs.sqlite -> เปลี่ยนตำแหน่งไฟล์
+HERE = os.path.dirname(os.path.abspath(__file__))
+DB_PATH = os.environ.get("ULTRASONIC_STORE", os.path.join(HERE, "designs.sqlite"))
+PAGE_SIZE = 200
+SORT_COLUMNS = ("id", "created", "name", "vol", "rec_density", "target_density", "actual_density",
+                "n_b28", "n_b40", "total_w")
+LIST_COLUMNS = ("id", "hash", "name", "created", "mode", "l", "w", "water_level", "use_chem", "heavy_load",
+                "vol", "rec_density", "target_density", "actual_density", "passed",
+                "n_b28", "n_b40", "n_h28", "n_h40", "total_w")
+
+_TYPES = {
+    "l": float, "w": float, "water_level": float, "use_chem": bool, "heavy_load": bool,
+    "w_board_28": float, "h_board_28": int, "w_board_40": float, "h_board_40": int,
+    "mode": str, "target_density": float, "ratio_28": float, "n_b28": int, "n_b40": int,
+}
+_DEFAULTS = {k: p.default for k, p in inspect.signature(core.size_tank).parameters.items()
+             if p.default is not inspect.Parameter.empty}
+_UNUSED = {"new": ("n_b28", "n_b40"), "check": ("target_density", "ratio_28")}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS designs (
+    id INTEGER PRIMARY KEY,
+    hash TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL DEFAULT '',
+    created REAL NOT NULL,
+    mode TEXT NOT NULL,
+    l REAL, w REAL, water_level REAL, use_chem INTEGER, heavy_load INTEGER,
+    vol REAL, rec_density REAL, target_density REAL, actual_density REAL, passed INTEGER,
+    n_b28 INTEGER, n_b40 INTEGER, n_h28 INTEGER, n_h40 INTEGER, total_w REAL,
+    inputs TEXT NOT NULL,
+    result TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_designs_vol ON designs (vol);
+CREATE INDEX IF NOT EXISTS ix_designs_density ON designs (actual_density);
+CREATE INDEX IF NOT EXISTS ix_designs_passed_vol ON designs (passed, vol);
+CREATE INDEX IF NOT EXISTS ix_designs_boards ON designs (n_b28, n_b40);
+CREATE INDEX IF NOT EXISTS ix_designs_n_b40 ON designs (n_b40);
+CREATE INDEX IF NOT EXISTS ix_designs_created ON designs (created);
+"""
+
+
+def canonical_inputs(inputs):
+    """``inputs`` completed with ``core.size_tank`` defaults, typed, minus fields the mode ignores."""
+    p = dict(_DEFAULTS, **inputs)
+    unknown = sorted(set(p) - set(_TYPES))
+    if unknown:
+        raise ValueError(f"Unknown inputs: {', '.join(unknown)}")
+    if p["mode"] not in _UNUSED:
+        raise ValueError(f"Unknown mode: {p['mode']!r}")
+    for k in _UNUSED[p["mode"]]:
+        p.pop(k, None)
+    return {k: (v if v is None else _TYPES[k](v)) for k, v in sorted(p.items())}
+
+
+def _keyed(inputs):
+    # (อินพุตมาตรฐาน, JSON ที่ใช้ทั้งคิด hash และเก็บลงตาราง, hash)
+    inputs = canonical_inputs(inputs)
+    text = json.dumps(inputs, separators=(",", ":"))
+    return inputs, text, hashlib.sha1(text.encode()).hexdigest()
+
+
+def input_hash(inputs):
+    return _keyed(inputs)[2]
+
+
+class DesignStore:
+    """SQLite-backed store of sized designs, keyed by :func:`input_hash`."""
+
+    def __init__(self, path=DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        # Streamlit เรียกจากหลาย thread จึงใช้ connection เดียวคุมด้วย lock
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        if path != ":memory:":
+            self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def _row(self, inputs, res, name, now):
+        inputs, text, h = _keyed(inputs)
+        return (h, name if isinstance(name, str) else "", now, inputs["mode"], inputs["l"], inputs["w"], inputs["water_level"],
+                int(inputs["use_chem"]), int(inputs["heavy_load"]),
+                res["vol"], res["rec_density"], res["target_density"], res["actual_density"], int(res["passed"]),
+                res["n_b28"], res["n_b40"], res["n_h28"], res["n_h40"], res["real_total_w"],
+                text, json.dumps(res))
+
+    def get(self, h):
+        with self._lock:
+            row = self._db.execute("SELECT * FROM designs WHERE hash = ?", (h,)).fetchone()
+        return dict(row) if row else None
+
+    def size(self, inputs, name=None, save=True):
+        """Return ``(result, hash, cached)``; sizes and stores only when the hash is new."""
+        inputs, _, h = _keyed(inputs)
+        row = self.get(h)
+        if row is not None:
+            if name and not row["name"]:
+                self.rename(row["id"], name)
+            return json.loads(row["result"]), h, True
+        res = core.size_tank(**inputs)
+        if save:
+            self.save_many([(inputs, res, name)])
+        return res, h, False
+
+    def save_many(self, items):
+        """Insert ``(inputs, result, name)`` items in one transaction; existing hashes are kept."""
+        now = time.time()
+        rows = [self._row(inputs, res, name, now) for inputs, res, name in items]
+        with self._lock, self._db:
+            before = self._db.total_changes
+            self._db.executemany(
+                "INSERT OR IGNORE INTO designs (hash, name, created, mode, l, w, water_level, use_chem, heavy_load, "
+                "vol, rec_density, target_density, actual_density, passed, n_b28, n_b40, n_h28, n_h40, total_w, "
+                "inputs, result) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            return self._db.total_changes - before
+
+    def rename(self, design_id, name):
+        with self._lock, self._db:
+            self._db.execute("UPDATE designs SET name = ? WHERE id = ?", (name, design_id))
+
+    def delete(self, ids):
+        ids = list(ids)
+        with self._lock, self._db:
+            self._db.executemany("DELETE FROM designs WHERE id = ?", [(i,) for i in ids])
+
+    @staticmethod
+    def _where(vol=None, density=None, passed=None, n_b28=None, n_b40=None, name=None):
+        # ช่วง (min, max) ใส่ None ฝั่งที่ไม่จำกัดได้
+        clauses, args = [], []
+        for col, rng in (("vol", vol), ("actual_density", density), ("n_b28", n_b28), ("n_b40", n_b40)):
+            if rng is None:
+                continue
+            lo, hi = rng
+            if lo is not None:
+                clauses.append(f"{col} >= ?")
+                args.append(lo)
+            if hi is not None:
+                clauses.append(f"{col} <= ?")
+                args.append(hi)
+        if passed is not None:
+            clauses.append("passed = ?")
+            args.append(int(bool(passed)))
+        if name:
+            clauses.append("name LIKE ?")
+            args.append(f"%{name}%")
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", args
+
+    def search(self, limit=PAGE_SIZE, offset=0, order="id", descending=True, **filters):
+        """One page of saved designs matching ``filters`` (see :meth:`count`), as dicts."""
+        if order not in SORT_COLUMNS:
+            raise ValueError(f"Cannot sort by {order!r}")
+        where, args = self._where(**filters)
+        sql = (f"SELECT {', '.join(LIST_COLUMNS)} FROM designs{where} "
+               f"ORDER BY {order} {'DESC' if descending else 'ASC'}, id LIMIT ? OFFSET ?")
+        with self._lock:
+            return [dict(r) for r in self._db.execute(sql, args + [int(limit), int(offset)])]
+
+    def count(self, **filters):
+        """Number of designs matching ``vol``/``density``/``n_b28``/``n_b40`` ranges, ``passed`` and ``name``."""
+        where, args = self._where(**filters)
+        with self._lock:
+            return self._db.execute(f"SELECT COUNT(*) FROM designs{where}", args).fetchone()[0]
+
+    def compare(self, ids):
+        """Full inputs and results of the given designs, for side-by-side comparison."""
+        ids = [int(i) for i in ids]
+        if not ids:
+            return []
+        with self._lock:
+            rows = self._db.execute(f"SELECT * FROM designs WHERE id IN ({', '.join('?' * len(ids))})",
+                                    ids).fetchall()
+        out = []
+        for r in rows:
+            out.append({"id": r["id"], "name": r["name"], **json.loads(r["inputs"]), **json.loads(r["result"])})
+        return out
@@ -0,0 +1,124 @@
+from functools import lru_cache
+
+import numpy as np
+
+import core
+from batch import board_counts, recommended_density
+
+# ==========================================
+# PARAMETRIC SWEEP (ไล่ค่า 1-2 ตัวแปรพร้อมกันทั้งตาราง)
+# ==========================================
+# ทุกจุดในตารางคำนวณเหมือน core.size_tank โหมดออกแบบใหม่ แต่เป็น array ครั้งเดียว
+# ค่าแนะนำกระโดดที่ปริมาตร core.VOL_BREAKS จึงเห็นเป็นขั้นบันไดในกราฟ
+# target_density = None หมายถึงใช้ค่าแนะนำของแต่ละจุด (ขั้นบันไดตามปริมาตร)
+BASE = {
+    "L": 170.0,
+    "W": 80.0,
+    "water_level": 10.0,
+    "use_chem": True,
+    "heavy_load": True,
+    "w_board_28": 120.0,
+    "w_board_40": 120.0,
+    "ratio_28": 70.0,           # %
+    "target_density": None,
+}
+# ตัวแปรที่ไล่ค่าได้ -> (หน่วย, ช่วงเริ่มต้น)
+PARAMS = {
+    "water_level": ("cm", (1.0, 60.0)),
+    "L": ("cm", (20.0, 300.0)),
+    "W": ("cm", (20.0, 150.0)),
+    "ratio_28": ("%", (0.0, 100.0)),
+    "target_density": ("W/L", (2.0, 40.0)),
+    "w_board_28": ("W", (50.0, 600.0)),
+    "w_board_40": ("W", (50.0, 600.0)),
+}
+METRICS = ("vol", "rec_density", "target_density", "n_b28", "n_b40", "total_w", "actual_density", "passed")
+DIMENSIONS = ("L", "W", "water_level")
+MAX_STEPS = 1000
+CACHE_SIZE = 32
+
+
+def axis_label(name):
+    return f"{name} ({PARAMS[name][0]})"
+
+
+def _axis(spec):
+    name, lo, hi, n = spec
+    if name not in PARAMS:
+        raise ValueError(f"Cannot sweep {name!r}; choose one of {', '.join(PARAMS)}")
+    if not 2 <= n <= MAX_STEPS:
+        raise ValueError(f"Steps must be between 2 and {MAX_STEPS}")
+    return name, np.linspace(lo, hi, n)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _sweep(base, x, y):
+    p = dict(base)
+    x_name, xs = _axis(x)
+    grid = {x_name: xs}
+    if y is not None:
+        y_name, ys = _axis(y)
+        if y_name == x_name:
+            raise ValueError("Sweep two different inputs")
+        grid = {x_name: xs[None, :], y_name: ys[:, None]}
+
+    def get(name):
+        return grid.get(name, p[name])
+
+    shape = np.broadcast_shapes(*(v.shape for v in grid.values()))
+    vol = np.broadcast_to(core.tank_volume(get("L"), get("W"), get("water_level")), shape).astype(float)
+    rec = recommended_density(vol, p["use_chem"], p["heavy_load"])
+    target = get("target_density")
+    target = rec if target is None else np.broadcast_to(target, shape).astype(float)
+    w28, w40 = get("w_board_28"), get("w_board_40")
+    n_b28, n_b40 = board_counts(vol, target, np.asarray(get("ratio_28")) / 100, w28, w40)
+    total_w = n_b28 * w28 + n_b40 * w40
+    with np.errstate(divide="ignore", invalid="ignore"):
+        actual = np.where(vol > 0, total_w / vol, 0.0)
+
+    out = {
+        "x": xs,
+        "y": ys if y is not None else None,
+        "vol": vol,
+        "rec_density": rec,
+        "target_density": target,
+        "n_b28": n_b28,
+        "n_b40": n_b40,
+        "total_w": total_w,
+        "actual_density": actual,
+        "passed": actual >= target * core.PASS_RATIO,
+    }
+    # ค่า x ที่ปริมาตรข้ามเกณฑ์ (ไล่มิติถัง 1 ตัวแปร: ปริมาตรแปรตาม x เป็นเส้นตรง)
+    if y is None and x_name in DIMENSIONS:
+        per_unit = core.tank_volume(*(1.0 if d == x_name else p[d] for d in DIMENSIONS))
+        br = np.array(core.VOL_BREAKS) / per_unit if per_unit > 0 else np.empty(0)
+        out["breaks"] = br[(br >= xs.min()) & (br <= xs.max())]
+    else:
+        out["breaks"] = np.empty(0)
+    for v in out.values():
+        if isinstance(v, np.ndarray):
+            v.setflags(write=False)
+    return out
+
+
+def sweep(base=None, x=("water_level", 1.0, 60.0, 500), y=None):
+    """Size every point of a 1D or 2D input grid in one vectorized pass.
+
+    ``x``/``y`` are ``(name, lo, hi, steps)`` with ``name`` in :data:`PARAMS`;
+    inputs not swept come from ``base`` (missing keys from :data:`BASE`).
+    Returns a dict with the axis values ``x``/``y``, one read-only array per
+    entry of :data:`METRICS` shaped ``(steps_x,)`` or ``(steps_y, steps_x)``,
+    and ``breaks``: the x values where a 1D tank-dimension sweep crosses
+    ``core.VOL_BREAKS``. Results are cached per parameter set.
+    """
+    p = dict(BASE, **(base or {}))
+    for k in ("L", "W", "water_level", "w_board_28", "w_board_40", "ratio_28"):
+        p[k] = float(p[k])
+    p["use_chem"], p["heavy_load"] = bool(p["use_chem"]), bool(p["heavy_load"])
+    p["target_density"] = None if p["target_density"] is None else float(p["target_density"])
+    key = tuple(sorted((k, p[k]) for k in BASE))
+
+    def axis_key(a):
+        return None if a is None else (str(a[0]), float(a[1]), float(a[2]), int(a[3]))
+
+    return _sweep(key, axis_key(x), axis_key(y))
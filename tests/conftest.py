@@ -0,0 +1,5 @@
+import os
+import sys
+
+# โมดูลอยู่ที่รากของ repo -> ให้ import ได้เมื่อรัน pytest จากที่ใดก็ได้
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
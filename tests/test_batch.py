@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import batch
+import core
+
+TANKS = pd.DataFrame({
+    "L": [170, 30, 60, 300, 120, 45, 80],
+    "W": [80, 20, 40, 120, 60, 30, 50],
+    "water_level": [10, 15, 35, 50, 0, 20, 25],
+    "chem": ["yes", "no", "true", "false", "1", "0", "x"],
+    "heavy": ["no", "yes", "false", "true", "0", "1", "y"],
+    "target_density": [np.nan, 12.0, np.nan, 6.5, np.nan, np.nan, 9.0],
+    "ratio_28": [70, 50, 100, 0, 70, 30, 85],
+    "n_b28": [np.nan, np.nan, 2, np.nan, np.nan, 0, np.nan],
+    "n_b40": [np.nan, np.nan, 1, np.nan, np.nan, 3, np.nan],
+})
+
+
+def test_design_batch_matches_size_tank():
+    out = batch.design_batch(TANKS)
+    assert list(out["mode"]) == ["new", "new", "check", "new", "new", "check", "new"]
+    for row in out.to_dict("records"):
+        expected = core.size_tank(**batch.row_inputs(row))
+        got = batch.row_result(row)
+        for k, v in expected.items():
+            assert got[k] == pytest.approx(v), k
+
+
+def test_row_inputs_ratio_is_a_fraction():
+    row = batch.design_batch(TANKS.iloc[:1]).to_dict("records")[0]
+    assert batch.row_inputs(row)["ratio_28"] == pytest.approx(0.7)
+
+
+def test_missing_columns():
+    with pytest.raises(ValueError, match="Missing columns"):
+        batch.design_batch(pd.DataFrame({"L": [1], "W": [1]}))
+
+
+@pytest.mark.parametrize("col, value", [("L", np.nan), ("water_level", "deep"), ("ratio_28", "")])
+def test_rejects_blank_or_text_numbers(col, value):
+    df = TANKS.iloc[:2].copy()
+    df[col] = df[col].astype(object)
+    df.loc[1, col] = value
+    with pytest.raises(ValueError, match=f"{col} .*row 2"):
+        batch.design_batch(df)
+
+
+def test_random_fleet_matches_size_tank():
+    rng = np.random.default_rng(0)
+    n = 200
+    df = pd.DataFrame({
+        "L": rng.uniform(10, 400, n).round(1), "W": rng.uniform(10, 200, n).round(1),
+        "water_level": rng.uniform(1, 80, n).round(1),
+        "chem": rng.choice(["yes", "no"], n), "heavy": rng.choice([True, False], n),
+        "ratio_28": rng.integers(0, 101, n),
+        "w_board_28": rng.choice([60.0, 120.0, 300.0], n), "w_board_40": rng.choice([100.0, 150.0], n),
+    })
+    for row in batch.design_batch(df).to_dict("records"):
+        expected = core.size_tank(**batch.row_inputs(row))
+        got = batch.row_result(row)
+        assert (got["n_b28"], got["n_b40"], got["passed"]) == (expected["n_b28"], expected["n_b40"], expected["passed"])
+        assert got["actual_density"] == pytest.approx(expected["actual_density"])
+
+
+@pytest.mark.parametrize("col, value, message", [
+    ("w_board_28", 0, "Board watts must be > 0 in w_board_28"),
+    ("w_board_40", -120, "Board watts must be > 0 in w_board_40"),
+    ("h_board_28", 0, "Heads per board must be whole numbers >= 1 in h_board_28"),
+    ("h_board_40", 2.5, "Heads per board must be whole numbers >= 1 in h_board_40"),
+    ("n_b28", 2.5, "Board counts must be whole numbers in n_b28"),
+    ("n_b40", "abc", "Invalid numbers in n_b40"),
+    ("n_b28", -1, "Invalid numbers in n_b28"),
+    ("target_density", "high", "Invalid numbers in target_density"),
+    ("target_density", np.inf, "Invalid numbers in target_density"),
+])
+def test_rejects_invalid_values(col, value, message):
+    df = TANKS.iloc[:3].copy()
+    if col not in df.columns:
+        df[col] = 120.0 if col.startswith("w_") else 2
+    df[col] = df[col].astype(object)
+    df.loc[2, col] = value
+    with pytest.raises(ValueError, match=f"{message} \\(row 3\\)"):
+        batch.design_batch(df)
+
+
+def test_blank_optional_cells_fall_back():
+    df = TANKS.iloc[:2].copy()
+    df[["target_density", "n_b28", "n_b40"]] = df[["target_density", "n_b28", "n_b40"]].astype(object)
+    df.loc[0, ["target_density", "n_b28", "n_b40"]] = ["", " ", ""]
+    out = batch.design_batch(df)
+    assert out.loc[0, "mode"] == "new"
+    assert out.loc[0, "target_density"] == out.loc[0, "rec_density"]
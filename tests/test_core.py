@@ -0,0 +1,35 @@
+import math
+
+import numpy as np
+import pytest
+
+import batch
+import core
+
+# ขั้นบันไดเดิมที่เขียนตายตัวใน get_recommended_density ก่อนย้ายไปใช้ VOL_BREAKS/BASE_WL
+LADDER = ((10, 35.0), (20, 30.0), (50, 25.0), (100, 20.0), (190, 10.0), (math.inf, 5.3))
+VOLS = sorted({0.0, 0.5, 1e-9, 1e9, math.inf}
+              | {b + d for b in core.VOL_BREAKS for d in (-1e-9, 0.0, 1e-9, -1.0, 1.0)})
+
+
+def test_breaks_and_base_line_up():
+    assert len(core.BASE_WL) == len(core.VOL_BREAKS) + 1
+    assert list(core.VOL_BREAKS) == sorted(core.VOL_BREAKS)
+
+
+@pytest.mark.parametrize("chem", [False, True])
+@pytest.mark.parametrize("heavy", [False, True])
+def test_recommended_density_ladder(chem, heavy):
+    for vol in VOLS:
+        base = next(wl for top, wl in LADDER if vol <= top)
+        base *= core.CHEM_FACTOR if chem else 1
+        base *= core.HEAVY_FACTOR if heavy else 1
+        assert core.get_recommended_density(vol, chem, heavy) == round(base, 1), vol
+
+
+@pytest.mark.parametrize("chem", [False, True])
+@pytest.mark.parametrize("heavy", [False, True])
+def test_scalar_matches_batch(chem, heavy):
+    vols = VOLS + [math.nan]
+    expected = [core.get_recommended_density(v, chem, heavy) for v in vols]
+    np.testing.assert_array_equal(batch.recommended_density(vols, chem, heavy), expected)
@@ -0,0 +1,40 @@
+import pandas as pd
+import pytest
+
+import batch
+import line
+import render
+
+
+def test_plan_line_matches_design_batch():
+    plan = line.plan_line(line.EXAMPLE)
+    assert list(plan["name"]) == [t["name"] for t in line.EXAMPLE]
+    expected = batch.design_batch(pd.DataFrame(line.EXAMPLE))
+    assert list(plan["n_b28"]) == list(expected["n_b28"])
+    assert line.line_totals(plan)["tanks"] == 3
+    bom = line.line_bom(plan)
+    assert bom["boards"].sum() == plan["n_b28"].sum() + plan["n_b40"].sum()
+
+
+def test_unknown_mount():
+    with pytest.raises(ValueError, match="Unknown mount"):
+        line.plan_line([dict(line.EXAMPLE[0], mount="lid")])
+
+
+def test_worker_processes_draw_the_same_images(monkeypatch):
+    plan = line.plan_line(line.EXAMPLE)
+    render.cache.clear()
+    serial = line.render_line(plan, parallel=False)
+    render.cache.clear()
+    monkeypatch.setattr(line, "WORKERS", 2)
+    assert line.render_line(plan) == serial
+    assert [len(imgs) for imgs in serial] == [1, 1, 2]
+
+
+def test_worker_errors_are_raised(monkeypatch):
+    monkeypatch.setattr(line, "WORKERS", 2)
+    line._submit_all([])
+    with pytest.raises(TypeError):
+        line._remote((1, 2), {"bogus": True})
+    # process ยังใช้ต่อได้หลังงานที่ error
+    assert line._remote(*line.tank_views(line.plan_line(line.EXAMPLE).iloc[0])[0])[:4] == b"\x89PNG"
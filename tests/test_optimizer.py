@@ -0,0 +1,104 @@
+import itertools
+import math
+
+import pandas as pd
+import pytest
+
+import optimizer
+
+CATALOG = pd.DataFrame({
+    "name": ["A28", "B28", "C40", "D40", "E40"],
+    "freq": [28, 28, 40, 40, 40],
+    "watts": [120.0, 300.0, 100.0, 150.0, 600.0],
+    "heads": [2, 5, 2, 3, 10],
+    "price": [90.0, 200.0, 80.0, 110.0, 380.0],
+})
+
+
+def brute_force(vol, density, ratio_min, ratio_max, objective, max_boards=None, catalog=CATALOG, reach=2):
+    # ไล่ทุกรุ่นและทุกจำนวนบอร์ดถึง reach เท่าของที่ต้องใช้ (รวม "ไม่มี" ของแต่ละความถี่) แล้วเลือกตัวที่ดีที่สุดตรงๆ
+    p_req = vol * density
+    rows = list(catalog.itertuples(index=False))
+    opts28 = [r for r in rows if r.freq == 28] + ([None] if ratio_min <= 0 else [])
+    opts40 = [r for r in rows if r.freq == 40] + ([None] if ratio_max >= 1 else [])
+    best = None
+    for a, b in itertools.product(opts28, opts40):
+        for n28 in range(1, reach * math.ceil(p_req / a.watts) + 2) if a else [0]:
+            for n40 in range(1, reach * math.ceil(p_req / b.watts) + 2) if b else [0]:
+                if max_boards and n28 + n40 > max_boards:
+                    continue
+                p28 = n28 * a.watts if a else 0.0
+                total = p28 + (n40 * b.watts if b else 0.0)
+                if total < p_req - 1e-9 or total <= 0:
+                    continue
+                ratio = p28 / total
+                if not ratio_min - 1e-9 <= ratio <= ratio_max + 1e-9:
+                    continue
+                price = n28 * (a.price if a else 0) + n40 * (b.price if b else 0)
+                over = total - p_req
+                key = (price, over, n28 + n40) if objective == "cost" else (over, price, n28 + n40)
+                best = key if best is None or key < best else best
+    return best
+
+
+@pytest.mark.parametrize("vol, density", [(136.0, 8.0), (9.0, 20.0), (500.0, 10.0), (60.0, 7.5)])
+@pytest.mark.parametrize("ratio_min, ratio_max", [(0.0, 1.0), (0.5, 0.8), (0.0, 0.0), (1.0, 1.0), (0.3, 1.0)])
+@pytest.mark.parametrize("objective", optimizer.OBJECTIVES)
+def test_best_mix_matches_brute_force(vol, density, ratio_min, ratio_max, objective):
+    df = optimizer.optimize_mix(CATALOG, vol, density, ratio_min, ratio_max, objective)
+    expected = brute_force(vol, density, ratio_min, ratio_max, objective)
+    assert expected is not None
+    top = df.iloc[0]
+    got = (top["price"], top["overshoot_w"], top["n_b28"] + top["n_b40"])
+    if objective != "cost":
+        got = (got[1], got[0], got[2])
+    assert got == pytest.approx(expected)
+
+
+def test_narrow_ratio_window_adds_28k_boards():
+    # 1 x 28k ได้สัดส่วน 0.4545 (4 x 40k) หรือ 0.5263 (3 x 40k) -> ต้องใช้ 28k เกิน P/W จึงลงช่อง
+    catalog = pd.DataFrame({"name": ["A28", "B40"], "freq": [28, 40], "watts": [100.0, 30.0],
+                            "heads": [2, 1], "price": [10.0, 3.0]})
+    df = optimizer.optimize_mix(catalog, 1.0, 100.0, 0.48, 0.52)
+    top = df.iloc[0]
+    assert (top["n_b28"], top["n_b40"], top["total_w"]) == (2, 7, 410.0)
+    assert top["ratio_28"] == pytest.approx(200 / 410)
+    expected = brute_force(1.0, 100.0, 0.48, 0.52, "cost", catalog=catalog, reach=20)
+    assert (top["price"], top["overshoot_w"], top["n_b28"] + top["n_b40"]) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("ratio_min, ratio_max", [(0.48, 0.52), (0.61, 0.62), (0.7, 0.7), (0.33, 0.34)])
+@pytest.mark.parametrize("objective", optimizer.OBJECTIVES)
+def test_narrow_windows_match_wide_brute_force(ratio_min, ratio_max, objective):
+    df = optimizer.optimize_mix(CATALOG, 9.0, 20.0, ratio_min, ratio_max, objective)
+    expected = brute_force(9.0, 20.0, ratio_min, ratio_max, objective, reach=12)
+    if expected is None:
+        assert df.empty
+        return
+    top = df.iloc[0]
+    got = (top["price"], top["overshoot_w"], top["n_b28"] + top["n_b40"])
+    if objective != "cost":
+        got = (got[1], got[0], got[2])
+    assert got == pytest.approx(expected)
+
+
+def test_max_boards_matches_brute_force():
+    df = optimizer.optimize_mix(CATALOG, 500.0, 10.0, 0.3, 0.9, "cost", max_boards=12)
+    assert (df["n_b28"] + df["n_b40"]).max() <= 12
+    expected = brute_force(500.0, 10.0, 0.3, 0.9, "cost", max_boards=12)
+    top = df.iloc[0]
+    assert (top["price"], top["overshoot_w"], top["n_b28"] + top["n_b40"]) == pytest.approx(expected)
+
+
+def test_results_are_feasible_and_sorted():
+    df = optimizer.optimize_mix(CATALOG, 136.0, 8.0, 0.5, 0.8, "cost", top=10)
+    assert len(df) == 10
+    assert (df["total_w"] >= 136.0 * 8.0 - 1e-9).all()
+    assert df["ratio_28"].between(0.5 - 1e-9, 0.8 + 1e-9).all()
+    assert df["price"].is_monotonic_increasing
+
+
+def test_no_feasible_mix_and_bad_objective():
+    assert optimizer.optimize_mix(CATALOG, 136.0, 8.0, max_boards=1).empty
+    with pytest.raises(ValueError):
+        optimizer.optimize_mix(CATALOG, 136.0, 8.0, objective="speed")
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+import placement
+
+
+def min_gap(x, y):
+    # ระยะคู่ที่ใกล้ที่สุดแบบตรงๆ (ไว้เทียบกับ nearest_gap)
+    d = np.hypot(x[:, None] - x[None, :], y[:, None] - y[None, :])
+    return d[np.triu_indices(len(x), 1)].min()
+
+
+@pytest.mark.parametrize("l, h, n28, n40", [
+    (170, 80, 14, 3), (60, 40, 4, 6), (300, 120, 50, 40), (30, 20, 2, 2),
+    (10, 10, 1, 1), (100, 5, 6, 0), (200, 100, 0, 120),
+])
+def test_heads_keep_clearance_and_pitch(l, h, n28, n40):
+    x, y, fq = placement.place_heads(l, h, n28, n40)
+    c = placement.CLEARANCE
+    assert len(x) == len(y) == n28 + n40
+    assert ((x >= c - 1e-9) & (x <= l - c + 1e-9)).all()
+    assert ((y >= c - 1e-9) & (y <= h - c + 1e-9)).all()
+    assert (fq == 28).sum() == n28 and (fq == 40).sum() == n40
+    if len(x) > 1:
+        assert min_gap(x, y) >= placement.MIN_PITCH - 1e-9
+        assert placement.nearest_gap(x, y) == pytest.approx(min_gap(x, y))
+
+
+def test_two_heads_on_small_face_use_edge_grid():
+    # 10x10 เหลือพื้นที่ใช้งาน 5x5: รังผึ้งห่างไม่พอ ต้องวางชิดขอบพื้นที่ใช้งาน
+    x, y, _ = placement.place_heads(10, 10, 1, 1)
+    assert min_gap(x, y) >= placement.MIN_PITCH
+    assert set(np.round(x, 9)) | set(np.round(y, 9)) <= {2.5, 5.0, 7.5}
+
+
+def test_too_many_heads_raise():
+    with pytest.raises(ValueError, match="do not fit"):
+        placement.place_heads(20, 20, 10, 10)
+    with pytest.raises(ValueError, match="clearance"):
+        placement.place_heads(4, 20, 1, 0)
+
+
+def test_placement_is_deterministic():
+    a = placement.place_heads(170, 80, 14, 3)
+    b = placement.place_heads(170, 80, 14, 3)
+    for u, v in zip(a, b):
+        np.testing.assert_array_equal(u, v)
+
+
+def test_nearest_gap_matches_brute_force_on_random_points():
+    rng = np.random.default_rng(1)
+    for n in (2, 10, 500):
+        x, y = rng.uniform(0, 300, n), rng.uniform(0, 50, n)
+        assert placement.nearest_gap(x, y) == pytest.approx(min_gap(x, y))
@@ -0,0 +1,25 @@
+import os
+
+import pandas as pd
+
+import batch
+import report
+
+
+def test_designs_from_plan_parses_chem_and_heavy_words():
+    # chem/heavy จาก CSV เป็นข้อความ: "false" ต้องไม่กลายเป็น True (bool("false"))
+    plan = batch.design_batch(pd.DataFrame({
+        "name": ["A", "B"], "L": [100, 100], "W": [50, 50], "water_level": [20, 20],
+        "chem": ["false", "yes"], "heavy": ["0", "true"],
+    }))
+    a, b = report.designs_from_plan(plan)
+    assert a["inputs"]["use_chem"] is False and a["inputs"]["heavy_load"] is False
+    assert b["inputs"]["use_chem"] is True and b["inputs"]["heavy_load"] is True
+
+
+def test_export_job_removes_zip_after_result():
+    job = report.ExportJob([report.make_design("T", {"l": 60, "w": 40, "water_level": 10})], 1)
+    data = job.result()
+    assert data[:2] == b"PK"
+    assert not os.path.exists(job.path)
+    assert job.result() is data
@@ -0,0 +1,98 @@
+import json
+
+import pytest
+
+import core
+import service
+
+TANK = {"l": 170, "w": 80, "water_level": 10}
+
+
+def call(method, path, body=None):
+    status, data = service.handle(method, path, json.dumps(body).encode() if body is not None else b"")
+    return status, json.loads(data)
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    service._size_json.cache_clear()
+
+
+def test_health_and_stats():
+    assert call("GET", "/health") == (200, {"status": "ok"})
+    assert call("GET", "/stats/") == (200, {"hits": 0, "misses": 0, "size": 0})
+
+
+def test_design_matches_core_and_is_cached():
+    status, res = call("POST", "/design", TANK)
+    assert status == 200
+    assert res == json.loads(json.dumps(core.size_tank(**TANK)))
+    # ลำดับฟิลด์ต่างกันยังได้คีย์แคชเดิม
+    call("POST", "/design?x=1", {"water_level": 10, "w": 80, "l": 170})
+    assert call("GET", "/stats")[1] == {"hits": 1, "misses": 1, "size": 1}
+
+
+def test_check_mode():
+    status, res = call("POST", "/check", dict(TANK, n_b28=3, n_b40=1))
+    assert status == 200
+    assert (res["n_b28"], res["n_b40"]) == (3, 1)
+    assert call("POST", "/check", TANK)[0] == 400
+
+
+@pytest.mark.parametrize("method, path, body, status", [
+    ("POST", "/nope", TANK, 404),
+    ("GET", "/design", None, 405),
+    ("POST", "/design", None, 400),
+    ("POST", "/design", {"l": 170, "w": 80}, 400),
+    ("POST", "/design", dict(TANK, colour="red"), 400),
+    ("POST", "/design", dict(TANK, mode="other"), 400),
+    ("POST", "/batch", TANK, 400),
+    ("POST", "/batch", [TANK] * (service.MAX_BATCH + 1), 413),
+])
+def test_errors(method, path, body, status):
+    got, res = call(method, path, body)
+    assert got == status
+    assert "error" in res
+
+
+def test_invalid_json():
+    status, res = service.handle("POST", "/design", b"{not json")
+    assert status == 400
+    assert json.loads(res)["error"].startswith("Invalid JSON")
+
+
+@pytest.mark.parametrize("extra", [
+    {"ratio_28": 1.5}, {"ratio_28": -0.1},
+    {"h_board_28": 2.5}, {"n_b28": 1.5, "mode": "check"},
+    {"use_chem": "false"}, {"heavy_load": 2},
+    {"target_density": "8"}, {"w_board_28": True},
+])
+def test_rejects_bad_values(extra):
+    assert call("POST", "/design", dict(TANK, **extra))[0] == 400
+
+
+@pytest.mark.parametrize("text", ["NaN", "Infinity", "-Infinity"])
+def test_rejects_non_finite(text):
+    body = f'{{"l": {text}, "w": 80, "water_level": 10}}'.encode()
+    assert service.handle("POST", "/design", body)[0] == 400
+
+
+def test_accepts_integral_floats_and_01_flags():
+    status, res = call("POST", "/design", dict(TANK, h_board_28=2.0, use_chem=0, heavy_load=1))
+    assert status == 200
+    assert res == call("POST", "/design", dict(TANK, use_chem=False, heavy_load=True))[1]
+
+
+def test_batch_keeps_order_and_reports_item_errors():
+    status, res = call("POST", "/batch", [TANK, {"l": 170}, dict(TANK, mode="check", n_b28=2), 5])
+    assert status == 200
+    assert len(res) == 4
+    assert res[0]["vol"] == 136.0
+    assert res[1]["index"] == 1 and "error" in res[1]
+    assert res[2]["n_b28"] == 2
+    assert res[3]["index"] == 3 and "error" in res[3]
+
+
+def test_batch_uses_cache():
+    call("POST", "/batch", [TANK, TANK, TANK])
+    assert call("GET", "/stats")[1] == {"hits": 2, "misses": 1, "size": 1}
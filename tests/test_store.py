@@ -0,0 +1,68 @@
+import pytest
+
+import core
+import store
+
+TANK = {"l": 170, "w": 80, "water_level": 10}
+
+
+@pytest.fixture
+def db():
+    s = store.DesignStore(":memory:")
+    yield s
+    s.close()
+
+
+def test_hash_ignores_key_order_types_and_defaults():
+    h = store.input_hash(TANK)
+    assert store.input_hash({"water_level": 10.0, "w": 80, "l": 170.0}) == h
+    assert store.input_hash(dict(TANK, use_chem=True, ratio_28=0.7, mode="new")) == h
+    # ฟิลด์ที่โหมดนั้นไม่ใช้ไม่มีผลต่อ hash
+    assert store.input_hash(dict(TANK, n_b28=5)) == h
+    assert store.input_hash(dict(TANK, mode="check", n_b28=2, ratio_28=0.1)) == \
+        store.input_hash(dict(TANK, mode="check", n_b28=2))
+
+
+def test_hash_differs_per_mode_and_input():
+    h = store.input_hash(TANK)
+    assert store.input_hash(dict(TANK, mode="check")) != h
+    assert store.input_hash(dict(TANK, use_chem=False)) != h
+    assert store.input_hash(dict(TANK, l=171)) != h
+
+
+def test_unknown_inputs_and_mode():
+    with pytest.raises(ValueError, match="Unknown inputs"):
+        store.input_hash(dict(TANK, colour="red"))
+    with pytest.raises(ValueError, match="Unknown mode"):
+        store.input_hash(dict(TANK, mode="other"))
+
+
+def test_size_is_cached_by_hash(db):
+    res, h, cached = db.size(TANK, name="A")
+    assert res == core.size_tank(**TANK)
+    assert not cached and h == store.input_hash(TANK)
+    res2, h2, cached2 = db.size({"w": 80, "l": 170, "water_level": 10})
+    assert cached2 and h2 == h and res2 == res
+    assert db.count() == 1
+    assert db.get(h)["name"] == "A"
+
+
+def test_size_without_save(db):
+    assert not db.size(TANK, save=False)[2]
+    assert db.count() == 0
+
+
+def test_save_many_skips_existing_and_search_filters(db):
+    items = [(dict(TANK, l=l), core.size_tank(**dict(TANK, l=l)), f"T{l}") for l in (50, 100, 170, 300)]
+    assert db.save_many(items) == 4
+    assert db.save_many(items[:2]) == 0
+    assert db.count(vol=(50, 200)) == 2
+    rows = db.search(order="vol", descending=False)
+    assert [r["name"] for r in rows] == ["T50", "T100", "T170", "T300"]
+    assert db.count(name="T1") == 2
+    with pytest.raises(ValueError):
+        db.search(order="inputs")
+    ids = [r["id"] for r in rows[:2]]
+    assert {d["l"] for d in db.compare(ids)} == {50.0, 100.0}
+    db.delete(ids)
+    assert db.count() == 2
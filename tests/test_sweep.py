@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+import core
+import sweep
+
+
+def size_point(p):
+    return core.size_tank(p["L"], p["W"], p["water_level"], use_chem=p["use_chem"], heavy_load=p["heavy_load"],
+                          w_board_28=p["w_board_28"], w_board_40=p["w_board_40"],
+                          target_density=p["target_density"], ratio_28=p["ratio_28"] / 100)
+
+
+@pytest.mark.parametrize("base, x, y", [
+    (None, ("L", 20, 300, 15), ("water_level", 1, 60, 12)),
+    ({"use_chem": False}, ("ratio_28", 0, 100, 11), ("target_density", 2, 40, 9)),
+    ({"heavy_load": False, "water_level": 25}, ("w_board_28", 50, 600, 7), ("W", 20, 150, 8)),
+    ({"target_density": 12.0}, ("water_level", 0, 60, 13), ("w_board_40", 50, 600, 6)),
+])
+def test_grid_matches_size_tank(base, x, y):
+    out = sweep.sweep(base, x=x, y=y)
+    assert out["vol"].shape == (y[3], x[3])
+    for j, yv in enumerate(out["y"]):
+        for i, xv in enumerate(out["x"]):
+            p = dict(sweep.BASE, **(base or {}), **{x[0]: xv, y[0]: yv})
+            expected = size_point(p)
+            for m in ("vol", "rec_density", "target_density", "n_b28", "n_b40", "actual_density", "passed"):
+                assert out[m][j, i] == pytest.approx(expected[m]), (m, xv, yv)
+            assert out["total_w"][j, i] == pytest.approx(expected["real_total_w"])
+
+
+@pytest.mark.parametrize("name, base", [
+    ("water_level", None),
+    ("L", {"water_level": 30}),
+    ("W", {"L": 60, "water_level": 40}),
+])
+def test_breaks_sit_at_volume_steps(name, base):
+    lo, hi = sweep.PARAMS[name][1]
+    out = sweep.sweep(base, x=(name, lo, hi, 200))
+    p = dict(sweep.BASE, **(base or {}))
+    per_unit = core.tank_volume(*(1.0 if d == name else p[d] for d in sweep.DIMENSIONS))
+    expected = [b / per_unit for b in core.VOL_BREAKS if lo <= b / per_unit <= hi]
+    assert len(expected) > 0
+    np.testing.assert_allclose(out["breaks"], expected)
+    # ค่าแนะนำเปลี่ยนขั้นตรงเกณฑ์พอดี
+    for b in out["breaks"]:
+        below, above = (size_point(dict(p, **{name: v}))["rec_density"] for v in (b * (1 - 1e-6), b * (1 + 1e-6)))
+        assert below != above
+
+
+def test_breaks_only_for_1d_dimension_sweeps():
+    assert sweep.sweep(x=("ratio_28", 0, 100, 5))["breaks"].size == 0
+    assert sweep.sweep(x=("L", 20, 300, 5), y=("W", 20, 150, 5))["breaks"].size == 0
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+import core
+import thermal
+
+
+def run(l, w, water_level, **kw):
+    inputs = {"l": l, "w": w, "water_level": water_level}
+    return thermal.simulate(core.size_tank(**inputs), inputs, **kw)
+
+
+@pytest.mark.parametrize("l, w, water_level", [(170, 80, 10), (30, 20, 1), (170, 80, 0.5), (10, 10, 0.1)])
+def test_shallow_baths_stay_bounded(l, w, water_level):
+    r = run(l, w, water_level, duties=(0.0, 0.25, 1.0), hours=thermal.HORIZONS["week"])
+    assert np.isfinite(r["temp"]).all()
+    assert (r["temp"] <= thermal.MAX_TEMP).all()
+    # เครื่องปิดตลอด: การระเหยทำให้เย็นกว่าห้องแต่ไม่ต่ำกว่าจุดที่การระเหยสมดุลกับความร้อนจากห้อง
+    assert r["temp"][0].max() <= r["ambient"] + 1e-9 and r["temp"][0].min() > r["ambient"] - 10
+    assert (np.diff(r["temp"][2][:40]) >= -1e-9).all()
+
+
+def test_matches_fine_step_reference():
+    # ถังปกติ: ผลที่ขั้น DT ใกล้เคียงการอินทิเกรตขั้นละ 1 วินาที
+    inputs = {"l": 60, "w": 40, "water_level": 30}
+    res = core.size_tank(**inputs)
+    r = thermal.simulate(res, inputs, duties=(0.5,), hours=8.0)
+    surface, wall = thermal.areas(60, 40, 30)
+    ua = thermal.H_WALL * wall + thermal.H_SURF * surface
+    x_air = thermal._humidity_ratio(thermal.AMBIENT, thermal.HUMIDITY)
+    u = thermal.on_fraction(np.arange(8 * 3600), (0.5,), dt=1.0)[:, 0]
+    temp, ref = thermal.AMBIENT, [thermal.AMBIENT]
+    for k in range(8 * 3600):
+        evap = thermal.EVAP_COEF * surface / 3600 * max(thermal._humidity_ratio(temp) - x_air, 0.0)
+        temp += (thermal.EFFICIENCY * res["real_total_w"] * u[k] - ua * (temp - thermal.AMBIENT)
+                 - thermal.LATENT_HEAT * evap) / (res["vol"] * thermal.WATER_C)
+        if (k + 1) % 600 == 0:
+            ref.append(temp)
+    assert r["temp"][0] == pytest.approx(np.array(ref), abs=0.05)
+
+
+def test_energy_and_run_hours():
+    r = run(170, 80, 10, duties=(0.5, 1.0), hours=24.0, shift_h=8.0)
+    assert r["run_hours"] == pytest.approx([4.0, 8.0])
+    assert r["total_kwh"] == pytest.approx(r["run_hours"] * core.size_tank(170, 80, 10)["real_total_w"] / 1000)
+
+
+def test_rejects_empty_bath():
+    with pytest.raises(ValueError, match="volume"):
+        run(170, 80, 0)
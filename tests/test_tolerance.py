@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+import core
+import tolerance
+
+EXACT = {"watt_mean": 1.0, "watt_sd": 0.0, "level_sd": 0.0, "head_fail": 0.0}
+
+
+def run(inputs, trials=10_000, **kw):
+    return tolerance.simulate(core.size_tank(**inputs), inputs, trials=trials, **kw)
+
+
+@pytest.mark.parametrize("inputs", [
+    {"l": 170, "w": 80, "water_level": 10},
+    {"l": 60, "w": 40, "water_level": 35, "use_chem": False, "ratio_28": 0.3},
+    {"l": 170, "w": 80, "water_level": 40, "mode": "check", "n_b28": 1, "n_b40": 1},
+])
+def test_zero_spreads_reproduce_nominal_verdict(inputs):
+    res = core.size_tank(**inputs)
+    r = run(inputs, **EXACT)
+    assert r["p_pass"] == float(res["passed"])
+    assert r["nominal_density"] == pytest.approx(res["actual_density"])
+    for key in ("mean", "min", "max"):
+        assert r[key] == pytest.approx(res["actual_density"]), key
+    assert r["std"] == pytest.approx(0.0, abs=1e-9)
+    for p, v in r["percentiles"].items():
+        assert v == pytest.approx(res["actual_density"]), p
+
+
+def test_memory_stays_per_chunk(monkeypatch):
+    # ทุกก้อนสุ่มไม่เกิน CHUNK ค่า และผลลัพธ์มีขนาดคงที่ไม่ว่าจะกี่รอบ
+    sizes = []
+    boards = tolerance._boards
+
+    def spy(rng, n, m, *args):
+        sizes.append(m)
+        return boards(rng, n, m, *args)
+
+    monkeypatch.setattr(tolerance, "CHUNK", 1000)
+    monkeypatch.setattr(tolerance, "_boards", spy)
+    tolerance._simulate.cache_clear()
+    inputs = {"l": 60, "w": 40, "water_level": 30}
+    small, large = run(inputs, trials=500), run(inputs, trials=12_345)
+    tolerance._simulate.cache_clear()
+
+    assert max(sizes) == 1000 and sizes[-1] == 345
+    assert small["counts"].shape == large["counts"].shape == (tolerance.BINS,)
+    assert small["edges"].shape == large["edges"].shape == (tolerance.BINS + 1,)
+    assert large["counts"].sum() == 12_345
+    assert 0.0 <= large["p_pass"] <= 1.0
+
+
+@pytest.mark.parametrize("kw, message", [
+    ({"trials": 0}, "Trials"),
+    ({"trials": tolerance.MAX_TRIALS + 1}, "Trials"),
+    ({"head_fail": 1.5}, "head failure"),
+    ({"head_fail": -0.1}, "head failure"),
+    ({"watt_sd": -1.0}, "Spreads"),
+    ({"level_sd": -0.5}, "Spreads"),
+    ({"bogus": 1.0}, "Unknown tolerances"),
+])
+def test_rejects_invalid_settings(kw, message):
+    with pytest.raises(ValueError, match=message):
+        run({"l": 60, "w": 40, "water_level": 30}, **kw)
+
+
+def test_head_failure_bounds_are_inclusive():
+    inputs = {"l": 60, "w": 40, "water_level": 30}
+    assert run(inputs, **dict(EXACT, head_fail=1.0))["max"] == 0.0
+    assert np.isclose(run(inputs, **dict(EXACT, head_fail=0.0))["min"], core.size_tank(**inputs)["actual_density"])
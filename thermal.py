@@ -0,0 +1,180 @@
+from functools import lru_cache
+
+import numpy as np
+
+
+# ==========================================
+# BATH THERMAL SIMULATION (อุณหภูมิน้ำและพลังงานตลอดกะ/สัปดาห์)
+# ==========================================
+# กำลัง ultrasonic เกือบทั้งหมดกลายเป็นความร้อนในน้ำ ถังที่เปิดทั้งวันจึงร้อนขึ้นเรื่อยๆ
+# แบบจำลองก้อนเดียว (น้ำทั้งถังอุณหภูมิเท่ากัน):
+#   m c dT/dt = EFFICIENCY x P x u(t) - H_WALL x A_wall x (T - Ta) - H_SURF x A_surf x (T - Ta) - L_v x g(T)
+#   u(t) = สัดส่วนเวลาที่เครื่องเปิด (เปิด duty x cycle นาทีต่อรอบ เฉพาะในกะ)
+#   g(T) = อัตราระเหยจากผิวน้ำ (สูตร Carrier แบบอากาศนิ่ง) ตามความชื้นอิ่มตัวที่ผิวน้ำ
+#   การระเหยทำให้ถังที่เปิดเครื่องน้อยเย็นกว่าอุณหภูมิห้องได้ และไม่ลดระดับน้ำในแบบจำลอง (รายงานเป็นลิตรที่ระเหย)
+# อินทิเกรตแบบ exponential Euler (ทำให้สมการเป็นเชิงเส้นรอบอุณหภูมิปัจจุบันทุกขั้น แล้วแก้แบบตรง)
+# จึงเสถียรทุกขนาดขั้น ถังตื้นมากที่ค่าคงที่เวลาสั้นไม่ต้องซอยขั้นไม่จำกัดเหมือน RK4
+# ทุก duty cycle (scenario) เดินพร้อมกันเป็น array เดียว
+# u(t) เป็นค่าเฉลี่ยในแต่ละขั้นจากเวลาเปิดสะสม พลังงานจึงถูกต้องแม้รอบเปิด/ปิดสั้นกว่าขั้นเวลา
+AMBIENT = 25.0              # °C
+HUMIDITY = 0.5              # ความชื้นสัมพัทธ์ของอากาศรอบถัง
+EFFICIENCY = 0.9            # สัดส่วนกำลังไฟที่กลายเป็นความร้อนในน้ำ
+H_WALL = 8.0                # W/m²K ผนัง/ก้นสแตนเลสไม่หุ้มฉนวน
+H_SURF = 8.0                # W/m²K ผิวน้ำ (ไม่รวมการระเหย)
+EVAP_COEF = 25.0            # kg/(m² h) ต่อหน่วย humidity ratio (อากาศนิ่ง)
+LATENT_HEAT = 2.45e6        # J/kg
+WATER_C = 4186.0            # J/(kg K), น้ำ 1 kg/L
+P_ATM = 101325.0
+DT = 300.0                  # s ต่อขั้น (ถังตื้นมากแบ่งขั้นย่อยเพื่อความแม่นยำ ไม่เกิน MAX_SUBSTEPS)
+MAX_SUBSTEPS = 5            # ขั้นย่อยต่อ DT สูงสุด -> เวลาคำนวณไม่เกิน 5 เท่าของถังปกติ
+BISECTIONS = 60             # รอบ bisection หาอุณหภูมิสมดุล
+OUT_EVERY = 2               # เก็บผลทุก 2 ขั้น (10 นาที)
+MAX_TEMP = 90.0             # ไม่จำลองการเดือด: การระเหยคิดถึงอุณหภูมินี้
+HORIZONS = {"shift": 8.0, "day": 24.0, "week": 168.0}   # ชั่วโมง
+DUTIES = (0.25, 0.5, 0.75, 1.0)
+MAX_HOURS = 24 * 31
+CACHE_SIZE = 32
+
+
+def areas(l, w, water_level):
+    """``(surface, wall)`` in m²: open water surface and wetted walls + bottom."""
+    surface = l * w / 1e4
+    return surface, (2 * (l + w) * water_level + l * w) / 1e4
+
+
+def _humidity_ratio(temp, rh=1.0):
+    # ความชื้นอิ่มตัว (Magnus) -> humidity ratio (kg น้ำ / kg อากาศแห้ง)
+    temp = np.minimum(temp, MAX_TEMP)
+    p = rh * 610.94 * np.exp(17.625 * temp / (temp + 243.04))
+    return 0.622 * p / (P_ATM - p)
+
+
+def _humidity_slope(temp):
+    # d(humidity ratio อิ่มตัว)/dT; เหนือ MAX_TEMP ใช้ค่าที่ MAX_TEMP
+    # (ใช้เป็นอัตราหน่วงของขั้นเวลา ถ้าเป็น 0 ขั้นที่เริ่มเหนือ MAX_TEMP จะเย็นลงเกินจริง)
+    t = np.minimum(temp, MAX_TEMP)
+    p = 610.94 * np.exp(17.625 * t / (t + 243.04))
+    return 0.622 * P_ATM / (P_ATM - p) ** 2 * p * 17.625 * 243.04 / (t + 243.04) ** 2
+
+
+def on_fraction(t0, duties, cycle_min=10.0, shift_h=8.0, work_days=7, dt=DT):
+    """Fraction of each step ``[t0, t0 + dt)`` (seconds) the generator runs, shaped ``(steps, scenarios)``."""
+    t0 = np.asarray(t0, dtype=float)[:, None]
+    duties = np.asarray(duties, dtype=float)[None, :]
+    cycle = cycle_min * 60.0
+    day = t0 // 86400
+    since = t0 - day * 86400      # วินาทีนับจากต้นกะของวันนั้น (กะเริ่ม 0:00 ของแต่ละวันจำลอง)
+
+    def run_time(t):
+        # เวลาเปิดสะสมตั้งแต่ต้นกะถึง t (รอบเปิด/ปิดเริ่มใหม่ทุกกะ)
+        t = np.clip(t, 0.0, shift_h * 3600)
+        return (t // cycle) * duties * cycle + np.minimum(t % cycle, duties * cycle)
+
+    working = (day % 7) < work_days
+    return np.where(working, (run_time(since + dt) - run_time(since)) / dt, 0.0)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _simulate(power_w, vol_l, l, w, water_level, duties, hours, cycle_min, shift_h, work_days, ambient, limit):
+    if vol_l <= 0:
+        raise ValueError("Water volume must be > 0")
+    if not 0 < hours <= MAX_HOURS:
+        raise ValueError(f"Hours must be between 0 and {MAX_HOURS}")
+    if cycle_min <= 0 or not 0 <= shift_h <= 24 or not all(0 <= d <= 1 for d in duties):
+        raise ValueError("Cycle must be > 0, shift within 0-24 h and duty cycles within 0-1")
+    surface, wall = areas(l, w, water_level)
+    heat_cap = vol_l * WATER_C
+    ua = H_WALL * wall + H_SURF * surface
+    x_air = _humidity_ratio(ambient, HUMIDITY)
+    evap_k = EVAP_COEF * surface / 3600      # kg/s ต่อหน่วย humidity ratio
+
+    def evaporation(temp):
+        return evap_k * np.maximum(_humidity_ratio(temp) - x_air, 0.0)
+
+    def equilibrium(q):
+        # อุณหภูมิที่ความร้อนเข้า q เท่ากับความร้อนออก (สมดุลมีค่าเดียวเพราะความร้อนออกเพิ่มตาม T)
+        # หาด้วย bisection ในช่วง [Ta - การระเหยที่ Ta / ua, Ta + q / ua]
+        lo = np.full_like(q, ambient - LATENT_HEAT * float(evaporation(ambient)) / ua)
+        hi = ambient + q / ua
+        for _ in range(BISECTIONS):
+            mid = 0.5 * (lo + hi)
+            gain = q - ua * (mid - ambient) - LATENT_HEAT * evaporation(mid) > 0
+            lo, hi = np.where(gain, mid, lo), np.where(gain, hi, mid)
+        return 0.5 * (lo + hi)
+
+    # ค่าคงที่เวลาที่สั้นที่สุด (ที่ MAX_TEMP การระเหยดึงความร้อนเร็วที่สุด) -> จำนวนขั้นย่อยต่อ DT
+    # ขั้นไม่เกิน 2 tau เพื่อให้เห็นอุณหภูมิขึ้นลงตามรอบเปิด/ปิด (ความเสถียรไม่ขึ้นกับขั้น จึงตัดที่ MAX_SUBSTEPS ได้)
+    g_max = ua + LATENT_HEAT * evap_k * float(_humidity_slope(MAX_TEMP))
+    sub = min(MAX_SUBSTEPS, max(1, int(np.ceil(DT * g_max / (2 * heat_cap)))))
+    h = DT / sub
+
+    steps = int(round(hours * 3600 / DT)) * sub
+    every = OUT_EVERY * sub
+    u = on_fraction(np.arange(steps) * h, duties, cycle_min, shift_h, work_days, h)
+    heat = EFFICIENCY * power_w * u
+    # ภายในหนึ่งขั้นความร้อนเข้าคงที่ คำตอบจริงจึงเคลื่อนเข้าหาสมดุลของขั้นนั้นโดยไม่ข้าม
+    # ใช้เป็นขอบเขตของขั้น exponential Euler (ถังจิ๋วที่ร้อนถึงสมดุลในไม่กี่วินาทีจะไม่พุ่งเกิน)
+    levels, level_idx = np.unique(heat, return_inverse=True)
+    target = equilibrium(levels)[level_idx.reshape(heat.shape)]
+
+    n_out = steps // every + 1
+    temps = np.empty((n_out, len(duties)))
+    evap = np.empty_like(temps)
+    temp = np.full(len(duties), float(ambient))
+    evap_kg = np.zeros(len(duties))
+    above = np.zeros(len(duties))
+    temps[0], evap[0] = temp, evap_kg
+    rate = evaporation(temp)
+    for k in range(steps):
+        # T' = f(T) ~ f(T0) + J (T - T0), J <= 0  ->  T1 = T0 + h phi(hJ) f(T0), phi(z) = (e^z - 1) / z
+        f = (heat[k] - ua * (temp - ambient) - LATENT_HEAT * rate) / heat_cap
+        dg = np.where(_humidity_ratio(temp) > x_air, evap_k * _humidity_slope(temp), 0.0)
+        z = -h * (ua + LATENT_HEAT * dg) / heat_cap
+        step = temp + h * f * np.expm1(z) / z
+        temp = np.clip(step, np.minimum(temp, target[k]), np.maximum(temp, target[k]))
+        new_rate = evaporation(temp)
+        evap_kg += 0.5 * h * (rate + new_rate)
+        rate = new_rate
+        if limit is not None:
+            above += h * (temp > limit)
+        if (k + 1) % every == 0:
+            temps[(k + 1) // every], evap[(k + 1) // every] = temp, evap_kg
+
+    run_s = np.vstack([np.zeros((1, len(duties))), np.cumsum(u, axis=0) * h])[::every]
+    energy = power_w * run_s / 3.6e6            # kWh ไฟฟ้าสะสม
+    out = {
+        "duties": np.array(duties),
+        "t": np.arange(n_out) * (DT * OUT_EVERY / 3600),    # ชั่วโมง
+        "temp": temps.T,
+        "energy_kwh": energy.T,
+        "evaporated_l": evap.T,
+        "final_temp": temps[-1],
+        "max_temp": temps.max(axis=0),
+        "run_hours": run_s[-1] / 3600,
+        "total_kwh": energy[-1],
+        "hours_above": above / 3600 if limit is not None else None,
+        "limit": limit,
+        "ambient": ambient,
+    }
+    for v in out.values():
+        if isinstance(v, np.ndarray):
+            v.setflags(write=False)
+    return out
+
+
+def simulate(res, inputs, duties=DUTIES, hours=HORIZONS["shift"], cycle_min=10.0, shift_h=8.0, work_days=7,
+             ambient=AMBIENT, limit=None):
+    """Bath temperature and energy over ``hours`` for every duty cycle in ``duties`` at once.
+
+    ``res``/``inputs`` are a ``core.size_tank`` result and its keyword
+    arguments (power ``real_total_w``, ``vol``, tank ``l``/``w``/``water_level``).
+    The generator runs ``duty`` of every ``cycle_min`` minutes during the first
+    ``shift_h`` hours of each day, on ``work_days`` days of each week. Returns
+    per-scenario time series ``temp`` (°C), ``energy_kwh`` and
+    ``evaporated_l`` shaped ``(scenarios, len(t))`` with ``t`` in hours, plus
+    ``final_temp``, ``max_temp``, ``run_hours``, ``total_kwh`` and, when
+    ``limit`` (°C) is given, ``hours_above`` it. Results are cached.
+    """
+    return _simulate(float(res["real_total_w"]), float(res["vol"]), float(inputs["l"]), float(inputs["w"]),
+                     float(inputs["water_level"]), tuple(float(d) for d in duties), float(hours), float(cycle_min),
+                     float(shift_h), int(work_days), float(ambient), None if limit is None else float(limit))
@@ -0,0 +1,127 @@
+from functools import lru_cache
+
+import numpy as np
+
+import core
+
+# ==========================================
+# TOLERANCE ANALYSIS (Monte Carlo ของผลผ่าน/ไม่ผ่าน)
+# ==========================================
+# ผลปกติถือว่าบอร์ดจ่ายวัตต์เต็มป้าย ระดับน้ำตรงเป๊ะ และหัวทำงานครบทุกหัว
+# ที่นี่สุ่มความคลาดเคลื่อนต่อการทดลองหนึ่งครั้ง:
+# - วัตต์จริงของแต่ละบอร์ด = วัตต์ป้าย x N(watt_mean, watt_sd)
+# - ระดับน้ำ = ระดับที่ออกแบบ + N(0, level_sd) cm
+# - หัวแต่ละหัวเสียด้วยความน่าจะเป็น head_fail (บอร์ดเสียกำลังตามสัดส่วนหัวที่เสีย)
+# เกณฑ์ (target_density x core.PASS_RATIO) คงที่ตามแบบ ไม่เลื่อนตามปริมาตรที่สุ่มได้
+# ทำทีละก้อน (chunk) และเก็บแค่ histogram/ผลรวม หน่วยความจำจึงคงที่ไม่ว่าจะกี่รอบ
+TOLERANCES = {
+    "watt_mean": 0.95,      # วัตต์จริงเฉลี่ยเทียบป้าย
+    "watt_sd": 0.05,
+    "level_sd": 0.5,        # cm
+    "head_fail": 0.01,      # ต่อหัว
+}
+TRIALS = 1_000_000
+MAX_TRIALS = 20_000_000
+CHUNK = 1 << 18             # จำนวนการทดลองต่อก้อน
+BINS = 1000
+SEED = core.SHUFFLE_SEED
+PERCENTILES = (1, 5, 50, 95, 99)
+CACHE_SIZE = 32
+
+
+def _boards(rng, n, m, w, h, watt_mean, watt_sd, head_fail):
+    # วัตต์รวมที่ n บอร์ดรุ่นเดียวกันจ่ายได้จริง ต่อการทดลอง (m การทดลอง)
+    # สุ่มผลรวมตรงๆ: ผลรวมของ n ค่าปกติ = N(n*mean, sqrt(n)*sd), หัวที่เสียรวม = Binomial(n*h, p)
+    # เวลาจึงไม่ขึ้นกับจำนวนบอร์ด (ถังใหญ่ที่มีร้อยบอร์ดก็เร็วเท่าถังเล็ก)
+    if n == 0:
+        return np.zeros(m)
+    watts = rng.normal(n * watt_mean, np.sqrt(n) * watt_sd, m) if watt_sd > 0 else np.full(m, n * watt_mean)
+    np.maximum(watts, 0.0, out=watts)
+    if head_fail > 0:
+        watts *= 1.0 - rng.binomial(n * h, head_fail, m) / (n * h)
+    return watts * w
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _simulate(design, tol, trials, seed):
+    d, tol = dict(design), dict(tol)
+    if not 1 <= trials <= MAX_TRIALS:
+        raise ValueError(f"Trials must be between 1 and {MAX_TRIALS:,}")
+    if tol["watt_sd"] < 0 or tol["level_sd"] < 0 or not 0 <= tol["head_fail"] <= 1:
+        raise ValueError("Spreads must be >= 0 and head failure within 0-1")
+    area = d["l"] * d["w"] / 1000     # L ต่อ cm ของระดับน้ำ
+    nominal = core.tank_volume(d["l"], d["w"], d["water_level"])
+    threshold = d["target_density"] * core.PASS_RATIO
+    nominal_density = d["total_w"] / nominal if nominal > 0 else 0.0
+    # histogram ช่วงคงที่ 0 .. 2 เท่าของค่าที่ออกแบบ (ค่านอกช่วงนับรวมที่ขอบ)
+    top = 2 * max(nominal_density, threshold, 1e-9)
+    counts = np.zeros(BINS, dtype=np.int64)
+    # ผลรวมกำลังสองวัดจากค่าที่ออกแบบ (shifted) กันตัวเลขหักล้างใน E[x^2] - mean^2
+    n_pass, total, total_sq = 0, 0.0, 0.0
+    lo, hi = np.inf, -np.inf
+
+    rng = np.random.default_rng(seed)
+    for start in range(0, trials, CHUNK):
+        m = min(CHUNK, trials - start)
+        power = (_boards(rng, d["n_b28"], m, d["w_board_28"], d["h_board_28"], tol["watt_mean"], tol["watt_sd"],
+                         tol["head_fail"])
+                 + _boards(rng, d["n_b40"], m, d["w_board_40"], d["h_board_40"], tol["watt_mean"], tol["watt_sd"],
+                           tol["head_fail"]))
+        level = d["water_level"] + rng.normal(0.0, tol["level_sd"], m) if tol["level_sd"] > 0 \
+            else np.full(m, d["water_level"])
+        vol = area * np.maximum(level, 0.0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            density = np.where(vol > 0, power / vol, 0.0)
+        n_pass += int(np.count_nonzero(density >= threshold))
+        total += float(density.sum())
+        total_sq += float(np.square(density - nominal_density).sum())
+        lo, hi = min(lo, float(density.min())), max(hi, float(density.max()))
+        idx = np.minimum((density * (BINS / top)).astype(np.int64), BINS - 1)
+        counts += np.bincount(np.maximum(idx, 0), minlength=BINS)
+
+    mean = total / trials
+    edges = np.linspace(0.0, top, BINS + 1)
+    # เปอร์เซ็นไทล์จาก histogram (ประมาณภายในช่อง) ไม่ต้องเก็บค่าทุกการทดลอง
+    cdf = np.cumsum(counts) / trials
+    pct = {p: float(np.clip(np.interp(p / 100, np.concatenate(([0.0], cdf)), edges), lo, hi)) for p in PERCENTILES}
+    out = {
+        "trials": trials,
+        "p_pass": n_pass / trials,
+        "nominal_density": nominal_density,
+        "threshold": threshold,
+        "mean": mean,
+        "std": float(np.sqrt(max(total_sq / trials - (mean - nominal_density) ** 2, 0.0))),
+        "min": lo,
+        "max": hi,
+        "percentiles": pct,
+        "edges": edges,
+        "counts": counts,
+    }
+    edges.setflags(write=False)
+    counts.setflags(write=False)
+    return out
+
+
+def simulate(res, inputs, trials=TRIALS, seed=SEED, **tolerances):
+    """Monte Carlo of the pass/fail verdict of a sized design.
+
+    ``res``/``inputs`` are a ``core.size_tank`` result and its keyword
+    arguments; ``tolerances`` override :data:`TOLERANCES`. Returns the pass
+    probability ``p_pass``, density ``mean``/``std``/``min``/``max``,
+    ``percentiles`` and a fixed-range histogram (``edges``, ``counts``).
+    Trials run in chunks, so memory does not grow with ``trials``; results are
+    cached per design, tolerances, trial count and seed.
+    """
+    unknown = sorted(set(tolerances) - set(TOLERANCES))
+    if unknown:
+        raise ValueError(f"Unknown tolerances: {', '.join(unknown)}")
+    tol = dict(TOLERANCES, **tolerances)
+    design = {
+        "l": float(inputs["l"]), "w": float(inputs["w"]), "water_level": float(inputs["water_level"]),
+        "w_board_28": float(inputs.get("w_board_28", 120.0)), "h_board_28": int(inputs.get("h_board_28", 2)),
+        "w_board_40": float(inputs.get("w_board_40", 120.0)), "h_board_40": int(inputs.get("h_board_40", 3)),
+        "n_b28": int(res["n_b28"]), "n_b40": int(res["n_b40"]),
+        "target_density": float(res["target_density"]), "total_w": float(res["real_total_w"]),
+    }
+    return _simulate(tuple(sorted(design.items())), tuple(sorted((k, float(v)) for k, v in tol.items())),
+                     int(trials), int(seed))